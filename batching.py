@@ -0,0 +1,150 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+import metrics
+from catalog_row import json_default
+
+# Upload request sizing (see AdaptiveBatcher)
+UPLOAD_BATCH_BYTES    = int(os.environ.get("UPLOAD_BATCH_BYTES", str(4 << 20)))  # serialized body budget per request
+UPLOAD_TARGET_SECONDS = float(os.environ.get("UPLOAD_TARGET_SECONDS", "3"))       # aim for requests about this long
+UPLOAD_MIN_ROWS       = int(os.environ.get("UPLOAD_MIN_ROWS", "25"))              # never split below this
+UPLOAD_MAX_ROWS       = int(os.environ.get("UPLOAD_MAX_ROWS", "20000"))
+UPLOAD_START_ROWS     = int(os.environ.get("UPLOAD_START_ROWS", "800"))
+
+SAMPLE_ROWS = 16  # rows serialized per call to estimate bytes per row
+EWMA = 0.3
+
+def _percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))]
+
+class AdaptiveBatcher:
+    """Sends rows through send(rows) in requests sized to a byte budget and a target latency.
+
+    Callers hand over batches of any size (a 100-page block can be a few
+    hundred or many thousand rows); they are cut into requests of the current
+    size, which is the smallest of: max_bytes / estimated bytes per row,
+    target_seconds / observed seconds per row, and a ceiling (max_rows,
+    lowered by failures). It grows at most 2x per request. A failing request
+    is split in halves and each half retried (413s and timeouts usually mean
+    "too big"); only a request of min_rows rows that still fails raises.
+    Safe to call from several upload threads.
+    """
+
+    def __init__(self, send, max_bytes: int = UPLOAD_BATCH_BYTES, target_seconds: float = UPLOAD_TARGET_SECONDS,
+                 min_rows: int = UPLOAD_MIN_ROWS, max_rows: int = UPLOAD_MAX_ROWS, start_rows: int = UPLOAD_START_ROWS,
+                 should_split=None):
+        self.send = send
+        self.should_split = should_split or (lambda e: True)  # False for errors smaller requests cannot fix
+        self.max_bytes = max_bytes
+        self.target_seconds = target_seconds
+        self.min_rows = min_rows
+        self.max_rows = max_rows
+        self.size = max(min_rows, min(start_rows, max_rows))
+        self.ceiling = max_rows  # lowered when a request fails, recovers 5% per success
+        self.lock = threading.Lock()
+        self.bytes_per_row = None
+        self.seconds_per_row = None
+        self.requests = 0
+        self.rows = 0
+        self.splits = 0
+        self.failures = 0
+        self.recent = deque(maxlen=1000)  # (rows, est_bytes, seconds) of successful requests
+
+    def __call__(self, rows) -> int:
+        if not rows:
+            return 0
+        self._estimate_bytes(rows)
+        i = 0
+        while i < len(rows):
+            n = self.size
+            self._send(rows[i:i + n])
+            i += n
+        return len(rows)
+
+    def _estimate_bytes(self, rows):
+        step = max(1, len(rows) // SAMPLE_ROWS)
+        sample = rows[::step][:SAMPLE_ROWS]
+        per_row = len(json.dumps(sample, ensure_ascii=False, default=json_default).encode("utf-8")) / len(sample)
+        with self.lock:
+            b = self.bytes_per_row
+            self.bytes_per_row = per_row if b is None else (1 - EWMA) * b + EWMA * per_row
+            self._resize()
+
+    def _resize(self):
+        # Called with self.lock held
+        limit = self.ceiling
+        if self.bytes_per_row:
+            limit = min(limit, int(self.max_bytes / self.bytes_per_row))
+        if self.seconds_per_row:
+            limit = min(limit, int(self.target_seconds / self.seconds_per_row))
+        self.size = max(self.min_rows, min(limit, self.size * 2))
+
+    def _send(self, chunk):
+        t = time.perf_counter()
+        try:
+            self.send(chunk)
+        except Exception as e:
+            seconds = time.perf_counter() - t
+            metrics.count("upload_request_failures")
+            with self.lock:
+                self.failures += 1
+            if len(chunk) <= self.min_rows or not self.should_split(e):
+                raise
+            half = len(chunk) // 2
+            print(f"Upload of {len(chunk)} rows failed after {seconds:.1f}s ({e}); retrying as 2 x ~{half} rows")
+            metrics.count("upload_splits")
+            with self.lock:
+                self.splits += 1
+                self.ceiling = max(self.min_rows, min(self.ceiling, half))
+                self.size = min(self.size, self.ceiling)
+            self._send(chunk[:half])
+            self._send(chunk[half:])
+            return
+        seconds = time.perf_counter() - t
+        metrics.registry.observe("upload_request", seconds)
+        with self.lock:
+            self.requests += 1
+            self.rows += len(chunk)
+            self.recent.append((len(chunk), round(len(chunk) * (self.bytes_per_row or 0)), seconds))
+            per_row = seconds / len(chunk)
+            s = self.seconds_per_row
+            self.seconds_per_row = per_row if s is None else (1 - EWMA) * s + EWMA * per_row
+            self.ceiling = min(self.max_rows, self.ceiling + max(1, self.ceiling // 20))
+            self._resize()
+
+    def stats(self) -> dict:
+        with self.lock:
+            recent = list(self.recent)
+            out = {
+                "requests": self.requests,
+                "rows": self.rows,
+                "splits": self.splits,
+                "failed_requests": self.failures,
+                "rows_per_request_now": self.size,
+                "rows_per_request_ceiling": self.ceiling,
+                "est_bytes_per_row": round(self.bytes_per_row, 1) if self.bytes_per_row else None,
+                "max_bytes": self.max_bytes,
+                "target_seconds": self.target_seconds,
+            }
+        sizes = [r[0] for r in recent]
+        latencies = [r[2] for r in recent]
+        out["rows_per_request"] = {"min": min(sizes, default=None), "p50": _percentile(sizes, 0.5),
+                                   "max": max(sizes, default=None)}
+        out["est_bytes_per_request_p50"] = _percentile([r[1] for r in recent], 0.5)
+        out["latency_s"] = {k: round(v, 3) if v is not None else None
+                            for k, v in (("p50", _percentile(latencies, 0.5)), ("p95", _percentile(latencies, 0.95)),
+                                         ("max", max(latencies, default=None)))}
+        return out
+
+def describe(stats: dict) -> str:
+    """One-line summary for run output."""
+    lat = stats["latency_s"]
+    sizes = stats["rows_per_request"]
+    return (f"{stats['requests']} requests, {sizes['min']}-{sizes['max']} rows (p50 {sizes['p50']}, "
+            f"now {stats['rows_per_request_now']}), latency p50 {lat['p50']}s p95 {lat['p95']}s, "
+            f"{stats['splits']} splits")
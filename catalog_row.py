@@ -0,0 +1,97 @@
+import sys
+
+_UNSET = object()
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+class CatalogRow:
+    """One parsed catalog_items row, kept compact until it is serialized.
+
+    A __slots__ object with make/source/version_date interned is several
+    times smaller than the equivalent dict plus its raw_row dict. Parsers
+    and upload helpers can still use row["key"] / row["key"] = value;
+    to_dict() builds the JSON-ready dict with the same keys, in the same
+    order, the parsers used to produce.
+    """
+
+    __slots__ = ("supplier_id", "pcode", "cat_num_desc", "price", "source", "make",
+                 "version_date", "page", "cells", "row_hash", "catalog_version",
+                 "oem", "year_from", "year_to", "year_range", "side_position", "front_rear", "part_family",
+                 "model_code", "model", "engine_type", "part_name", "extracted_year", "pre_extracted")
+
+    # Payload key order; raw_row is materialized from page (and cells).
+    # catalog_version is only sent when set (INGEST_MODE=versioned), the
+    # extracted columns only with PRE_EXTRACT=1 (see extraction.py).
+    KEYS = ("supplier_id", "pcode", "cat_num_desc", "price", "source", "make", "version_date", "raw_row", "row_hash",
+            "catalog_version", "oem", "year_from", "year_to", "year_range", "side_position", "front_rear",
+            "part_family", "model_code", "model", "engine_type", "part_name", "extracted_year", "pre_extracted")
+
+    def __init__(self, supplier_id, pcode, cat_num_desc, price, source, make, version_date,
+                 page, cells=None, row_hash=None):
+        self.supplier_id = supplier_id
+        self.pcode = pcode
+        self.cat_num_desc = cat_num_desc
+        self.price = price
+        self.source = _intern(source)
+        self.make = _intern(make)
+        self.version_date = _intern(version_date)
+        self.page = page
+        self.cells = tuple(cells) if cells is not None else None
+        self.row_hash = row_hash
+
+    @property
+    def raw_row(self):
+        if self.cells is None:
+            return {"page": self.page}
+        return {"page": self.page, "data": list(self.cells)}
+
+    def __getitem__(self, key):
+        if key not in self.KEYS:
+            raise KeyError(key)
+        value = getattr(self, key, _UNSET)
+        if value is _UNSET:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        if key not in self.KEYS or key == "raw_row":
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return self.KEYS
+
+    def to_dict(self) -> dict:
+        out = {}
+        for k in self.KEYS:
+            value = getattr(self, k, _UNSET)
+            if value is not _UNSET:
+                out[k] = value
+        return out
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+class FixedRow(CatalogRow):
+    """Row of parse_mpines_fixed: raw_row keeps the cells and supplier_id is filled in last."""
+
+    __slots__ = ()
+    KEYS = ("pcode", "cat_num_desc", "price", "source", "make", "version_date", "raw_row", "row_hash", "supplier_id")
+
+    def __init__(self, pcode, cat_num_desc, price, source, make, version_date, page, cells, row_hash=None):
+        CatalogRow.__init__(self, None, pcode, cat_num_desc, price, source, make, version_date, page, cells, row_hash)
+        del self.supplier_id  # left out of the payload until main() sets it
+
+def json_default(obj):
+    """json.dumps(default=...) hook that materializes rows at serialization time."""
+    to_dict = getattr(obj, "to_dict", None)
+    if to_dict is None:
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+    return to_dict()
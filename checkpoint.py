@@ -0,0 +1,59 @@
+import json
+import os
+import re
+import threading
+
+class LocalStateStore:
+    """Checkpoint state as small JSON files in a directory (CHECKPOINT_DIR)."""
+
+    def __init__(self, directory: str = None):
+        self.directory = directory or os.environ.get("CHECKPOINT_DIR", ".ingest_state")
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, re.sub(r"[^\w.-]", "_", key) + ".json")
+
+    def load(self, key: str):
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def save(self, key: str, state: dict):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp, path)  # atomic, so a killed worker never leaves a torn file
+
+    def clear(self, key: str):
+        try:
+            os.unlink(self._path(key))
+        except FileNotFoundError:
+            pass
+
+class Checkpoint:
+    """Last fully uploaded page for one (supplier, version_date, source checksum).
+
+    Any object with load/save/clear(key) can be passed as store, e.g. one
+    backed by Storage or an in-memory stub.
+    """
+
+    def __init__(self, supplier_slug: str, version_date: str, source_sha256: str, store=None, restart: bool = False):
+        self.store = store or LocalStateStore()
+        self.key = f"{supplier_slug}_{version_date}_{source_sha256[:16]}"
+        self.lock = threading.Lock()
+        if restart:
+            self.store.clear(self.key)
+        state = self.store.load(self.key) or {}
+        self.resume_page = state.get("pages_committed", 0)
+        if self.resume_page:
+            print(f"Resuming {self.key} after page {self.resume_page}")
+
+    def commit(self, pages_committed: int):
+        with self.lock:
+            self.store.save(self.key, {"pages_committed": pages_committed})
+
+    def done(self):
+        self.store.clear(self.key)
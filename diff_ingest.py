@@ -0,0 +1,61 @@
+import threading
+from supabase_io import fetch_row_hashes, delete_rows_by_hash, upsert_rows
+
+class DiffUploader:
+    """Upload only rows whose row_hash is not already stored for the supplier.
+
+    Usage: call upload(batch) for every parsed batch, then finish() to delete
+    the hashes that were not seen in this run. Nothing is deleted when the run
+    produced no rows or any upload failed, so a failed parse or upload cannot
+    wipe the catalog.
+    upload() may be called from several uploader threads at once.
+    """
+
+    def __init__(self, supplier_id, table_name: str = "catalog_items"):
+        self.table_name = table_name
+        print(f"Fetching existing row hashes for supplier {supplier_id}...")
+        self.existing = set(fetch_row_hashes(table_name, supplier_id))
+        print(f"Found {len(self.existing)} existing rows")
+        self.seen = set()
+        self.added = 0
+        self.failed = 0
+        self.lock = threading.Lock()
+
+    def upload(self, rows) -> int:
+        fresh = {}
+        for r in rows:
+            h = r["row_hash"]
+            if h not in self.existing and h not in self.seen:
+                fresh[h] = r  # dict also drops duplicates inside the batch
+        if fresh:
+            try:
+                upsert_rows(self.table_name, list(fresh.values()))
+            except Exception:
+                with self.lock:
+                    self.failed += 1
+                raise
+        # Only mark as seen after the upsert succeeded, so a failed batch is retried
+        with self.lock:
+            self.seen.update(r["row_hash"] for r in rows)
+            self.added += len(fresh)
+        return len(rows)
+
+    def finish(self, delete_stale: bool = True) -> dict:
+        kept = len(self.existing & self.seen)
+        stale = self.existing - self.seen
+        if not self.seen:
+            print("No rows parsed - skipping delete of stale rows")
+            stale = set()
+        elif self.failed:
+            # Rows of a failed batch were never seen, so they would look stale
+            print(f"{self.failed} batches failed to upload - refusing to delete {len(stale)} stale rows")
+            stale = set()
+        elif not delete_stale:
+            print(f"Resumed run - leaving {len(stale)} possibly stale rows for the next full diff")
+            stale = set()
+        elif stale:
+            print(f"Deleting {len(stale)} stale rows...")
+            delete_rows_by_hash(self.table_name, stale)
+        summary = {"added": self.added, "removed": len(stale), "kept": kept}
+        print(f"Diff ingest: {summary['added']} added, {summary['removed']} removed, {summary['kept']} kept")
+        return summary
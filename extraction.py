@@ -0,0 +1,181 @@
+import re
+from functools import lru_cache
+
+# Python port of the catalog_items extraction triggers, applied to whole
+# batches before upload so the database can skip them (pre_extracted = true).
+# Ported from the deployed functions (tests.md / FINAL_CLEAN_DEPLOYMENT.sql),
+# in the order PostgreSQL fires their BEFORE INSERT triggers (by name):
+#   auto_process_catalog_on_insert -> auto_extract_catalog_data()  (+ normalize_make)
+#   trigger_auto_fix_and_extract   -> auto_fix_and_extract()
+#   trigger_extract_model_and_year -> extract_model_and_year()
+# SQL side: SESSION_38_PRE_EXTRACTED_CATALOG_ROWS.sql gates exactly these.
+# Keep both in sync: a change to either trigger needs the same change here
+# (tests/test_extraction_parity.py compares the two).
+
+FIELDS = ("oem", "year_from", "year_to", "year_range", "side_position", "front_rear", "part_family", "model_code",
+          "model", "engine_type", "part_name", "extracted_year", "pre_extracted")
+
+# ---- auto_extract_catalog_data ----
+
+_OEM = re.compile(r"([a-z0-9]{8,14})")
+_YEAR_RANGE = re.compile(r"(\d{2,4})\s*[-–]\s*(\d{2,4})")
+_MODEL_CODE = re.compile(r"([ecfg][0-9]{2})")
+_MODEL = re.compile(r"(a[0-9]{1,2}|s[0-9]{1,2}|q[0-9]{1,2}|x[0-9]{1,2}|t[0-9]{1,2}|גולף|פאסאט|פיאסטה|פוקוס|קורולה)")
+_MAKE_SUFFIX = re.compile(r"\s+(יפן|ארהב|גרמניה|קוריאה|צרפת|איטליה|אנגליה|שוודיה)\Z", re.IGNORECASE)
+_MAKES = {
+    "TOYOTA": "טויוטה", "טויוטה יפן": "טויוטה",
+    "BMW": "BMW", "במוו": "BMW", "בםוו": "BMW",
+    "MERCEDES": "מרצדס", "MERCEDES-BENZ": "מרצדס", "מרצדס": "מרצדס", "מרצדס בנץ": "מרצדס",
+}
+# Checked in order, a later match overriding an earlier one
+_FAMILIES = (("פנס", ("פנס",)), ("רפלקטור", ("רפלקטור",)), ("מראה", ("מראה",)), ("פגוש", ("טמבון", "מגן")),
+             ("גריל", ("גריל",)))
+_SHEET_METAL = ("כנף", "דלת", "מכסה מנוע", "מכסה תא מטען")
+_ENGINES = (("דיזל", "דיזל"), ("בנזין", "בנזין"), ("היבריד", "היברידי"), ("חשמלי", "חשמלי"))
+
+@lru_cache(maxsize=4096)
+def normalize_make(make):
+    if make is None:
+        return None
+    make = _MAKE_SUFFIX.sub("", make)
+    return _MAKES.get(make.strip(" ").upper(), make.strip(" "))
+
+def _year(digits: str) -> int:
+    return 2000 + int(digits) if len(digits) in (2, 3) else int(digits)
+
+def _last(txt: str, choices):
+    found = None
+    for value, needles in choices:
+        if any(n in txt for n in needles):
+            found = value
+    return found
+
+def _auto_extract(out: dict, desc, make):
+    txt = (desc or "").lower()
+    m = _OEM.search(txt)
+    if m and not m.group(1).startswith("dep"):
+        out["oem"] = m.group(1)
+    m = _YEAR_RANGE.search(txt)
+    if m:
+        out["year_from"], out["year_to"] = _year(m.group(1)), _year(m.group(2))
+        out["year_range"] = f"{m.group(1)}-{m.group(2)}"
+    out["side_position"] = _last(txt, (("שמאל", ("שמאל",)), ("ימין", ("ימין",))))
+    out["front_rear"] = _last(txt, (("קדמי", ("קדמי",)), ("אחורי", ("אחורי",))))
+    family = _last(txt, _FAMILIES)
+    if family is None and any(n in txt for n in _SHEET_METAL):
+        family = "פח"
+    out["part_family"] = family
+    m = _MODEL_CODE.search(txt)
+    if m:
+        out["model_code"] = m.group(1).upper()
+    m = _MODEL.search(txt)
+    if m:
+        out["model"] = m.group(1).replace(" ", "").upper()
+    out["engine_type"] = _last(txt, ((engine, (word,)) for word, engine in _ENGINES))
+    return normalize_make(make)
+
+# ---- auto_fix_and_extract ----
+
+_PART_NAME = re.compile(r"^([\u0590-\u05FF]+(?:\s+[\u0590-\u05FF]+)?)")
+_SHORT_RANGE = re.compile(r"(\d{2,3})-(\d{2,3})")
+_FIX_MODELS = (("קורולה", ("קורולה",)), ("קאמרי", ("קאמרי",)), ("יאריס", ("יאריס",)), ("RAV4", ("rav4", "ראב")),
+               ("גולף", ("גולף",)), ("פולו", ("פולו",)), ("A3", ("a3",)), ("A4", ("a4",)))
+_GROUPS = [(group, re.compile(pattern)) for group, pattern in (
+    ("פנסים ותאורה", "פנס|נורה|זרקור|מהבהב|איתות"),
+    ("דלתות וכנפיים", "דלת|כנף|מכסה מנוע|תא מטען"),
+    ("מגנים ופגושים", "מגן|פגוש|ספוילר|גריל"),
+    ("חלקי מרכב", "ידית|מנעול|ציר|בולם דלת|תומך"),
+    ("חלונות ומראות", "מראה|חלון|שמשה|זכוכית"),
+    ("גלגלים וצמיגים", "גלגל|צמיג"),
+)]
+
+@lru_cache(maxsize=65536)
+def part_group(part_name: str) -> str:
+    """First matching group of the trigger's CASE (part names repeat, so cached)."""
+    for group, pattern in _GROUPS:
+        if pattern.search(part_name):
+            return group
+    return "לא מוגדר"
+
+def _fix_year(digits: str) -> int:
+    year = int(digits)
+    if year >= 100:
+        year -= year // 100 * 100
+    return 1900 + year if year >= 90 else 2000 + year
+
+def _auto_fix(out: dict, desc):
+    if desc is None:
+        return
+    m = _PART_NAME.match(desc)
+    out["part_name"] = m.group(1) if m else None
+    m = _SHORT_RANGE.search(desc)
+    if m:
+        out["year_from"], out["year_to"] = _fix_year(m.group(1)), _fix_year(m.group(2))
+        out["extracted_year"] = str(out["year_from"])
+    if out["model"] is None:
+        lowered = desc.lower()  # ILIKE
+        for model, needles in _FIX_MODELS:
+            if any(n in lowered for n in needles):
+                out["model"] = model
+                break
+    if out["part_family"] in (None, "מקורי") and out["part_name"] is not None:
+        out["part_family"] = part_group(out["part_name"])
+
+# ---- extract_model_and_year ----
+
+_MODELS = {
+    "טויוטה": ("קורולה", "קאמרי", "פריוס"),
+    "VAG": ("A3", "A4", "A5", "Q3", "Q5"),
+    "אודי": ("A3", "A4", "A5", "Q3", "Q5"),
+    "פולקסווגן": ("גולף", "פולו", "טיגואן"),
+}
+_YEAR_PATTERNS = [re.compile(p) for p in (
+    r"(\d{2})-(\d{2})(?:\D|\Z)",
+    r"(\d{3})-(\d{3})(?:\D|\Z)",
+    r"[^\d](\d{3})-(?:\s|\Z)",
+    r"[\s-](\d{3})(?:\s|\Z|-)",
+)]
+
+def _full_year(digits):
+    if digits is None:
+        return None
+    if len(digits) == 2:
+        return 1900 + int(digits) if int(digits) >= 80 else 2000 + int(digits)
+    return 2000 + int(digits)
+
+def _model_and_year(out: dict, desc, make):
+    txt = desc or ""
+    for model in _MODELS.get(make, ()):
+        if model in txt:
+            out["model"] = model
+            break
+    for pattern in _YEAR_PATTERNS:
+        m = pattern.search(txt)
+        if m:
+            groups = m.groups()
+            yr_from, yr_to = _full_year(groups[0]), _full_year(groups[1] if len(groups) > 1 else None)
+            if 1980 <= yr_from <= 2030:
+                out["year_from"] = out["year_to"] = yr_from
+            if yr_to is not None and 1980 <= yr_to <= 2030:
+                out["year_to"] = yr_to
+            break
+
+# ---- batch ----
+
+def extract_fields(desc, make):
+    """Derived columns for one new (cat_num_desc, make) row; returns a dict including the normalized make."""
+    out = dict.fromkeys(FIELDS[:-1])
+    make = _auto_extract(out, desc, make)
+    _auto_fix(out, desc)
+    _model_and_year(out, desc, make)
+    out["make"] = make
+    return out
+
+def extract_rows(rows) -> int:
+    """Fill the derived columns of a batch in place (CatalogRow objects or dicts); returns rows changed."""
+    for r in rows:
+        fields = extract_fields(r["cat_num_desc"], r["make"])
+        for k, v in fields.items():
+            r[k] = v
+        r["pre_extracted"] = True
+    return len(rows)
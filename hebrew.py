@@ -0,0 +1,84 @@
+import json
+import os
+import re
+from functools import lru_cache
+
+# Characters of a cell that is pure (visually reversed) Hebrew
+_PURE_HEBREW = 'אבגדהוזחטיכלמנסעפצקרשתןםךףץ \'"-'
+_DROP_PURE_HEBREW = str.maketrans("", "", _PURE_HEBREW)
+
+_HEBREW_RANGE = re.compile('[\u0590-\u05FF]')
+_REVERSED_YEAR = re.compile(r'(\d{3})-(\d{2})')
+_YEAR_PREFIX = re.compile(r'^\d{2}-')
+_YEAR_WORD = re.compile(r'^\d{2}-$')
+
+CACHE_SIZE = int(os.environ.get("HEBREW_CACHE_SIZE", "65536"))
+
+def _fix(text):
+    # If pure Hebrew, just reverse
+    if not text.translate(_DROP_PURE_HEBREW):
+        return text[::-1]
+
+    # Check for reversed year patterns (like 210-80 which should be 08-012)
+    match = _REVERSED_YEAR.search(text)
+    if match:
+        fixed_year = f"{match.group(2)[::-1]}-{match.group(1)[::-1]}"  # 210-80 -> 08-012
+        text = text.replace(match.group(), fixed_year)
+
+    # Handle mixed content with year at beginning
+    if _YEAR_PREFIX.match(text):
+        parts = text.split(' ', 1)
+        if len(parts) > 1:
+            year_part, rest = parts
+            if _HEBREW_RANGE.search(rest):
+                rest = rest[::-1]
+            return f"{year_part} {rest}"
+
+    # For complex mixed content
+    fixed_words = []
+    for word in text.split():
+        if _YEAR_WORD.match(word):
+            fixed_words.append(word)
+        elif word == 'T5' or word == '5T':
+            fixed_words.append('T5')
+        elif _HEBREW_RANGE.search(word):
+            fixed_words.append(word[::-1])
+        else:
+            fixed_words.append(word)
+
+    if _HEBREW_RANGE.search(text):
+        fixed_words.reverse()
+
+    return ' '.join(fixed_words)
+
+_fix_cached = lru_cache(maxsize=CACHE_SIZE)(_fix)
+
+def fix_hebrew_and_years(text):
+    """Fix reversed Hebrew text and preserve year patterns.
+
+    Results are cached by raw cell text (HEBREW_CACHE_SIZE entries), since
+    make and source values repeat on almost every row.
+    """
+    if not text:
+        return text
+    return _fix_cached(text)
+
+def cache_info():
+    return _fix_cached.cache_info()
+
+def verify(corpus_path: str = None) -> int:
+    """Check fix_hebrew_and_years against the regression corpus; return the number of mismatches."""
+    corpus_path = corpus_path or os.path.join(os.path.dirname(os.path.abspath(__file__)), "hebrew_corpus.json")
+    with open(corpus_path, encoding="utf-8") as f:
+        corpus = json.load(f)
+    bad = 0
+    for raw, expected in corpus:
+        got = fix_hebrew_and_years(raw)
+        if got != expected:
+            bad += 1
+            print(f"MISMATCH {raw!r}: expected {expected!r}, got {got!r}")
+    print(f"{len(corpus) - bad}/{len(corpus)} corpus entries match")
+    return bad
+
+if __name__ == "__main__":
+    raise SystemExit(1 if verify() else 0)
@@ -0,0 +1,142 @@
+import json
+import os
+import threading
+import time
+
+# INGEST_METRICS=1 (or a METRICS_REPORT path) turns collection on
+ENABLED = os.environ.get("INGEST_METRICS", "0") == "1" or bool(os.environ.get("METRICS_REPORT"))
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_TIMER = _NullTimer()
+
+class _Timer:
+    __slots__ = ("metrics", "stage", "t")
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.t = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.stage, time.perf_counter() - self.t)
+        return False
+
+class Metrics:
+    """Stage timers and counters for one ingest run (or one server process).
+
+    When disabled, timer() returns a shared no-op context manager and count()
+    returns at once, so instrumented hot loops cost one attribute check.
+    Stages may nest (e.g. hash runs inside batch); each one is summed on its own.
+    """
+
+    def __init__(self, enabled: bool = ENABLED):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.stages = {}    # stage -> [calls, seconds]
+            self.counters = {}  # name -> value
+            self.events = {}    # name -> list of small dicts (e.g. quarantined pages)
+            self.started = time.time()
+
+    def timer(self, stage: str):
+        return _Timer(self, stage) if self.enabled else _NULL_TIMER
+
+    def observe(self, stage: str, seconds: float, calls: int = 1):
+        if not self.enabled:
+            return
+        with self.lock:
+            s = self.stages.get(stage)
+            if s is None:
+                self.stages[stage] = [calls, seconds]
+            else:
+                s[0] += calls
+                s[1] += seconds
+
+    def count(self, name: str, n=1):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def event(self, name: str, item: dict):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.events.setdefault(name, []).append(item)
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {
+                "stages": {k: {"calls": c, "seconds": round(s, 6)} for k, (c, s) in self.stages.items()},
+                "counters": dict(self.counters),
+                "events": {k: list(v) for k, v in self.events.items()},
+            }
+
+    def merge(self, snapshot: dict):
+        """Add a snapshot taken in another process (e.g. a parser worker)."""
+        if not self.enabled or not snapshot:
+            return
+        for stage, s in snapshot["stages"].items():
+            self.observe(stage, s["seconds"], s["calls"])
+        for name, n in snapshot["counters"].items():
+            self.count(name, n)
+        for name, items in snapshot.get("events", {}).items():
+            for item in items:
+                self.event(name, item)
+
+    def report(self, **extra) -> dict:
+        out = {"started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+               "wall_seconds": round(time.time() - self.started, 3)}
+        out.update(self.snapshot())
+        out.update(extra)
+        return out
+
+    def write_report(self, path: str, **extra) -> dict:
+        report = self.report(**extra)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, default=str)
+        os.replace(tmp, path)
+        print(f"Metrics report written to {path}")
+        return report
+
+    def prometheus(self, prefix: str = "ingest") -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        snap = self.snapshot()
+        lines = [
+            f"# HELP {prefix}_stage_seconds_total Time spent in each stage.",
+            f"# TYPE {prefix}_stage_seconds_total counter",
+        ]
+        lines += [f'{prefix}_stage_seconds_total{{stage="{k}"}} {v["seconds"]}' for k, v in sorted(snap["stages"].items())]
+        lines += [
+            f"# HELP {prefix}_stage_calls_total Number of timed calls of each stage.",
+            f"# TYPE {prefix}_stage_calls_total counter",
+        ]
+        lines += [f'{prefix}_stage_calls_total{{stage="{k}"}} {v["calls"]}' for k, v in sorted(snap["stages"].items())]
+        for name, value in sorted(snap["counters"].items()):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value}")
+        return "\n".join(lines) + "\n"
+
+# Process-wide registry used by the ingest modules
+registry = Metrics()
+timer = registry.timer
+count = registry.count
+event = registry.event
+
+def enable(on: bool = True):
+    registry.enabled = on
@@ -0,0 +1,179 @@
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import numpy as np
+
+# Cross-supplier offer index: for every normalized pcode / oem_code, the
+# cheapest row of each supplier's current catalog. One .npz partition per
+# supplier (sorted code array + price array), replaced by each ingest of
+# that supplier; lookups binary-search every partition for a whole batch of
+# codes at once.
+OFFER_INDEX_DIR = os.environ.get("OFFER_INDEX_DIR", "offer_index")
+OFFER_INDEX_REFRESH_S = float(os.environ.get("OFFER_INDEX_REFRESH_S", "5"))  # re-check partitions written by other processes
+CODE_FIELDS = ("pcode", "oem_code")
+_SAFE = re.compile(r"^[\w.\-]+$")
+_NOT_CODE = re.compile(r"[\W_]+")
+
+def normalize_code(code) -> str:
+    """Upper case without spaces and punctuation, so '04152-YZZA1' matches '04152 yzza1'."""
+    if not code:
+        return ""
+    return _NOT_CODE.sub("", str(code)).upper()
+
+def _path(root: str, supplier: str) -> str:
+    if not _SAFE.match(supplier):
+        raise ValueError(f"invalid supplier name: {supplier!r}")
+    return os.path.join(root, f"{supplier}.npz")
+
+class OfferWriter:
+    """Collects the codes and prices of one supplier catalog and replaces its partition on close().
+
+    A row is indexed under its pcode and, when it has one, its oem_code.
+    Of several rows with the same code the cheapest priced one is kept.
+    """
+
+    def __init__(self, supplier: str, version: str, root: str = OFFER_INDEX_DIR):
+        self.path = _path(root, supplier)
+        self.supplier = supplier
+        self.version = version
+        self.codes, self.prices, self.pcodes, self.descs, self.makes = [], [], [], [], []
+
+    def add(self, rows):
+        for r in rows:
+            price = r.get("price")
+            price = np.nan if price is None else price
+            seen = None
+            for field in CODE_FIELDS:
+                code = normalize_code(r.get(field))
+                if code and code != seen:
+                    self.codes.append(code)
+                    self.prices.append(price)
+                    self.pcodes.append(r.get("pcode") or "")
+                    self.descs.append(r.get("cat_num_desc") or "")
+                    self.makes.append(r.get("make") or "")
+                    seen = code
+
+    def close(self):
+        code = np.array(self.codes, dtype=str)
+        price = np.array(self.prices, dtype=np.float64)
+        order = np.lexsort((np.where(np.isnan(price), np.inf, price), code))  # by code, cheapest first
+        code = code[order]
+        first = np.ones(len(code), dtype=bool)
+        first[1:] = code[1:] != code[:-1]
+        idx = order[first]
+        meta = {"supplier": self.supplier, "version": self.version, "rows": len(self.codes),
+                "written": time.strftime("%Y-%m-%dT%H:%M:%S")}
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.path) or ".", suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, code=code[first], price=price[idx], pcode=np.array(self.pcodes, dtype=str)[idx],
+                     desc=np.array(self.descs, dtype=str)[idx], make=np.array(self.makes, dtype=str)[idx],
+                     meta=np.array(json.dumps(meta)))
+        os.replace(tmp, self.path)
+        print(f"Offer index: {int(first.sum())} codes of {self.supplier} written to {self.path}")
+        _swap(self.supplier, _load(self.path))
+
+# ---------------- Registry (atomic hot swap) ----------------
+
+_lock = threading.Lock()
+_partitions = {}  # supplier slug -> partition dict; replaced wholesale, never mutated
+_checked = 0.0
+
+def _stamp(path: str):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+def _load(path: str) -> dict:
+    stamp = _stamp(path)
+    with np.load(path) as z:
+        part = {k: z[k] for k in ("code", "price", "pcode", "desc", "make")}
+        part["meta"] = json.loads(str(z["meta"]))
+    part["stamp"] = stamp
+    return part
+
+def _swap(supplier: str, part):
+    global _partitions
+    with _lock:
+        swapped = dict(_partitions)
+        if part is None:
+            swapped.pop(supplier, None)
+        else:
+            swapped[supplier] = part
+        _partitions = swapped  # readers holding the old dict keep a consistent view
+
+def refresh(root: str = OFFER_INDEX_DIR, force: bool = False) -> dict:
+    """The current partitions, reloading those another process has rewritten (at most every OFFER_INDEX_REFRESH_S)."""
+    global _checked
+    now = time.monotonic()
+    if not force and now - _checked < OFFER_INDEX_REFRESH_S:
+        return _partitions
+    _checked = now
+    on_disk = {f[:-4] for f in os.listdir(root) if f.endswith(".npz")} if os.path.isdir(root) else set()
+    for supplier in set(_partitions) - on_disk:
+        _swap(supplier, None)
+    for supplier in on_disk:
+        path = _path(root, supplier)
+        current = _partitions.get(supplier)
+        try:
+            if current is None or current["stamp"] != _stamp(path):
+                _swap(supplier, _load(path))
+        except (OSError, ValueError) as e:  # replaced or removed while reading; next refresh retries
+            print(f"Offer index: could not load {path}: {e}")
+    return _partitions
+
+def status(root: str = OFFER_INDEX_DIR) -> dict:
+    return {s: {"codes": len(p["code"]), "version": p["meta"]["version"], "written": p["meta"]["written"]}
+            for s, p in sorted(refresh(root).items())}
+
+def _offer(supplier: str, part: dict, i: int) -> dict:
+    price = part["price"][i]
+    return {"supplier": supplier, "version": part["meta"]["version"], "price": None if np.isnan(price) else float(price),
+            "pcode": str(part["pcode"][i]), "cat_num_desc": str(part["desc"][i]), "make": str(part["make"][i])}
+
+def cheapest(codes, suppliers=None, offers: bool = False, root: str = OFFER_INDEX_DIR) -> list:
+    """One {"code", "key", "cheapest", "suppliers"} per input code, in order.
+
+    cheapest is the lowest priced offer across suppliers (None when no
+    supplier lists the code with a price) and suppliers the number listing
+    it at all; offers=True adds every supplier's offer, cheapest first.
+    """
+    if not codes:
+        return []
+    parts = refresh(root)
+    names = [s for s in sorted(parts) if not suppliers or s in suppliers]
+    keys = [normalize_code(c) for c in codes]
+    q = np.array(keys, dtype=str)
+    valid = q != ""
+    best_price = np.full(len(q), np.inf)
+    best_supplier = np.full(len(q), -1)
+    best_pos = np.zeros(len(q), dtype=np.intp)
+    listed = np.zeros(len(q), dtype=np.intp)
+    hits = []
+    for si, name in enumerate(names):
+        part = parts[name]
+        if not len(part["code"]):
+            hits.append(None)
+            continue
+        pos = np.minimum(np.searchsorted(part["code"], q), len(part["code"]) - 1)
+        hit = valid & (part["code"][pos] == q)
+        price = np.where(hit, part["price"][pos], np.nan)
+        better = price < best_price  # False for misses and unpriced rows
+        best_price[better] = price[better]
+        best_supplier[better] = si
+        best_pos[better] = pos[better]
+        listed += hit
+        hits.append((pos, hit))
+
+    out = []
+    for i, code in enumerate(codes):
+        si = best_supplier[i]
+        item = {"code": code, "key": keys[i], "suppliers": int(listed[i]),
+                "cheapest": _offer(names[si], parts[names[si]], best_pos[i]) if si >= 0 else None}
+        if offers:
+            found = [_offer(name, parts[name], h[0][i]) for name, h in zip(names, hits) if h is not None and h[1][i]]
+            item["offers"] = sorted(found, key=lambda o: (o["price"] is None, o["price"] or 0))
+        out.append(item)
+    return out
@@ -0,0 +1,129 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+# Bump when extraction or normalization changes what a page yields
+FORMAT = 1
+PAGE_CACHE_MB = int(os.environ.get("PAGE_CACHE_MB", "512"))
+
+class PageCache:
+    """On-disk cache of extracted page rows, keyed by a fingerprint of the page content.
+
+    Consecutive catalog versions repeat most pages byte for byte, so a page
+    whose content stream, fonts and extraction settings are unchanged reuses
+    the rows extracted last time. Rows are stored without their page number
+    (pages shift between versions). One SQLite file per directory, safe to
+    share between worker processes; least recently used pages are evicted
+    once the file passes max_mb.
+    """
+
+    def __init__(self, path: str, max_mb: int = PAGE_CACHE_MB):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.max_bytes = max_mb * 1024 * 1024
+        self.db = sqlite3.connect(os.path.join(path, "pages.sqlite3"), timeout=60)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS pages (key TEXT PRIMARY KEY, rows TEXT NOT NULL, "
+                        "size INTEGER NOT NULL, used REAL NOT NULL)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS pages_used ON pages(used)")
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.touched = []
+        self.font_digests = {}  # font object id -> digest; one document per PageCache
+
+    def get(self, key: str):
+        row = self.db.execute("SELECT rows FROM pages WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.touched.append(key)
+        return [tuple(r) for r in json.loads(row[0])]
+
+    def put(self, key: str, rows: list):
+        data = json.dumps(rows, ensure_ascii=False, separators=(",", ":"))
+        self.db.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?)", (key, data, len(data), time.time()))
+
+    def flush(self):
+        """Commit new pages and record use of the ones that were hit."""
+        if self.touched:
+            now = time.time()
+            self.db.executemany("UPDATE pages SET used = ? WHERE key = ?", [(now, k) for k in self.touched])
+            self.touched = []
+        self.db.commit()
+
+    def evict(self):
+        """Drop least recently used pages until the cache fits max_mb."""
+        self.flush()
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        cut, freed = None, 0
+        for used, size in self.db.execute("SELECT used, size FROM pages ORDER BY used"):
+            freed += size
+            cut = used
+            if total - freed <= self.max_bytes * 0.9:  # some headroom so every run does not evict
+                break
+        self.evicted += self.db.execute("DELETE FROM pages WHERE used <= ?", (cut,)).rowcount
+        self.db.commit()
+
+    def close(self):
+        self.flush()
+        self.db.close()
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "evicted": self.evicted}
+
+    # ---- fingerprints ----
+
+    def key(self, pdf, page_num: int, settings: str) -> str:
+        """Fingerprint of a page of a pdfplumber PDF or PyMuPDF document plus the extraction settings."""
+        digest = hashlib.sha256(f"{FORMAT}|{settings}|".encode("utf-8"))
+        if hasattr(pdf, "xref_object"):
+            self._fitz_page(pdf, page_num, digest)
+        else:
+            self._pdfminer_page(pdf.pages[page_num].page_obj, digest)
+        return digest.hexdigest()
+
+    def _fitz_page(self, doc, page_num, digest):
+        page = doc[page_num]
+        digest.update(repr(tuple(page.mediabox)).encode())
+        digest.update(page.read_contents())
+        for xref, name, *_ in page.get_xobjects():  # form XObjects drawn with Do
+            digest.update(f"|{name}|".encode())
+            digest.update(doc.xref_stream(xref) or b"")
+        for xref, _, ftype, basefont, name, encoding in page.get_fonts():
+            digest.update(f"|{name}|{basefont}|{ftype}|{encoding}|".encode())
+            if xref not in self.font_digests:
+                to_unicode = doc.xref_get_key(xref, "ToUnicode")
+                data = doc.xref_stream(int(to_unicode[1].split()[0])) if to_unicode[0] == "xref" else b""
+                self.font_digests[xref] = hashlib.sha256(data or b"").digest()
+            digest.update(self.font_digests[xref])
+
+    def _pdfminer_page(self, page, digest):
+        from pdfminer.pdftypes import resolve1
+        digest.update(repr(tuple(page.mediabox)).encode())
+        for stream in page.contents or ():
+            digest.update(resolve1(stream).get_data())
+        xobjects = resolve1((page.resources or {}).get("XObject")) or {}
+        for name in sorted(xobjects):
+            xobject = resolve1(xobjects[name])
+            if getattr(xobject.get("Subtype"), "name", None) == "Form":
+                digest.update(f"|{name}|".encode())
+                digest.update(xobject.get_data())
+        fonts = resolve1((page.resources or {}).get("Font")) or {}
+        for name in sorted(fonts):
+            ref = fonts[name]
+            font = resolve1(ref)
+            basefont = getattr(font.get("BaseFont"), "name", font.get("BaseFont"))
+            encoding = resolve1(font.get("Encoding"))
+            encoding = getattr(encoding, "name", None) or repr(encoding or "")  # a name or a Differences dict
+            digest.update(f"|{name}|{basefont}|{font.get('Subtype')}|{encoding}|".encode())
+            fid = getattr(ref, "objid", None) or id(font)
+            if fid not in self.font_digests:
+                to_unicode = resolve1(font.get("ToUnicode"))
+                self.font_digests[fid] = hashlib.sha256(to_unicode.get_data() if to_unicode else b"").digest()
+            digest.update(self.font_digests[fid])
@@ -0,0 +1,129 @@
+import multiprocessing
+import os
+import resource
+import time
+import metrics
+
+# Per-page budget for PDF extraction (0 disables the limit). Ingests only use a
+# watchdog when PAGE_TIMEOUT_S is set: the extra process and per-page IPC make
+# .bench/mpines_50p.pdf 7-14% slower to parse
+PAGE_TIMEOUT_S = float(os.environ.get("PAGE_TIMEOUT_S", "0"))
+PAGE_MEMORY_MB = int(os.environ.get("PAGE_MEMORY_MB", "4096"))  # address space of the extraction process
+PAGE_SLOW_S    = float(os.environ.get("PAGE_SLOW_S", "5"))      # pages slower than this are reported
+
+def _child(conn, worker, memory_mb, with_metrics):
+    if memory_mb:
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        resource.setrlimit(resource.RLIMIT_AS, (memory_mb << 20, hard))
+    metrics.enable(with_metrics)
+    metrics.registry.reset()
+    worker.open()
+    try:
+        while True:
+            request = conn.recv()
+            if request is None:
+                return
+            try:
+                result = worker.page(*request)
+            except MemoryError:
+                conn.send(("memory", None, None))
+                return  # the heap may be unusable now; the parent starts a new process
+            conn.send(("ok", result, metrics.registry.snapshot() if with_metrics else None))
+            metrics.registry.reset()
+    finally:
+        worker.close()
+
+class PageWatchdog:
+    """Extracts pages one at a time in a child process with a time and memory budget.
+
+    worker is a picklable object with open(), page(mode, page_num) and
+    close(); it runs in the child. A page whose "extract" call exceeds
+    timeout seconds, runs out of memory_mb or crashes the child is
+    quarantined: the child is killed and the page is retried in a fresh
+    one with mode "fallback" (a cheaper strategy) under the same budget.
+    A page that fails both yields nothing. The child is reused across pages
+    until it has to be killed, so the isolation costs one IPC round trip
+    per page.
+    """
+
+    def __init__(self, worker, timeout: float = PAGE_TIMEOUT_S, memory_mb: int = PAGE_MEMORY_MB,
+                 slow_seconds: float = PAGE_SLOW_S):
+        self.worker = worker
+        self.timeout = timeout or None
+        self.memory_mb = memory_mb
+        self.slow_seconds = slow_seconds
+        self.proc = None
+        self.conn = None
+        self.slow = []         # {"page", "seconds"}
+        self.quarantined = []  # {"page", "reason", "seconds", "fallback", "fallback_seconds"}
+
+    def _start(self):
+        parent, child = multiprocessing.Pipe()
+        self.proc = multiprocessing.Process(target=_child, args=(child, self.worker, self.memory_mb,
+                                                                 metrics.registry.enabled), daemon=True)
+        self.proc.start()
+        child.close()
+        self.conn = parent
+
+    def _kill(self):
+        if self.proc is not None:
+            self.proc.kill()
+            self.proc.join()
+            self.conn.close()
+            self.proc = self.conn = None
+
+    def _call(self, mode: str, page_num: int):
+        """(status, result, seconds); status is ok, timeout, memory or crash."""
+        if self.proc is None:
+            self._start()
+        t = time.perf_counter()
+        try:
+            self.conn.send((mode, page_num))
+            if not self.conn.poll(self.timeout):
+                self._kill()
+                return "timeout", None, time.perf_counter() - t
+            status, result, snapshot = self.conn.recv()
+        except (EOFError, OSError):
+            self._kill()
+            return "crash", None, time.perf_counter() - t
+        seconds = time.perf_counter() - t
+        if status != "ok":
+            self._kill()
+            return status, None, seconds
+        metrics.registry.merge(snapshot)
+        return status, result, seconds
+
+    def run(self, page_num: int):
+        """The worker's result for page_num, from the fallback if extraction blew its budget; None if both did."""
+        status, result, seconds = self._call("extract", page_num)
+        if status == "ok":
+            if seconds >= self.slow_seconds:
+                self.slow.append({"page": page_num + 1, "seconds": round(seconds, 2)})
+                metrics.count("pages_slow")
+                metrics.event("slow_pages", self.slow[-1])
+            return result
+        fb_status, result, fb_seconds = self._call("fallback", page_num)
+        record = {"page": page_num + 1, "reason": status, "seconds": round(seconds, 2),
+                  "fallback": fb_status, "fallback_seconds": round(fb_seconds, 2)}
+        self.quarantined.append(record)
+        metrics.count("pages_quarantined")
+        metrics.event("quarantined_pages", record)
+        print(f"Page {page_num + 1} quarantined ({status} after {seconds:.1f}s); "
+              f"fallback {'ok' if fb_status == 'ok' else fb_status} in {fb_seconds:.1f}s")
+        return result
+
+    def report(self) -> dict:
+        return {"slow": self.slow, "quarantined": self.quarantined}
+
+    def close(self):
+        if self.proc is not None:
+            try:
+                self.conn.send(None)
+                self.proc.join(5)
+            except OSError:
+                pass
+            if self.proc.is_alive():
+                self.proc.kill()
+                self.proc.join()
+            self.conn.close()
+            self.proc = self.conn = None
@@ -1,65 +1,25 @@
 import os
-import requests
 import io
 import pdfplumber
-import hashlib
-import re
 from datetime import date
-from supabase_io import get_client, upsert_rows
+from supabase_io import get_client, upsert_rows, download_to_file
 from utils import chunked
+from diff_ingest import DiffUploader
+from hebrew import fix_hebrew_and_years
+from catalog_row import FixedRow
+from hashing import RowHasher
 
-def fix_hebrew_and_years(text):
-    """Fix reversed Hebrew text and preserve year patterns"""
-    if not text:
-        return text
-    
-    # If pure Hebrew, just reverse
-    if all(c in 'אבגדהוזחטיכלמנסעפצקרשתןםךףץ \'"-' for c in text):
-        return text[::-1]
-    
-    # Check for reversed year patterns (like 210-80 which should be 08-012)
-    reversed_year_pattern = r'(\d{3})-(\d{2})'
-    match = re.search(reversed_year_pattern, text)
-    if match:
-        part1 = match.group(1)[::-1]  # 210 -> 012
-        part2 = match.group(2)[::-1]  # 80 -> 08
-        fixed_year = f"{part2}-{part1}"  # 08-012
-        text = text.replace(match.group(), fixed_year)
-    
-    # Handle mixed content with year at beginning
-    if re.match(r'^\d{2}-', text):
-        parts = text.split(' ', 1)
-        if len(parts) > 1:
-            year_part = parts[0]
-            rest = parts[1]
-            if any('\u0590' <= c <= '\u05FF' for c in rest):
-                rest = rest[::-1]
-            return f"{year_part} {rest}"
-    
-    # For complex mixed content
-    words = text.split()
-    fixed_words = []
-    
-    for word in words:
-        if re.match(r'^\d{2}-$', word):
-            fixed_words.append(word)
-        elif word == 'T5' or word == '5T':
-            fixed_words.append('T5')
-        elif any('\u0590' <= c <= '\u05FF' for c in word):
-            fixed_words.append(word[::-1])
-        else:
-            fixed_words.append(word)
-    
-    if any('\u0590' <= c <= '\u05FF' for c in text):
-        fixed_words.reverse()
-    
-    return ' '.join(fixed_words)
+def parse_mpines_pdf(pdf_source, recipe="fixed"):
+    """Parse M-Pines PDF (file path or bytes) with Hebrew fix and correct column mapping
 
-def parse_mpines_pdf(pdf_bytes):
-    """Parse M-Pines PDF with Hebrew fix and correct column mapping"""
+    recipe is the hashing.RECIPES entry for row_hash ("fixed_diff" for diff ingest).
+    """
     rows = []
+    version_date = date.today().isoformat()
     
-    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+    if isinstance(pdf_source, (bytes, bytearray)):
+        pdf_source = io.BytesIO(pdf_source)
+    with pdfplumber.open(pdf_source) as pdf:
         print(f"PDF has {len(pdf.pages)} pages")
         
         for page_num, page in enumerate(pdf.pages, 1):
@@ -103,22 +63,14 @@ def parse_mpines_pdf(pdf_bytes):
                         
                         # Create row with correct structure for catalog_items table
                         if pcode or cat_num_desc:
-                            row_data = {
-                                "pcode": pcode,
-                                "cat_num_desc": cat_num_desc,
-                                "price": price,
-                                "source": source,
-                                "make": make,
-                                "version_date": date.today().isoformat(),
-                                "raw_row": {"page": page_num, "data": row}
-                            }
-                            
-                            # Generate hash
-                            hash_key = f"{pcode}|{cat_num_desc}|{price}|{make}|{page_num}"
-                            row_data["row_hash"] = hashlib.sha256(hash_key.encode()).hexdigest()
-                            
-                            rows.append(row_data)
-    
+                            # Compact row; raw_row {"page", "data"} is built at serialization
+                            rows.append(FixedRow(pcode, cat_num_desc, price, source, make, version_date, page_num, row))
+    
+    # Hash all rows in one pass; identical rows would fail the upsert batch
+    hasher = RowHasher(recipe)
+    rows = hasher.apply(rows)
+    if hasher.removed:
+        print(f"Dropped {hasher.removed} duplicate rows")
     return rows
 
 def main():
@@ -126,31 +78,40 @@ def main():
     url = "https://m-pines.com/wp-content/uploads/2025/06/מחירון-06-25.pdf"
     print(f"Downloading from {url}...")
     
-    response = requests.get(url)
-    response.raise_for_status()
-    pdf_bytes = response.content
-    print(f"Downloaded {len(pdf_bytes)} bytes")
+    pdf_path, size, sha256 = download_to_file(url)
+    print(f"Downloaded {size} bytes (sha256 {sha256})")
     
     # Get supplier ID and DELETE old data
     client = get_client()
     supplier = client.table("suppliers").select("id").eq("slug", "m-pines").single().execute()
     supplier_id = supplier.data["id"] if supplier.data else None
-    
-    # DELETE old catalog items for this supplier
-    print(f"\nChecking for old catalog items...")
-    count_before = client.table("catalog_items").select("count", count="exact").eq("supplier_id", supplier_id).execute()
-    print(f"Found {count_before.count} existing items")
-    
-    if count_before.count > 0:
-        print(f"Deleting old catalog for m-pines...")
-        delete_result = client.table("catalog_items").delete().eq("supplier_id", supplier_id).execute()
-        print(f"✓ Delete completed - removed {count_before.count} old items")
+
+    if os.environ.get("INGEST_MODE", "replace") == "diff":
+        # Keep unchanged rows; only new hashes are uploaded, stale ones deleted at the end
+        differ = DiffUploader(supplier_id)
+        upload = differ.upload
     else:
-        print("No old items to delete")
+        differ = None
+        upload = lambda batch: upsert_rows("catalog_items", batch)
+
+        # DELETE old catalog items for this supplier
+        print(f"\nChecking for old catalog items...")
+        count_before = client.table("catalog_items").select("count", count="exact").eq("supplier_id", supplier_id).execute()
+        print(f"Found {count_before.count} existing items")
+
+        if count_before.count > 0:
+            print(f"Deleting old catalog for m-pines...")
+            delete_result = client.table("catalog_items").delete().eq("supplier_id", supplier_id).execute()
+            print(f"✓ Delete completed - removed {count_before.count} old items")
+        else:
+            print("No old items to delete")
     
     # Parse
     print("\nParsing PDF...")
-    rows = parse_mpines_pdf(pdf_bytes)
+    try:
+        rows = parse_mpines_pdf(pdf_path, "fixed_diff" if differ else "fixed")
+    finally:
+        os.unlink(pdf_path)
     print(f"Parsed {len(rows)} rows")
     
     if rows:
@@ -166,8 +127,8 @@ def main():
         # Upload to Supabase
         print(f"\nUploading {len(rows)} rows to Supabase...")
         total = 0
-        for batch in chunked(rows, 500):
-            count = upsert_rows("catalog_items", batch)
+        for batch in chunked(rows, int(os.environ.get("UPLOAD_BATCH_ROWS", "5000"))):
+            count = upload(batch)
             total += len(batch)
             print(f"Uploaded batch: {len(batch)} rows (total: {total})")
         
@@ -175,6 +136,9 @@ def main():
     else:
         print("No rows found to upload")
 
+    if differ:
+        differ.finish()
+
 if __name__ == "__main__":
     # Set environment variables if needed
     if not os.getenv("SUPABASE_URL"):
@@ -1,24 +1,62 @@
-import os, requests
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from utils import chunked
-from supabase_io import upsert_rows, upsert_supplier, get_client
-from suppliers import mpines
+from upload_pipeline import UploadPipeline
+from checkpoint import Checkpoint
+from hashing import RowHasher
+import staging
+import metrics
+import batching
+import pg_copy
+import suppliers
 
-SUPPLIER_MAP = {
-    "m-pines": mpines,
-}
+def main(env=None):
+    """Ingest one catalog; settings come from env (default os.environ)."""
+    # supabase_io needs SUPABASE_URL at import; other subcommands never load it
+    from supabase_io import upsert_rows, upsert_supplier, get_client, download_to_file
+    from diff_ingest import DiffUploader
+    import versioning
 
-def download_signed(signed_url: str) -> bytes:
-    r = requests.get(signed_url, timeout=600)
-    r.raise_for_status()
-    return r.content
+    env = os.environ if env is None else env
+    supplier_slug = env["SUPPLIER_SLUG"]
+    version_date  = env["VERSION_DATE"]
+    source_path   = env["SOURCE_PATH"]
+    workers       = int(env.get("PARSER_WORKERS", "1"))
+    mode          = env.get("INGEST_MODE", "replace")  # replace | diff | versioned
+    uploaders     = int(env.get("UPLOAD_WORKERS", "4"))
+    source_sha256 = env.get("SOURCE_SHA256")  # optional integrity check
+    restart       = env.get("INGEST_RESTART", "0") == "1"  # ignore checkpoints
+    stage_path    = env.get("STAGE_PATH")   # write parsed rows to this .ndjson.gz
+    parsed_path   = env.get("PARSED_PATH")  # ...and publish it to this Storage path
+    load_staged   = env.get("LOAD_STAGED")  # skip the PDF: load a staged artifact (local or Storage)
+    fix_hebrew    = env.get("FIX_HEBREW", "0") == "1"  # normalize Hebrew before upload
+    report_path   = env.get("METRICS_REPORT")  # JSON run report (stage timings, counters)
+    engine        = env.get("PARSER_ENGINE", "pdfplumber")  # pdfplumber | text | auto
+    batch_rows    = int(env.get("UPLOAD_BATCH_ROWS", "5000"))  # rows per pipeline batch (requests sized by batching.py)
+    keep_versions = int(env.get("CATALOG_KEEP_VERSIONS", "1"))  # versioned: old versions kept for rollback
+    page_cache    = env.get("PAGE_CACHE_DIR")  # reuse rows of pages unchanged since an earlier parse
+    pre_extract   = env.get("PRE_EXTRACT", "0") == "1"  # fill year/model/part family before upload
+    page_timeout  = float(env.get("PAGE_TIMEOUT_S", "0"))  # per-page extraction budget in a watchdog process (0 = off)
+    page_memory   = int(env.get("PAGE_MEMORY_MB", "4096"))  # ...and its address space limit
+    history_dir   = env.get("PRICE_HISTORY_DIR")  # keep a pcode/price partition per version_date here
+    offer_dir     = env.get("OFFER_INDEX_DIR")    # replace the supplier's cross-supplier offer partition here
 
-def main():
-    supplier_slug = os.environ["SUPPLIER_SLUG"]
-    version_date  = os.environ["VERSION_DATE"]
-    signed_url    = os.environ["SIGNED_URL"]
-    source_path   = os.environ["SOURCE_PATH"]
+    if pre_extract and not fix_hebrew:
+        print("PRE_EXTRACT=1 stores the text as parsed; enabling FIX_HEBREW")
+        fix_hebrew = True
 
-    parser = SUPPLIER_MAP[supplier_slug]
+    parser = suppliers.get(supplier_slug)  # imported lazily on first parse
+    if workers > 1 and not parser.supports("parallel"):
+        print(f"{supplier_slug} parser has no parallel mode; using 1 worker")
+        workers = 1
+    for needed, wanted in (("text_layer", engine != "pdfplumber"), ("diff", mode == "diff"),
+                           ("versioned", mode == "versioned"), ("hebrew", fix_hebrew),
+                           ("pre_extract", pre_extract)):
+        if wanted and not parser.supports(needed):
+            raise ValueError(f"{supplier_slug} parser does not support {needed}")
 
     # Get supplier
     client = get_client()
@@ -26,34 +64,289 @@ def main():
     supplier = client.table("suppliers").select("id").eq("slug", supplier_slug).single().execute()
     supplier_id = supplier.data["id"]
 
-    # DELETE old catalog items
-    print(f"Checking for old catalog items for supplier: {supplier_slug}")
-    count_before = client.table("catalog_items").select("count", count="exact").eq("supplier_id", supplier_id).execute()
-    print(f"Found {count_before.count} existing items")
-    
-    if count_before.count > 0:
-        print(f"Deleting old catalog...")
-        delete_result = client.table("catalog_items").delete().eq("supplier_id", supplier_id).execute()
-        print(f"Delete completed")
+    if mode in ("replace", "diff"):
+        # After a flip the view only shows the current version; untagged rows would be invisible
+        current_version = versioning.current(supplier_id)
+        if current_version and mode == "diff":
+            raise ValueError(f"{supplier_slug} is on catalog version {current_version}; use INGEST_MODE=versioned")
+        if current_version:
+            if not parser.supports("versioned"):
+                raise ValueError(f"{supplier_slug} is on catalog version {current_version}; its parser cannot replace it")
+            print(f"{supplier_slug} is on catalog version {current_version}; ingesting as a new version instead of replacing")
+            mode = "versioned"
+
+    if load_staged:
+        staged_file, downloaded = staging.fetch(load_staged)
+        checkpoint = None
+        resuming = False
+    else:
+        # Download (streamed to a temp file) before touching the catalog
+        signed_url = env["SIGNED_URL"]
+        print(f"Downloading from {signed_url}...")
+        with metrics.timer("download"):
+            pdf_path, size, sha256 = download_to_file(signed_url, expected_sha256=source_sha256)
+        print(f"Downloaded {size} bytes (sha256 {sha256})")
+
+        # Resume point of an interrupted run of the same source file
+        checkpoint = Checkpoint(supplier_slug, version_date, sha256, restart=restart)
+        resuming = checkpoint.resume_page > 0
+
+    catalog_version = None
+    if mode == "versioned":
+        # New rows stay invisible to catalog_items_current until the flip at the end
+        source_sha = versioning.file_sha256(staged_file) if load_staged else sha256
+        catalog_version = env.get("CATALOG_VERSION") or versioning.version_id(version_date, source_sha)
+        versioning.begin(supplier_id, catalog_version, version_date)
+
+    if mode == "diff":
+        # Keep unchanged rows; only new hashes are uploaded, stale ones deleted at the end
+        differ = DiffUploader(supplier_id)
+        upload = differ.upload
     else:
-        print("No old items to delete")
-    
-    # Download and parse new catalog
-    print(f"Downloading from {signed_url}...")
-    pdf_bytes = download_signed(signed_url)
-    print(f"Downloaded {len(pdf_bytes)} bytes")
-    
-    print(f"Parsing with {supplier_slug} parser...")
-    rows = parser.parse(pdf_bytes, supplier_slug, version_date, source_path)
-    
-    # Upload new catalog (might be empty if parser uploaded in chunks)
-    if rows:
-        total = 0
-        for batch in chunked(rows, 800):
-            total += upsert_rows("catalog_items", batch)
-        print(f"Uploaded {total} rows")
+        differ = None
+        upload = lambda batch: upsert_rows("catalog_items", batch)
+
+    if metrics.registry.enabled:
+        untimed = upload
+
+        def upload(batch):
+            # Summed over upload threads, so it can exceed wall time
+            with metrics.timer("upload"):
+                untimed(batch)
+            metrics.count("rows_uploaded", len(batch))
+
+    if mode == "replace" and not resuming:
+        # DELETE old catalog items
+        print(f"Checking for old catalog items for supplier: {supplier_slug}")
+        count_before = client.table("catalog_items").select("count", count="exact").eq("supplier_id", supplier_id).execute()
+        print(f"Found {count_before.count} existing items")
+
+        if count_before.count > 0:
+            print(f"Deleting old catalog...")
+            delete_result = client.table("catalog_items").delete().eq("supplier_id", supplier_id).execute()
+            print(f"Delete completed")
+        else:
+            print("No old items to delete")
+
+    # Parsed batches are uploaded concurrently while parsing continues;
+    # a page range is checkpointed once all of its batches are uploaded
+    pipeline = UploadPipeline(upload, workers=uploaders, on_commit=checkpoint.commit if checkpoint else None)
+
+    # Writers fed every parsed batch and closed once the whole catalog is uploaded
+    # (numpy is only needed when one is configured)
+    recorders = []
+    if (history_dir or offer_dir) and resuming:
+        print("Resumed run - not recording price history / offers of a partial catalog")
     else:
-        print("Parser handled uploading internally")
+        if history_dir:
+            import price_history
+            recorders.append(price_history.HistoryWriter(supplier_slug, version_date, history_dir))
+        if offer_dir:
+            import offer_index
+            recorders.append(offer_index.OfferWriter(supplier_slug, version_date, offer_dir))
+
+    try:
+        if load_staged:
+            print(f"Loading staged catalog {load_staged} (PDF parsing skipped)...")
+            try:
+                hasher = RowHasher("mpines_versioned") if catalog_version else None
+                for batch in staging.read_batches(staged_file, batch_rows):
+                    for row in batch:
+                        row["supplier_id"] = supplier_id  # ids can change after a DB restore
+                        if catalog_version:
+                            row["catalog_version"] = catalog_version
+                    if hasher:
+                        batch = hasher.apply(batch)  # versioned rows need versioned hashes
+                    for recorder in recorders:
+                        recorder.add(batch)
+                    pipeline.submit(batch)
+            finally:
+                if downloaded:
+                    os.unlink(staged_file)
+        else:
+            stager = None
+            if stage_path and resuming:
+                print("Resumed run - not staging a partial catalog")
+            elif stage_path:
+                stager = staging.StagingWriter(stage_path)
+
+            def submit(batch):
+                if stager:
+                    stager.write(batch)
+                for recorder in recorders:
+                    recorder.add(batch)
+                return pipeline.submit(batch)
+
+            options = {}
+            if parser.supports("stream"):
+                options["upload"] = submit
+            if parser.supports("parallel"):
+                options["workers"] = workers
+            if parser.supports("resume"):
+                options.update(start_page=checkpoint.resume_page, on_uploaded=pipeline.mark)
+            if differ:
+                options["version_in_hash"] = False
+            if fix_hebrew:
+                options["fix_hebrew"] = True
+            if parser.supports("text_layer"):
+                options["engine"] = engine
+            if catalog_version:
+                options["catalog_version"] = catalog_version
+            if page_cache and parser.supports("page_cache"):
+                options["page_cache"] = page_cache
+            if pre_extract:
+                options["pre_extract"] = True
+            if page_timeout and parser.supports("watchdog"):
+                options.update(page_timeout=page_timeout, page_memory_mb=page_memory)
+
+            print(f"Parsing with {supplier_slug} parser ({workers} workers)...")
+            try:
+                rows = parser.parse(pdf_path, supplier_slug, version_date, source_path, **options)
+            finally:
+                os.unlink(pdf_path)
+
+            # Upload new catalog (might be empty if parser uploaded in chunks)
+            if rows:
+                for batch in chunked(rows, batch_rows):
+                    submit(batch)
+            else:
+                print("Parser handled uploading internally")
+
+            if stager:
+                stager.close()
+                if parsed_path:
+                    staging.publish(stage_path, parsed_path)
+
+    except BaseException:
+        # Stop the upload threads; batches already in flight finish, so their pages stay checkpointed
+        pipeline.close()
+        raise
+
+    summary = pipeline.close()
+    print(f"Uploaded {summary['rows_uploaded']} rows")
+    batching_stats = upload_batching()
+    if report_path:
+        metrics.registry.write_report(report_path, supplier=supplier_slug, version_date=version_date,
+                                      mode=mode, workers=workers, upload_workers=uploaders, pipeline=summary,
+                                      loader="copy" if pg_copy.get_loader() else "rest", upload_batching=batching_stats)
+    if summary["failed_batches"]:
+        # Stale-row deletion in diff mode would remove rows of the failed batches
+        raise RuntimeError(f"{len(summary['failed_batches'])} batches failed to upload")
+    for recorder in recorders:
+        recorder.close()
+
+    if differ:
+        # Pages committed by the interrupted run were not seen now, so their rows look stale
+        differ.finish(delete_stale=not resuming)
+    if catalog_version:
+        versioning.flip(supplier_id, catalog_version)
+        if env.get("CATALOG_GC", "1") == "1":
+            versioning.gc_in_background(supplier_id, keep_versions)
+    if checkpoint:
+        checkpoint.done()
+
+def upload_batching() -> dict:
+    """Print and return the request sizes/latencies the batch controller settled on."""
+    from supabase_io import upload_stats
+    stats = upload_stats()
+    for table, s in stats.items():
+        print(f"Upload requests ({table}): {batching.describe(s)}")
+    return stats
+
+# Read once at import by the modules that use them (supabase_io, pg_copy,
+# batching, ...), so all catalogs of one run_many share these settings
+SHARED_SETTINGS = ("SUPABASE_URL", "SUPABASE_SERVICE_KEY", "SUPABASE_POOL_SIZE", "SUPABASE_MAX_RETRIES",
+                   "SUPABASE_GZIP", "SUPABASE_STREAM_ROWS", "DATABASE_URL", "CATALOG_LOADER", "UPLOAD_BATCH_BYTES",
+                   "UPLOAD_TARGET_SECONDS", "UPLOAD_MIN_ROWS", "UPLOAD_MAX_ROWS", "UPLOAD_START_ROWS",
+                   "ROW_HASH_MODE", "HEBREW_CACHE_SIZE", "INGEST_METRICS", "PAGE_CACHE_MB", "PAGE_SLOW_S",
+                   "CHECKPOINT_DIR")
+
+class _Budget:
+    """CPU and connection units shared by concurrent ingests; acquire() waits until both fit."""
+
+    def __init__(self, cpus: int, connections: int):
+        self.free = {"cpus": cpus, "connections": connections}
+        self.cond = threading.Condition()
+
+    def acquire(self, cpus: int, connections: int):
+        with self.cond:
+            self.cond.wait_for(lambda: self.free["cpus"] >= cpus and self.free["connections"] >= connections)
+            self.free["cpus"] -= cpus
+            self.free["connections"] -= connections
+
+    def release(self, cpus: int, connections: int):
+        with self.cond:
+            self.free["cpus"] += cpus
+            self.free["connections"] += connections
+            self.cond.notify_all()
+
+def run_many(catalogs: list, cpu_budget: int = None, conn_budget: int = None) -> list:
+    """Ingest several catalogs concurrently in this process.
+
+    Each catalog is a dict of the same settings main() reads from the
+    environment (SUPPLIER_SLUG, VERSION_DATE, SIGNED_URL, ...), layered over
+    os.environ. A catalog holds PARSER_WORKERS cpu units and UPLOAD_WORKERS
+    connection units while it runs; both are capped by the budgets
+    (INGEST_CPU_BUDGET, default all cores; INGEST_CONN_BUDGET, default the
+    Supabase pool size). Returns one {"supplier", "version_date", "ok", "error"} per catalog.
+
+    SHARED_SETTINGS are process-wide: a catalog that sets one to a value
+    other than os.environ's is rejected before anything runs.
+    """
+    for spec in catalogs:
+        differing = [k for k in SHARED_SETTINGS if k in spec and str(spec[k]) != os.environ.get(k)]
+        if differing:
+            raise ValueError(f"{spec.get('SUPPLIER_SLUG')}: {', '.join(differing)} cannot differ per catalog; "
+                             "set them in the environment of the whole run")
+    from supabase_io import POOL_SIZE
+    cpu_budget = cpu_budget or int(os.environ.get("INGEST_CPU_BUDGET", os.cpu_count() or 1))
+    conn_budget = conn_budget or int(os.environ.get("INGEST_CONN_BUDGET", POOL_SIZE))
+    budget = _Budget(cpu_budget, conn_budget)
+    report_path = os.environ.get("METRICS_REPORT")
+
+    def run_one(spec):
+        env = {**os.environ, **{k: str(v) for k, v in spec.items()}}
+        env.pop("METRICS_REPORT", None)  # metrics are process-wide; one report is written below
+        cpus = min(int(env.get("PARSER_WORKERS", "1")), cpu_budget)
+        conns = min(int(env.get("UPLOAD_WORKERS", "4")), conn_budget)
+        env.update(PARSER_WORKERS=str(cpus), UPLOAD_WORKERS=str(conns))
+        result = {"supplier": env["SUPPLIER_SLUG"], "version_date": env["VERSION_DATE"], "ok": True, "error": None}
+        budget.acquire(cpus, conns)
+        try:
+            main(env)
+        except Exception as e:
+            result.update(ok=False, error=f"{type(e).__name__}: {e}")
+            print(f"Ingest of {result['supplier']} {result['version_date']} failed: {result['error']}")
+        finally:
+            budget.release(cpus, conns)
+        return result
+
+    with ThreadPoolExecutor(max_workers=max(1, min(len(catalogs), cpu_budget)), thread_name_prefix="ingest") as pool:
+        results = list(pool.map(run_one, catalogs))
+    if report_path:
+        metrics.registry.write_report(report_path, catalogs=results, cpu_budget=cpu_budget, conn_budget=conn_budget,
+                                      upload_batching=upload_batching())
+    return results
+
+def cli(argv=None):
+    """python parser.py                    one catalog configured by environment variables
+    python parser.py multi catalogs.json   several catalogs concurrently (see run_many)
+    python parser.py suppliers             list registered supplier parsers"""
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        return main()
+    if argv[0] == "suppliers":
+        for plugin in suppliers.plugins():
+            print(json.dumps(plugin.describe()))
+        return
+    if argv[0] == "multi" and len(argv) == 2:
+        with open(argv[1], encoding="utf-8") as f:
+            results = run_many(json.load(f))
+        print(json.dumps(results, indent=2))
+        if not all(r["ok"] for r in results):
+            sys.exit(1)
+        return
+    raise SystemExit(cli.__doc__)
 
 if __name__ == "__main__":
-    main()
+    cli()
@@ -0,0 +1,170 @@
+import hashlib
+import json
+import os
+import threading
+from operator import attrgetter
+import metrics
+
+# Direct Postgres loader: COPY into a temp staging table, then one
+# INSERT ... ON CONFLICT merge per batch. Used by supabase_io.upsert_rows
+# when DATABASE_URL is set (Supabase: the session pooler or direct
+# connection string, not the transaction pooler, which drops temp tables).
+DATABASE_URL = os.environ.get("DATABASE_URL", "")
+CATALOG_LOADER = os.environ.get("CATALOG_LOADER", "auto")  # auto | copy | rest
+
+# psycopg 3 is optional; without it (or without DATABASE_URL) uploads go through PostgREST.
+# Imported by get_loader() / CopyLoader only, so the REST path never pays for it.
+psycopg = sql = None
+
+def _import_psycopg():
+    global psycopg, sql
+    if psycopg is None:
+        from psycopg import sql as _sql  # type: ignore
+        import psycopg as _psycopg  # type: ignore
+        psycopg, sql = _psycopg, _sql
+
+def _dumps(v):
+    return json.dumps(v, ensure_ascii=False, separators=(",", ":")) if v is not None else None
+
+def _records(rows, columns, json_columns):
+    """Value lists in column order; missing keys are NULL and jsonb values are encoded."""
+    json_at = [i for i, c in enumerate(columns) if c in json_columns]
+    if isinstance(rows[0], dict):
+        get = lambda r: [r.get(c) for c in columns]
+    else:
+        attrs = attrgetter(*columns) if len(columns) > 1 else (lambda r, g=attrgetter(columns[0]): (g(r),))
+
+        def get(r):
+            try:
+                return list(attrs(r))
+            except AttributeError:  # a key the first row had is unset on this one
+                return [getattr(r, c, None) for c in columns]
+    for r in rows:
+        values = get(r)
+        for i in json_at:
+            values[i] = _dumps(values[i])
+        yield values
+
+class CopyLoader:
+    """Upserts batches over one Postgres connection per thread.
+
+    Each batch is streamed with COPY into a temp table shaped like the
+    target columns and merged with a single INSERT ... ON CONFLICT DO UPDATE,
+    the same statement PostgREST runs for resolution=merge-duplicates, so
+    triggers and results match the REST path. Staging rows are dropped at
+    commit; a failed batch is rolled back as a whole. Values of json/jsonb
+    columns (looked up once per table) are encoded as JSON text.
+    """
+
+    def __init__(self, dsn: str):
+        _import_psycopg()
+        self.dsn = dsn
+        self.local = threading.local()
+        self.json_columns = {}  # table -> json/jsonb column names
+
+    def connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None or conn.closed or getattr(self.local, "pid", None) != os.getpid():
+            conn = psycopg.connect(self.dsn)
+            self.local.conn, self.local.pid, self.local.staged = conn, os.getpid(), set()
+        return conn
+
+    def _stage(self, cur, table: str, columns: tuple):
+        name = "_copy_" + hashlib.md5(f"{table}|{','.join(columns)}".encode()).hexdigest()[:12]
+        if name not in self.local.staged:
+            cur.execute(sql.SQL("CREATE TEMP TABLE IF NOT EXISTS {} ON COMMIT DELETE ROWS AS "
+                                "SELECT {} FROM {} WITH NO DATA").format(
+                sql.Identifier(name), sql.SQL(", ").join(map(sql.Identifier, columns)), sql.Identifier(table)))
+            self.local.staged.add(name)
+        return name
+
+    def _json_columns(self, cur, table: str) -> frozenset:
+        found = self.json_columns.get(table)
+        if found is None:
+            cur.execute("SELECT attname FROM pg_attribute WHERE attrelid = %s::regclass AND attnum > 0 "
+                        "AND NOT attisdropped AND atttypid IN ('json'::regtype, 'jsonb'::regtype)", (table,))
+            found = self.json_columns[table] = frozenset(r[0] for r in cur.fetchall())
+        return found
+
+    def upsert(self, table: str, rows, on_conflict: str = "row_hash") -> int:
+        if not rows:
+            return 0
+        # Columns of the first row, like a PostgREST bulk insert
+        first = rows[0].to_dict() if hasattr(rows[0], "to_dict") else rows[0]
+        columns = tuple(first)
+        keys = tuple(c.strip() for c in on_conflict.split(","))
+        cols = sql.SQL(", ").join(map(sql.Identifier, columns))
+        updates = sql.SQL(", ").join(sql.SQL("{0} = EXCLUDED.{0}").format(sql.Identifier(c))
+                                     for c in columns if c not in keys)
+        conn = self.connection()
+        try:
+            with conn.transaction(), conn.cursor() as cur:
+                stage = self._stage(cur, table, columns)
+                json_columns = self._json_columns(cur, table)
+                with metrics.timer("copy"):
+                    with cur.copy(sql.SQL("COPY {} ({}) FROM STDIN").format(sql.Identifier(stage), cols)) as copy:
+                        for values in _records(rows, columns, json_columns):
+                            copy.write_row(values)
+                with metrics.timer("merge"):
+                    # DISTINCT ON: a conflict key twice in one statement is an error
+                    cur.execute(sql.SQL("INSERT INTO {} ({}) SELECT DISTINCT ON ({}) {} FROM {} "
+                                        "ON CONFLICT ({}) DO {}").format(
+                        sql.Identifier(table), cols, sql.SQL(", ").join(map(sql.Identifier, keys)), cols,
+                        sql.Identifier(stage), sql.SQL(", ").join(map(sql.Identifier, keys)),
+                        sql.SQL("UPDATE SET ") + updates if columns != keys else sql.SQL("NOTHING")))
+        except psycopg.Error as e:
+            self.local.staged = set()  # a rolled-back CREATE TEMP TABLE is gone
+            if conn.closed or conn.broken:
+                self.local.conn = None  # reconnect on the next batch
+            raise RuntimeError(f"COPY upsert {table} failed: {e}") from e
+        metrics.count("rows_copied", len(rows))
+        return len(rows)
+
+    def close(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self.local.conn = None
+
+_lock = threading.Lock()
+_loader = None
+_checked = False
+
+def get_loader():
+    """The COPY loader, or None when uploads should use PostgREST.
+
+    CATALOG_LOADER=auto uses COPY when DATABASE_URL is set, psycopg is
+    installed and a connection succeeds; copy makes that a hard requirement;
+    rest never uses it.
+    """
+    global _loader, _checked
+    if _checked:
+        return _loader
+    with _lock:
+        if _checked:
+            return _loader
+        if CATALOG_LOADER == "rest" or (CATALOG_LOADER == "auto" and not DATABASE_URL):
+            _checked = True
+            return None
+        problem = None
+        if not DATABASE_URL:
+            problem = "DATABASE_URL is not set"
+        else:
+            try:
+                _import_psycopg()
+            except ImportError:
+                problem = "psycopg is not installed"
+        if problem is None:
+            loader = CopyLoader(DATABASE_URL)
+            try:
+                loader.connection()
+            except psycopg.Error as e:
+                problem = f"cannot connect: {e}"
+            else:
+                _loader = loader
+        if problem and CATALOG_LOADER == "copy":
+            raise RuntimeError(f"CATALOG_LOADER=copy but {problem}")
+        _checked = True
+        print("Uploading with COPY over DATABASE_URL" if _loader
+              else f"COPY loader unavailable ({problem}); using PostgREST")
+        return _loader
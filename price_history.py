@@ -0,0 +1,171 @@
+"""Local columnar price history: one compressed .npz per supplier and catalog version.
+
+Replace ingests delete the previous catalog from catalog_items, so prices of
+earlier versions only survive here. parser.py writes a partition when
+PRICE_HISTORY_DIR is set (the partition of a version_date is overwritten
+when that date is ingested again); diff() joins two partitions on pcode with NumPy
+(sorted arrays + searchsorted), which takes a fraction of a second for a
+full catalog.
+
+    python price_history.py versions m-pines
+    python price_history.py diff m-pines [old_version new_version] [--limit 50] [--min-pct 5]
+"""
+import argparse
+import json
+import os
+import re
+import tempfile
+import time
+import numpy as np
+
+PRICE_HISTORY_DIR = os.environ.get("PRICE_HISTORY_DIR", "price_history")
+FORMAT = 1
+_SAFE = re.compile(r"^[\w.\-]+$")
+
+def _path(root: str, supplier: str, version: str = None) -> str:
+    for part in (supplier, version):
+        if part is not None and not _SAFE.match(part):
+            raise ValueError(f"invalid supplier or version name: {part!r}")
+    d = os.path.join(root, supplier)
+    return d if version is None else os.path.join(d, f"{version}.npz")
+
+class HistoryWriter:
+    """Collects (pcode, price, make, cat_num_desc) of parsed rows and writes one partition on close().
+
+    Rows may be dicts or catalog_row objects. Rows without a pcode are
+    skipped; a pcode listed more than once keeps its first row (the
+    duplicates are counted in the partition's metadata).
+    """
+
+    def __init__(self, supplier: str, version: str, root: str = PRICE_HISTORY_DIR):
+        self.path = _path(root, supplier, version)
+        self.supplier = supplier
+        self.version = version
+        self.pcodes, self.prices, self.makes, self.descs = [], [], [], []
+
+    def add(self, rows):
+        for r in rows:
+            pcode = r.get("pcode")
+            if not pcode:
+                continue
+            self.pcodes.append(pcode)
+            price = r.get("price")
+            self.prices.append(np.nan if price is None else price)
+            self.makes.append(r.get("make") or "")
+            self.descs.append(r.get("cat_num_desc") or "")
+
+    def close(self) -> dict:
+        pcode = np.array(self.pcodes, dtype=str)
+        order = np.argsort(pcode, kind="stable")
+        pcode = pcode[order]
+        keep = np.ones(len(pcode), dtype=bool)
+        keep[1:] = pcode[1:] != pcode[:-1]  # first row of each pcode
+        idx = order[keep]
+        meta = {"format": FORMAT, "supplier": self.supplier, "version": self.version, "rows": len(self.pcodes),
+                "duplicates": int(len(pcode) - keep.sum()), "written": time.strftime("%Y-%m-%dT%H:%M:%S")}
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.savez_compressed(
+                f, pcode=pcode[keep], price=np.array(self.prices, dtype=np.float64)[idx],
+                make=np.array(self.makes, dtype=str)[idx], desc=np.array(self.descs, dtype=str)[idx],
+                meta=np.array(json.dumps(meta)))
+        os.replace(tmp, self.path)
+        print(f"Price history: {int(keep.sum())} pcodes written to {self.path}")
+        return meta
+
+def versions(supplier: str, root: str = PRICE_HISTORY_DIR) -> list:
+    d = _path(root, supplier)
+    if not os.path.isdir(d):
+        return []
+    return sorted(f[:-4] for f in os.listdir(d) if f.endswith(".npz"))
+
+def load(supplier: str, version: str, root: str = PRICE_HISTORY_DIR) -> dict:
+    """Arrays of one partition: pcode (sorted, unique), price, make, desc, plus meta."""
+    with np.load(_path(root, supplier, version)) as z:
+        out = {k: z[k] for k in ("pcode", "price", "make", "desc")}
+        out["meta"] = json.loads(str(z["meta"]))
+    return out
+
+def _items(part: dict, idx, **extra) -> list:
+    out = []
+    for n, i in enumerate(idx):
+        price = part["price"][i]
+        item = {"pcode": str(part["pcode"][i]), "make": str(part["make"][i]), "cat_num_desc": str(part["desc"][i]),
+                "price": None if np.isnan(price) else float(price)}
+        for k, values in extra.items():
+            v = values[n]
+            item[k] = None if np.isnan(v) else round(float(v), 2)
+        out.append(item)
+    return out
+
+def diff(supplier: str, old: str = None, new: str = None, limit: int = 50, min_pct: float = 0.0,
+         root: str = PRICE_HISTORY_DIR) -> dict:
+    """Added, removed and repriced pcodes between two versions (default: the last two).
+
+    Repriced items are those whose price changed by at least min_pct percent
+    (any change when 0), largest change first; each list is cut at limit
+    (counts are not).
+    """
+    t = time.perf_counter()
+    if old is None or new is None:
+        known = versions(supplier, root)
+        if len(known) < 2:
+            raise ValueError(f"need two price history versions for {supplier}, have {known}")
+        old, new = old or known[-2], new or known[-1]
+    a, b = load(supplier, old, root), load(supplier, new, root)
+
+    # b's pcodes located in a's sorted pcode array
+    pos = np.searchsorted(a["pcode"], b["pcode"])
+    pos_c = np.minimum(pos, len(a["pcode"]) - 1)
+    found = (a["pcode"][pos_c] == b["pcode"]) if len(a["pcode"]) else np.zeros(len(b["pcode"]), dtype=bool)
+    in_b = np.zeros(len(a["pcode"]), dtype=bool)
+    in_b[pos_c[found]] = True
+
+    ib = np.nonzero(found)[0]
+    ia = pos_c[found]
+    old_price, new_price = a["price"][ia], b["price"][ib]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = np.where(old_price > 0, (new_price - old_price) / old_price * 100.0, np.nan)
+    differs = (old_price != new_price) & ~(np.isnan(old_price) & np.isnan(new_price))
+    changed = differs & ~(np.abs(pct) < min_pct) if min_pct else differs  # unknown percentages stay in
+    ch = np.nonzero(changed)[0]
+    order = np.argsort(-np.nan_to_num(np.abs(pct[ch]), nan=np.inf), kind="stable")[:limit]
+    sel = ch[order]
+
+    added = np.nonzero(~found)[0]
+    removed = np.nonzero(~in_b)[0]
+    return {
+        "supplier": supplier,
+        "old": old,
+        "new": new,
+        "counts": {"old": len(a["pcode"]), "new": len(b["pcode"]), "added": len(added), "removed": len(removed),
+                   "repriced": len(ch), "unchanged": int(len(ib) - differs.sum())},
+        "repriced": _items(b, ib[sel], old_price=old_price[sel], delta=(new_price - old_price)[sel], pct=pct[sel]),
+        "added": _items(b, added[:limit]),
+        "removed": _items(a, removed[:limit]),
+        "took_ms": round((time.perf_counter() - t) * 1000, 2),
+    }
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="price_history", description=__doc__.splitlines()[0])
+    ap.add_argument("--dir", default=PRICE_HISTORY_DIR)
+    sub = ap.add_subparsers(dest="command", required=True)
+    sub.add_parser("versions").add_argument("supplier")
+    d = sub.add_parser("diff")
+    d.add_argument("supplier")
+    d.add_argument("versions", nargs="*", metavar="version", help="old and new (default: the last two)")
+    d.add_argument("--limit", type=int, default=50)
+    d.add_argument("--min-pct", type=float, default=0.0)
+    args = ap.parse_args(argv)
+
+    if args.command == "versions":
+        print(json.dumps(versions(args.supplier, args.dir)))
+        return
+    if len(args.versions) not in (0, 2):
+        raise SystemExit("diff takes no versions or exactly two (old new)")
+    old, new = args.versions or (None, None)
+    print(json.dumps(diff(args.supplier, old, new, args.limit, args.min_pct, args.dir), ensure_ascii=False, indent=2))
+
+if __name__ == "__main__":
+    main()
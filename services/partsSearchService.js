@@ -148,7 +148,7 @@ class PartsSearchService {
     try {
       // Start with basic query
       const { data, error } = await supabase
-        .from('catalog_items')
+        .from('catalog_items_current')
         .select(`
           id, supplier_name, pcode, cat_num_desc, price, oem,
           availability, location, comments, make, model, trim,
@@ -236,7 +236,7 @@ class PartsSearchService {
     
     try {
       const { data, error } = await supabase
-        .from('catalog_items')
+        .from('catalog_items_current')
         .select(`
           id, supplier_name, pcode, cat_num_desc, price, oem,
           availability, location, comments, make, model, trim,
@@ -302,7 +302,7 @@ class PartsSearchService {
         for (const variation of searchVariations) {
           try {
             const { data, error } = await supabase
-              .from('catalog_items')
+              .from('catalog_items_current')
               .select(`
                 id, supplier_name, pcode, cat_num_desc, price, oem,
                 availability, location, comments, make, model, trim,
@@ -412,7 +412,7 @@ class PartsSearchService {
     
     try {
       let query = supabase
-        .from('catalog_items')
+        .from('catalog_items_current')
         .select(`
           id, supplier_name, pcode, cat_num_desc, price, oem,
           availability, location, comments, make, model, trim,
@@ -104,7 +104,7 @@ class SmartPartsSearchService {
               for (const variation of variations.slice(0, 3)) {
                 try {
                   const varResult = await this.supabase
-                    .from('catalog_items')
+                    .from('catalog_items_current')
                     .select('*')
                     .ilike('cat_num_desc', `%${variation}%`)
                     .limit(15);
@@ -136,7 +136,7 @@ class SmartPartsSearchService {
           console.log('🔍 Searching Supabase for part_group/part_name...');
           try {
             // Search in catalog_items table using part_family field
-            let query = this.supabase.from('catalog_items').select('*');
+            let query = this.supabase.from('catalog_items_current').select('*');
             
             if (cleanParams.part_group) {
               query = query.ilike('part_family', `%${cleanParams.part_group}%`);
@@ -192,7 +192,7 @@ class SmartPartsSearchService {
               for (const variation of makeVariations.slice(0, 3)) {
                 try {
                   const varResult = await this.supabase
-                    .from('catalog_items')
+                    .from('catalog_items_current')
                     .select('*')
                     .ilike('make', `%${variation}%`)
                     .limit(15);
@@ -221,7 +221,7 @@ class SmartPartsSearchService {
         if (cleanParams.oem) {
           try {
             const result = await this.supabase
-              .from('catalog_items')
+              .from('catalog_items_current')
               .select('*')
               .ilike('pcode', `%${cleanParams.oem}%`)
               .limit(30);
@@ -240,7 +240,7 @@ class SmartPartsSearchService {
         if (!searchPerformed) {
           try {
             const result = await this.supabase
-              .from('catalog_items')
+              .from('catalog_items_current')
               .select('*')
               .order('created_at', { ascending: false })
               .limit(20);
@@ -403,7 +403,7 @@ class SmartPartsSearchService {
       console.log(`🔍 Client-side Hebrew search for: "${searchTerm}"`);
       
       const allDataResult = await this.supabase
-        .from('catalog_items')
+        .from('catalog_items_current')
         .select('*')
         .limit(1000); // Limit to prevent huge downloads
         
@@ -0,0 +1,55 @@
+import gzip
+import json
+import os
+from typing import Tuple
+from catalog_row import json_default
+
+class StagingWriter:
+    """Stream parsed rows into a gzip-compressed NDJSON artifact, one row per line."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.rows = 0
+        self.f = gzip.open(path, "wt", encoding="utf-8", compresslevel=6)
+
+    def write(self, rows):
+        for r in rows:
+            self.f.write(json.dumps(r, ensure_ascii=False, default=json_default))
+            self.f.write("\n")
+        self.rows += len(rows)
+
+    def close(self):
+        self.f.close()
+        print(f"Staged {self.rows} rows to {self.path} ({os.path.getsize(self.path)} bytes)")
+
+def read_batches(path: str, batch_size: int = 800):
+    """Yield lists of row dicts from a staged artifact without loading it whole."""
+    batch = []
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                batch.append(json.loads(line))
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+    if batch:
+        yield batch
+
+def publish(local_path: str, storage_path: str):
+    """Upload a staged artifact to Storage, e.g. vendor_parsed/m-pines/2025-06.ndjson.gz"""
+    from supabase_io import storage_put
+    with open(local_path, "rb") as f:
+        storage_put(storage_path, f, "application/gzip")
+    print(f"Published staged catalog to {storage_path}")
+
+def fetch(staged: str) -> Tuple[str, bool]:
+    """Return a local path for a staged artifact given a local file or a Storage path.
+
+    The bool is True when the file was downloaded and should be deleted by the caller.
+    """
+    if os.path.exists(staged):
+        return staged, False
+    from supabase_io import sign_object, download_to_file
+    path, size, _ = download_to_file(sign_object(staged), suffix=".ndjson.gz")
+    print(f"Downloaded staged catalog {staged} ({size} bytes)")
+    return path, True
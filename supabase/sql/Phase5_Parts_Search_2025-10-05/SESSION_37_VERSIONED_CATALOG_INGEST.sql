@@ -0,0 +1,663 @@
+-- ============================================================================
+-- SESSION 37: Versioned catalog ingest (atomic swap instead of delete + reload)
+-- Date: 2025-10-18
+--
+-- Problem:
+-- parser.py deletes a supplier's catalog_items and then uploads the new
+-- catalog over several minutes. Searches during that window see a partial
+-- catalog.
+--
+-- Solution:
+-- 1. Every versioned ingest tags its rows with catalog_items.catalog_version.
+-- 2. catalog_current_version holds one pointer per supplier. Readers go
+--    through the catalog_items_current view, which only shows the current
+--    version. Legacy rows with catalog_version NULL stay visible until the
+--    supplier's first flip.
+-- 3. flip_catalog_version() moves the pointer in one statement.
+--    rollback_catalog_version() moves it back to the previous version.
+-- 4. gc_catalog_versions() deletes retired versions in bounded batches, so
+--    it can run in the background after a flip.
+-- 5. smart_parts_search and the search_catalog_hebrew* functions read
+--    catalog_items_current, and so do the services/*.js table reads.
+--
+-- Used by: INGEST_MODE=versioned in parser.py, and versioning.py for
+-- flip/rollback/gc from the command line.
+-- ============================================================================
+
+-- 1. Version tag on catalog rows
+ALTER TABLE catalog_items
+  ADD COLUMN IF NOT EXISTS catalog_version TEXT;
+
+CREATE INDEX IF NOT EXISTS idx_catalog_items_supplier_version
+  ON catalog_items(supplier_id, catalog_version);
+
+COMMENT ON COLUMN catalog_items.catalog_version IS 'Ingest version id; NULL for rows loaded before versioned ingest';
+
+-- 2. Version registry and current pointer
+CREATE TABLE IF NOT EXISTS catalog_versions (
+  supplier_id     UUID NOT NULL REFERENCES suppliers(id) ON DELETE CASCADE,
+  catalog_version TEXT NOT NULL,
+  version_date    DATE,
+  status          TEXT NOT NULL DEFAULT 'loading' CHECK (status IN ('loading', 'current', 'retired', 'deleted')),
+  row_count       INTEGER,
+  created_at      TIMESTAMPTZ NOT NULL DEFAULT now(),
+  activated_at    TIMESTAMPTZ,
+  PRIMARY KEY (supplier_id, catalog_version)
+);
+
+CREATE TABLE IF NOT EXISTS catalog_current_version (
+  supplier_id     UUID PRIMARY KEY REFERENCES suppliers(id) ON DELETE CASCADE,
+  catalog_version TEXT NOT NULL,
+  previous_version TEXT,
+  flipped_at      TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- 3. Reader view
+CREATE OR REPLACE VIEW catalog_items_current AS
+SELECT ci.*
+FROM catalog_items ci
+LEFT JOIN catalog_current_version cv ON cv.supplier_id = ci.supplier_id
+WHERE ci.catalog_version IS NOT DISTINCT FROM cv.catalog_version;
+
+COMMENT ON VIEW catalog_items_current IS 'catalog_items of each supplier''s current version (all legacy rows before the first flip)';
+
+-- 4. Functions (called over PostgREST /rpc with the service key)
+
+CREATE OR REPLACE FUNCTION begin_catalog_version(p_supplier_id UUID, p_version TEXT, p_version_date DATE DEFAULT NULL)
+RETURNS TEXT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_status TEXT;
+BEGIN
+  INSERT INTO catalog_versions(supplier_id, catalog_version, version_date)
+  VALUES (p_supplier_id, p_version, p_version_date)
+  ON CONFLICT (supplier_id, catalog_version) DO UPDATE
+    SET status = 'loading'
+    WHERE catalog_versions.status = 'deleted';  -- re-ingest of a garbage-collected version
+
+  SELECT status INTO v_status FROM catalog_versions
+  WHERE supplier_id = p_supplier_id AND catalog_version = p_version;
+  RETURN v_status;  -- 'loading' for a new or resumed version, 'current'/'retired' if it exists
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION flip_catalog_version(p_supplier_id UUID, p_version TEXT)
+RETURNS TEXT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_previous TEXT;
+  v_rows INTEGER;
+BEGIN
+  SELECT count(*) INTO v_rows FROM catalog_items
+  WHERE supplier_id = p_supplier_id AND catalog_version = p_version;
+  IF v_rows = 0 THEN
+    RAISE EXCEPTION 'catalog version % of supplier % has no rows', p_version, p_supplier_id;
+  END IF;
+
+  SELECT catalog_version INTO v_previous FROM catalog_current_version
+  WHERE supplier_id = p_supplier_id FOR UPDATE;
+
+  INSERT INTO catalog_current_version(supplier_id, catalog_version, previous_version, flipped_at)
+  VALUES (p_supplier_id, p_version, v_previous, now())
+  ON CONFLICT (supplier_id) DO UPDATE
+    SET catalog_version = EXCLUDED.catalog_version,
+        previous_version = EXCLUDED.previous_version,
+        flipped_at = now();
+
+  UPDATE catalog_versions SET status = 'retired'
+  WHERE supplier_id = p_supplier_id AND status = 'current' AND catalog_version <> p_version;
+
+  INSERT INTO catalog_versions(supplier_id, catalog_version, status, row_count, activated_at)
+  VALUES (p_supplier_id, p_version, 'current', v_rows, now())
+  ON CONFLICT (supplier_id, catalog_version) DO UPDATE
+    SET status = 'current', row_count = v_rows, activated_at = now();
+
+  RETURN v_previous;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION rollback_catalog_version(p_supplier_id UUID, p_version TEXT DEFAULT NULL)
+RETURNS TEXT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_target TEXT := p_version;
+BEGIN
+  IF v_target IS NULL THEN
+    SELECT previous_version INTO v_target FROM catalog_current_version WHERE supplier_id = p_supplier_id;
+  END IF;
+  IF v_target IS NULL THEN
+    RAISE EXCEPTION 'no previous catalog version to roll back to for supplier %', p_supplier_id;
+  END IF;
+  PERFORM flip_catalog_version(p_supplier_id, v_target);
+  RETURN v_target;
+END;
+$$;
+
+-- Deletes rows of versions that are neither current nor among the p_keep most
+-- recently retired (kept for rollback), at most p_batch rows per call; legacy
+-- NULL-version rows go once the supplier has a current version, and abandoned
+-- 'loading' versions after p_stale_after. Call until it returns 0.
+CREATE OR REPLACE FUNCTION gc_catalog_versions(p_supplier_id UUID, p_keep INT DEFAULT 1, p_batch INT DEFAULT 20000,
+                                               p_stale_after INTERVAL DEFAULT '1 day')
+RETURNS INTEGER
+LANGUAGE plpgsql
+SET statement_timeout = '120s'
+AS $$
+DECLARE
+  v_current TEXT;
+  v_keep TEXT[];
+  v_deleted INTEGER;
+BEGIN
+  SELECT catalog_version INTO v_current FROM catalog_current_version WHERE supplier_id = p_supplier_id;
+  IF v_current IS NULL THEN
+    RETURN 0;  -- never flipped: everything visible is still legacy data
+  END IF;
+
+  SELECT array_agg(catalog_version) INTO v_keep FROM (
+    SELECT catalog_version FROM catalog_versions
+    WHERE supplier_id = p_supplier_id AND status = 'retired'
+    ORDER BY activated_at DESC NULLS LAST
+    LIMIT p_keep
+  ) k;
+  v_keep := coalesce(v_keep, ARRAY[]::TEXT[]) || v_current
+            || coalesce((SELECT array_agg(catalog_version) FROM catalog_versions
+                         WHERE supplier_id = p_supplier_id AND status = 'loading'
+                           AND created_at > now() - p_stale_after), ARRAY[]::TEXT[]);
+
+  DELETE FROM catalog_items
+  WHERE ctid IN (
+    SELECT ctid FROM catalog_items
+    WHERE supplier_id = p_supplier_id
+      AND (catalog_version IS NULL OR catalog_version <> ALL (v_keep))
+    LIMIT p_batch
+  );
+  GET DIAGNOSTICS v_deleted = ROW_COUNT;
+
+  IF v_deleted < p_batch THEN
+    UPDATE catalog_versions SET status = 'deleted'
+    WHERE supplier_id = p_supplier_id AND catalog_version <> ALL (v_keep) AND status <> 'deleted';
+  END IF;
+  RETURN v_deleted;
+END;
+$$;
+
+-- 5. Readers: every search function reads the current version only.
+-- Definitions are the deployed ones (smart_parts_search from
+-- SESSION_35_FINAL_FIX_DATE_TYPE.sql, search_catalog_hebrew* from the function
+-- dump in tests.md) with catalog_items replaced by catalog_items_current.
+-- The services/*.js table reads go through the view as well.
+
+GRANT SELECT ON catalog_items_current TO authenticated, anon;
+
+CREATE OR REPLACE FUNCTION smart_parts_search(
+    make_param TEXT DEFAULT NULL,
+    model_param TEXT DEFAULT NULL,
+    free_query_param TEXT DEFAULT NULL,
+    part_param TEXT DEFAULT NULL,
+    oem_param TEXT DEFAULT NULL,
+    family_param TEXT DEFAULT NULL,
+    limit_results INT DEFAULT 50,
+    car_plate TEXT DEFAULT NULL,
+    engine_code_param TEXT DEFAULT NULL,
+    engine_type_param TEXT DEFAULT NULL,
+    engine_volume_param TEXT DEFAULT NULL,
+    model_code_param TEXT DEFAULT NULL,
+    quantity_param INT DEFAULT NULL,
+    source_param TEXT DEFAULT NULL,
+    trim_param TEXT DEFAULT NULL,
+    vin_number_param TEXT DEFAULT NULL,
+    year_param TEXT DEFAULT NULL
+)
+RETURNS TABLE(
+    id UUID,
+    cat_num_desc TEXT,
+    supplier_name TEXT,
+    pcode TEXT,
+    price NUMERIC,
+    oem TEXT,
+    make TEXT,
+    model TEXT,
+    part_family TEXT,
+    side_position TEXT,
+    version_date TEXT,  -- Column 11 - must be TEXT
+    availability TEXT,
+    extracted_year TEXT,
+    model_display TEXT,
+    match_score INTEGER,
+    year_from INTEGER,
+    year_to INTEGER,
+    search_message TEXT
+)
+LANGUAGE plpgsql
+SET statement_timeout = '60s'
+AS $$
+DECLARE
+    result_count INT := 0;
+    where_parts TEXT[] := ARRAY[]::TEXT[];
+    final_where TEXT;
+    final_query TEXT;
+    
+    make_terms TEXT[];
+    model_terms TEXT[];
+    part_terms TEXT[];
+    free_terms TEXT[];
+    year_formats TEXT[];
+    
+    current_search TEXT;
+    normalized_search TEXT;
+    search_message TEXT := '';
+    i INT;
+BEGIN
+    -- ============================================================================
+    -- REQUIREMENT: Either part_param OR free_query_param must be provided
+    -- ============================================================================
+    
+    IF (part_param IS NULL OR part_param = '') AND (free_query_param IS NULL OR free_query_param = '') THEN
+        RETURN;
+    END IF;
+    
+    -- ============================================================================
+    -- STEP 1: MAKE (STRICT - must match, field cascade)
+    -- ============================================================================
+    
+    IF make_param IS NOT NULL AND make_param != '' THEN
+        make_terms := string_to_array(make_param, ' ');
+        
+        where_parts := array_append(where_parts,
+            format('ci.make ILIKE %L', '%' || make_param || '%'));
+        
+        EXECUTE 'SELECT COUNT(*) FROM catalog_items_current ci WHERE ' || array_to_string(where_parts, ' AND ') INTO result_count;
+        
+        IF result_count = 0 AND array_length(make_terms, 1) > 1 THEN
+            where_parts := where_parts[1:array_length(where_parts,1)-1];
+            
+            FOR i IN 1..array_length(make_terms, 1) LOOP
+                current_search := make_terms[i];
+                where_parts := array_append(where_parts,
+                    format('ci.make ILIKE %L', '%' || current_search || '%'));
+                
+                EXECUTE 'SELECT COUNT(*) FROM catalog_items_current ci WHERE ' || array_to_string(where_parts, ' AND ') INTO result_count;
+                
+                IF result_count > 0 THEN
+                    search_message := 'יצרן: ' || current_search;
+                    EXIT;
+                END IF;
+                where_parts := where_parts[1:array_length(where_parts,1)-1];
+            END LOOP;
+        ELSE
+            search_message := 'יצרן: ' || make_param;
+        END IF;
+        
+        IF result_count = 0 THEN
+            RETURN;
+        END IF;
+    END IF;
+    
+    -- ============================================================================
+    -- STEP 2: MODEL (parameter cascade - continue without if not found)
+    -- ============================================================================
+    
+    IF model_param IS NOT NULL AND model_param != '' THEN
+        model_terms := string_to_array(model_param, ' ');
+        
+        where_parts := array_append(where_parts,
+            format('ci.model ILIKE %L', '%' || model_param || '%'));
+        
+        EXECUTE 'SELECT COUNT(*) FROM catalog_items_current ci WHERE ' || array_to_string(where_parts, ' AND ') INTO result_count;
+        
+        IF result_count = 0 AND array_length(model_terms, 1) > 1 THEN
+            where_parts := where_parts[1:array_length(where_parts,1)-1];
+            
+            FOR i IN 1..array_length(model_terms, 1) LOOP
+                current_search := model_terms[i];
+                where_parts := array_append(where_parts,
+                    format('ci.model ILIKE %L', '%' || current_search || '%'));
+                
+                EXECUTE 'SELECT COUNT(*) FROM catalog_items_current ci WHERE ' || array_to_string(where_parts, ' AND ') INTO result_count;
+                
+                IF result_count > 0 THEN
+                    search_message := search_message || ', דגם: ' || current_search;
+                    EXIT;
+                END IF;
+                where_parts := where_parts[1:array_length(where_parts,1)-1];
+            END LOOP;
+        ELSE
+            search_message := search_message || ', דגם: ' || model_param;
+        END IF;
+        
+        IF result_count = 0 THEN
+            where_parts := where_parts[1:array_length(where_parts,1)-1];
+            search_message := search_message || ' (דגם לא נמצא)';
+        END IF;
+    END IF;
+    
+    -- ============================================================================
+    -- STEP 3: FAMILY (preferred) - field cascade
+    -- ============================================================================
+    
+    IF family_param IS NOT NULL AND family_param != '' THEN
+        where_parts := array_append(where_parts,
+            format('ci.part_family ILIKE %L', '%' || family_param || '%'));
+        
+        EXECUTE 'SELECT COUNT(*) FROM catalog_items_current ci WHERE ' || array_to_string(where_parts, ' AND ') INTO result_count;
+        
+        IF result_count > 0 THEN
+            search_message := search_message || ', משפחה: ' || family_param;
+        ELSE
+            where_parts := where_parts[1:array_length(where_parts,1)-1];
+        END IF;
+    END IF;
+    
+    -- ============================================================================
+    -- STEP 4: PART NAME (if provided) - field cascade with normalization
+    -- ============================================================================
+    
+    IF part_param IS NOT NULL AND part_param != '' THEN
+        part_terms := string_to_array(part_param, ' ');
+        
+        where_parts := array_append(where_parts,
+            format('ci.cat_num_desc ILIKE %L', '%' || part_param || '%'));
+        
+        EXECUTE 'SELECT COUNT(*) FROM catalog_items_current ci WHERE ' || array_to_string(where_parts, ' AND ') INTO result_count;
+        
+        IF result_count = 0 AND array_length(part_terms, 1) > 1 THEN
+            where_parts := where_parts[1:array_length(where_parts,1)-1];
+            
+            FOR i IN 1..array_length(part_terms, 1) LOOP
+                current_search := part_terms[i];
+                
+                normalized_search := current_search;
+                normalized_search := replace(normalized_search, 'י', '[יאו]');
+                normalized_search := replace(normalized_search, 'ו', '[ווי]');
+                normalized_search := replace(normalized_search, 'א', '[איו]');
+                
+                where_parts := array_append(where_parts,
+                    format('ci.cat_num_desc ~* %L', normalized_search));
+                
+                EXECUTE 'SELECT COUNT(*) FROM catalog_items_current ci WHERE ' || array_to_string(where_parts, ' AND ') INTO result_count;
+                
+                IF result_count > 0 THEN
+                    search_message := search_message || ', חלק: ' || current_search;
+                    EXIT;
+                END IF;
+                where_parts := where_parts[1:array_length(where_parts,1)-1];
+            END LOOP;
+        ELSE
+            search_message := search_message || ', חלק: ' || part_param;
+        END IF;
+    END IF;
+    
+    -- ============================================================================
+    -- STEP 5: FREE QUERY (if provided and no part) - field cascade
+    -- ============================================================================
+    
+    IF free_query_param IS NOT NULL AND free_query_param != '' AND (part_param IS NULL OR part_param = '') THEN
+        free_terms := string_to_array(free_query_param, ' ');
+        
+        where_parts := array_append(where_parts,
+            format('ci.cat_num_desc ILIKE %L', '%' || free_query_param || '%'));
+        
+        EXECUTE 'SELECT COUNT(*) FROM catalog_items_current ci WHERE ' || array_to_string(where_parts, ' AND ') INTO result_count;
+        
+        IF result_count = 0 AND array_length(free_terms, 1) > 1 THEN
+            where_parts := where_parts[1:array_length(where_parts,1)-1];
+            
+            FOR i IN 1..array_length(free_terms, 1) LOOP
+                current_search := free_terms[i];
+                where_parts := array_append(where_parts,
+                    format('ci.cat_num_desc ILIKE %L', '%' || current_search || '%'));
+                
+                EXECUTE 'SELECT COUNT(*) FROM catalog_items_current ci WHERE ' || array_to_string(where_parts, ' AND ') INTO result_count;
+                
+                IF result_count > 0 THEN
+                    search_message := search_message || ', חיפוש חופשי: ' || current_search;
+                    EXIT;
+                END IF;
+                where_parts := where_parts[1:array_length(where_parts,1)-1];
+            END LOOP;
+        ELSE
+            search_message := search_message || ', חיפוש חופשי: ' || free_query_param;
+        END IF;
+    END IF;
+    
+    -- ============================================================================
+    -- STEP 6: OEM (if provided) - exact match
+    -- ============================================================================
+    
+    IF oem_param IS NOT NULL AND oem_param != '' THEN
+        where_parts := array_append(where_parts,
+            format('ci.oem ILIKE %L', '%' || oem_param || '%'));
+        search_message := search_message || ', OEM: ' || oem_param;
+    END IF;
+    
+    -- ============================================================================
+    -- FINAL QUERY: Execute with all filters
+    -- ============================================================================
+    
+    IF array_length(where_parts, 1) = 0 THEN
+        RETURN;
+    END IF;
+    
+    final_where := array_to_string(where_parts, ' AND ');
+    
+    final_query := format('
+        SELECT 
+            ci.id,
+            ci.cat_num_desc,
+            ci.supplier_name,
+            ci.pcode,
+            ci.price,
+            ci.oem,
+            ci.make,
+            ci.model,
+            ci.part_family,
+            ci.side_position,
+            ci.version_date::TEXT,
+            ci.availability,
+            ci.extracted_year,
+            ci.model_display,
+            1 as match_score,
+            ci.year_from,
+            ci.year_to,
+            %L as search_message
+        FROM catalog_items_current ci
+        WHERE %s
+        ORDER BY 
+            ci.price ASC NULLS LAST,
+            ci.version_date DESC NULLS LAST
+        LIMIT %s
+    ', search_message, final_where, limit_results);
+    
+    RETURN QUERY EXECUTE final_query;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION smart_parts_search TO authenticated, anon;
+
+CREATE OR REPLACE FUNCTION public.search_catalog_hebrew(search_term text)
+ RETURNS TABLE(id uuid, pcode text, cat_num_desc text, part_family text, make text, model text, year_from integer, year_to integer, price numeric, oem text, supplier_name text, availability text, location text, comments text, version_date date, created_at timestamp with time zone, source text)
+ LANGUAGE plpgsql
+AS $$
+BEGIN
+  -- Normalize search term: remove special characters but keep Hebrew
+  search_term := TRIM(REGEXP_REPLACE(search_term, '[^\w\s\u0590-\u05FF]', '', 'g'));
+  
+  -- Return early if search term is empty
+  IF LENGTH(search_term) = 0 THEN
+    RETURN;
+  END IF;
+  
+  RETURN QUERY
+  SELECT 
+    c.id,
+    c.pcode,
+    c.cat_num_desc,
+    c.part_family,
+    c.make,
+    c.model,
+    c.year_from,
+    c.year_to,
+    c.price,
+    c.oem,
+    c.supplier_name,
+    c.availability,
+    c.location,
+    c.comments,
+    c.version_date,
+    c.created_at,
+    c.source
+  FROM catalog_items_current c
+  WHERE 
+    -- Hebrew text fields with ILIKE for case-insensitive search
+    c.cat_num_desc ILIKE '%' || search_term || '%'
+    OR c.part_family ILIKE '%' || search_term || '%'
+    OR c.make ILIKE '%' || search_term || '%'
+    OR c.model ILIKE '%' || search_term || '%'
+    OR c.supplier_name ILIKE '%' || search_term || '%'
+    OR c.comments ILIKE '%' || search_term || '%'
+    -- Non-Hebrew fields (exact/partial match)
+    OR c.pcode ILIKE '%' || search_term || '%'
+    OR c.oem ILIKE '%' || search_term || '%'
+    OR c.location ILIKE '%' || search_term || '%'
+    OR c.availability ILIKE '%' || search_term || '%'
+  ORDER BY 
+    -- Prioritize exact matches, then starts with, then contains
+    CASE 
+      WHEN c.part_family = search_term THEN 1
+      WHEN c.part_family ILIKE search_term || '%' THEN 2
+      WHEN c.cat_num_desc = search_term THEN 3
+      WHEN c.cat_num_desc ILIKE search_term || '%' THEN 4
+      WHEN c.make = search_term THEN 5
+      WHEN c.make ILIKE search_term || '%' THEN 6
+      WHEN c.pcode = search_term THEN 7
+      WHEN c.oem = search_term THEN 8
+      ELSE 9
+    END,
+    -- Secondary sort by price (nulls last)
+    c.price ASC NULLS LAST,
+    -- Tertiary sort by creation date (newest first)
+    c.created_at DESC NULLS LAST
+  LIMIT 100; -- Add reasonable limit
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.search_catalog_hebrew_filtered(search_term text, filter_make text DEFAULT NULL::text, filter_model text DEFAULT NULL::text, max_results integer DEFAULT 50)
+ RETURNS TABLE(id uuid, pcode text, cat_num_desc text, part_family text, make text, model text, year_from integer, year_to integer, price numeric, oem text, supplier_name text, availability text, location text, comments text, version_date date, created_at timestamp with time zone, source text, relevance_score integer)
+ LANGUAGE plpgsql
+AS $$
+BEGIN
+  -- Normalize search term
+  search_term := TRIM(REGEXP_REPLACE(search_term, '[^\w\s\u0590-\u05FF]', '', 'g'));
+  
+  -- Normalize filters
+  IF filter_make IS NOT NULL THEN
+    filter_make := TRIM(filter_make);
+  END IF;
+  
+  IF filter_model IS NOT NULL THEN
+    filter_model := TRIM(filter_model);
+  END IF;
+  
+  RETURN QUERY
+  SELECT 
+    c.id,
+    c.pcode,
+    c.cat_num_desc,
+    c.part_family,
+    c.make,
+    c.model,
+    c.year_from,
+    c.year_to,
+    c.price,
+    c.oem,
+    c.supplier_name,
+    c.availability,
+    c.location,
+    c.comments,
+    c.version_date,
+    c.created_at,
+    c.source,
+    -- Calculate relevance score
+    (CASE 
+      WHEN c.part_family = search_term THEN 10
+      WHEN c.part_family ILIKE search_term || '%' THEN 9
+      WHEN c.cat_num_desc = search_term THEN 8
+      WHEN c.cat_num_desc ILIKE search_term || '%' THEN 7
+      WHEN c.make = search_term THEN 6
+      WHEN c.make ILIKE search_term || '%' THEN 5
+      WHEN c.pcode = search_term THEN 4
+      WHEN c.oem = search_term THEN 3
+      WHEN c.part_family ILIKE '%' || search_term || '%' THEN 2
+      ELSE 1
+    END)::INTEGER AS relevance_score
+  FROM catalog_items_current c
+  WHERE 
+    -- Text search conditions
+    (LENGTH(search_term) = 0 OR (
+      c.cat_num_desc ILIKE '%' || search_term || '%'
+      OR c.part_family ILIKE '%' || search_term || '%'
+      OR c.make ILIKE '%' || search_term || '%'
+      OR c.model ILIKE '%' || search_term || '%'
+      OR c.supplier_name ILIKE '%' || search_term || '%'
+      OR c.comments ILIKE '%' || search_term || '%'
+      OR c.pcode ILIKE '%' || search_term || '%'
+      OR c.oem ILIKE '%' || search_term || '%'
+      OR c.location ILIKE '%' || search_term || '%'
+      OR c.availability ILIKE '%' || search_term || '%'
+    ))
+    -- Make filter
+    AND (filter_make IS NULL OR c.make ILIKE '%' || filter_make || '%')
+    -- Model filter
+    AND (filter_model IS NULL OR c.model ILIKE '%' || filter_model || '%')
+  ORDER BY 
+    relevance_score DESC,
+    c.price ASC NULLS LAST,
+    c.created_at DESC NULLS LAST
+  LIMIT max_results;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.search_catalog_hebrew_simple(search_term text, max_results integer DEFAULT 20)
+ RETURNS SETOF catalog_items
+ LANGUAGE plpgsql
+AS $$
+BEGIN
+  -- Normalize search term
+  search_term := TRIM(REGEXP_REPLACE(search_term, '[^\w\s\u0590-\u05FF]', '', 'g'));
+  
+  RETURN QUERY
+  SELECT c.* FROM catalog_items c
+  LEFT JOIN catalog_current_version cv ON cv.supplier_id = c.supplier_id
+  WHERE c.catalog_version IS NOT DISTINCT FROM cv.catalog_version AND (
+    c.cat_num_desc ILIKE '%' || search_term || '%'
+    OR c.part_family ILIKE '%' || search_term || '%'
+    OR c.make ILIKE '%' || search_term || '%'
+    OR c.model ILIKE '%' || search_term || '%'
+    OR c.supplier_name ILIKE '%' || search_term || '%'
+    OR c.pcode ILIKE '%' || search_term || '%'
+    OR c.oem ILIKE '%' || search_term || '%'
+  )
+  ORDER BY 
+    CASE 
+      WHEN c.part_family = search_term THEN 1
+      WHEN c.part_family ILIKE search_term || '%' THEN 2
+      WHEN c.cat_num_desc = search_term THEN 3
+      ELSE 4
+    END,
+    c.price ASC NULLS LAST
+  LIMIT max_results;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION search_catalog_hebrew(TEXT) TO authenticated, anon;
+GRANT EXECUTE ON FUNCTION search_catalog_hebrew_filtered(TEXT, TEXT, TEXT, INTEGER) TO authenticated, anon;
+GRANT EXECUTE ON FUNCTION search_catalog_hebrew_simple(TEXT, INTEGER) TO authenticated, anon;
+
+-- Verification (run after migration)
+-- SELECT * FROM catalog_current_version;
+-- SELECT supplier_id, catalog_version, status, row_count, activated_at FROM catalog_versions ORDER BY created_at DESC;
+-- SELECT p.proname FROM pg_proc p JOIN pg_namespace n ON n.oid = p.pronamespace
+--   WHERE n.nspname = 'public' AND pg_get_functiondef(p.oid) ~ 'FROM catalog_items (c|ci)\M';  -- expect no search functions
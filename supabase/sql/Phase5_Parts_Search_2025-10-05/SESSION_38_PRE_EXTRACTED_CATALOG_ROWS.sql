@@ -0,0 +1,108 @@
+-- ============================================================================
+-- SESSION 38: Skip trigger extraction for rows extracted by the ingest
+-- Date: 2025-10-20
+--
+-- Problem:
+-- Every catalog_items insert runs the extraction triggers row by row:
+-- year range, side, front/rear, part name, part family (a chain of regex
+-- CASE branches), make normalization, then model and year again. On a full
+-- catalog load this is a large share of the upsert time.
+--
+-- Solution:
+-- 1. New column pre_extracted. With PRE_EXTRACT=1 the ingest fills the
+--    derived columns in Python (extraction.py, an exact port of the
+--    deployed auto_extract_catalog_data + normalize_make,
+--    auto_fix_and_extract and extract_model_and_year, in firing order)
+--    and sends pre_extracted = true.
+-- 2. The triggers of those three functions, and the Hebrew reversal
+--    triggers, get WHEN (NOT NEW.pre_extracted), so PostgreSQL does not
+--    even call them for those rows. PRE_EXTRACT implies FIX_HEBREW: the
+--    text arrives already fixed. Any other trigger (e.g.
+--    trigger_01_set_supplier_name) keeps running.
+-- 3. a_00_reset_pre_extracted (sorts first, BEFORE triggers fire by name)
+--    clears the flag and every column the ported functions fill when
+--    cat_num_desc or make of a pre-extracted row is edited, so the
+--    triggers derive them again.
+--
+-- Rows loaded without PRE_EXTRACT are unchanged: the column defaults to
+-- false and every trigger runs as before.
+--
+-- Keep extraction.py in sync with the trigger functions listed in step 2;
+-- tests/test_extraction_parity.py compares it with the deployed functions.
+-- ============================================================================
+
+-- 1. Flag column
+ALTER TABLE catalog_items
+  ADD COLUMN IF NOT EXISTS pre_extracted BOOLEAN NOT NULL DEFAULT false;
+
+COMMENT ON COLUMN catalog_items.pre_extracted IS 'Derived columns were filled by the ingest; extraction triggers skip the row';
+
+-- 2. Gate the ported extraction triggers and the Hebrew reversal triggers on the flag
+--    (whatever names they are deployed under; an existing WHEN is kept)
+DO $$
+DECLARE
+  t RECORD;
+  def TEXT;
+BEGIN
+  FOR t IN
+    SELECT tg.tgname, pg_get_triggerdef(tg.oid) AS def
+    FROM pg_trigger tg
+    JOIN pg_proc p ON p.oid = tg.tgfoid
+    WHERE tg.tgrelid = 'public.catalog_items'::regclass
+      AND NOT tg.tgisinternal
+      AND (tg.tgtype & 1) = 1  -- FOR EACH ROW
+      AND p.proname IN ('auto_extract_catalog_data', 'auto_fix_and_extract', 'extract_model_and_year',
+                        'auto_fix_hebrew_reversal', 'process_hebrew_before_insert')
+  LOOP
+    IF position('pre_extracted' IN t.def) > 0 THEN
+      CONTINUE;  -- already gated
+    END IF;
+    IF position(' WHEN (' IN t.def) > 0 THEN
+      def := replace(t.def, ' WHEN (', ' WHEN (NOT NEW.pre_extracted AND (');
+      def := regexp_replace(def, ' EXECUTE (FUNCTION|PROCEDURE) ', ') EXECUTE \1 ');
+    ELSE
+      def := regexp_replace(t.def, ' EXECUTE (FUNCTION|PROCEDURE) ', ' WHEN (NOT NEW.pre_extracted) EXECUTE \1 ');
+    END IF;
+    EXECUTE format('DROP TRIGGER %I ON catalog_items', t.tgname);
+    EXECUTE def;
+    RAISE NOTICE 'Gated trigger %', t.tgname;
+  END LOOP;
+END $$;
+
+-- 3. Edits to a pre-extracted row fall back to trigger extraction
+CREATE OR REPLACE FUNCTION reset_pre_extracted()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  NEW.pre_extracted := false;
+  NEW.oem := NULL;
+  NEW.year_from := NULL;
+  NEW.year_to := NULL;
+  NEW.year_range := NULL;
+  NEW.side_position := NULL;
+  NEW.front_rear := NULL;
+  NEW.part_family := NULL;
+  NEW.model_code := NULL;
+  NEW.model := NULL;
+  NEW.engine_type := NULL;
+  NEW.part_name := NULL;
+  NEW.extracted_year := NULL;
+  RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS a_00_reset_pre_extracted ON catalog_items;
+CREATE TRIGGER a_00_reset_pre_extracted
+  BEFORE UPDATE OF cat_num_desc, make ON catalog_items
+  FOR EACH ROW
+  WHEN (OLD.pre_extracted AND NEW.pre_extracted
+        AND (OLD.cat_num_desc IS DISTINCT FROM NEW.cat_num_desc OR OLD.make IS DISTINCT FROM NEW.make))
+  EXECUTE FUNCTION reset_pre_extracted();
+
+-- Verification (run after migration)
+-- SELECT tgname, pg_get_triggerdef(oid) FROM pg_trigger
+-- WHERE tgrelid = 'catalog_items'::regclass AND NOT tgisinternal ORDER BY tgname;
+--
+-- After a PRE_EXTRACT=1 load: rows flagged, derived columns filled
+-- SELECT pre_extracted, count(*), count(part_family), count(year_from) FROM catalog_items GROUP BY 1;
@@ -1,6 +1,13 @@
 # tools/parts_search/supabase_io.py
-import os, requests
+import os, gzip, json, hashlib, tempfile, threading, zlib, requests
 from typing import List, Dict, Any, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib3.exceptions import ReadTimeoutError
+import metrics
+import pg_copy
+from batching import AdaptiveBatcher
+from catalog_row import json_default
 
 # ---- Env ----
 SUPABASE_URL = os.environ.get("SUPABASE_URL", "").rstrip("/")
@@ -9,6 +16,18 @@ SERVICE_KEY  = os.environ.get("SUPABASE_SERVICE_KEY", "")
 if not SUPABASE_URL or not SERVICE_KEY:
     raise ValueError("Missing SUPABASE_URL or SUPABASE_SERVICE_KEY")
 
+# Transport tuning
+POOL_SIZE    = int(os.environ.get("SUPABASE_POOL_SIZE", "10"))
+MAX_RETRIES  = int(os.environ.get("SUPABASE_MAX_RETRIES", "5"))
+GZIP_BODIES  = os.environ.get("SUPABASE_GZIP", "0") == "1"  # gzip catalog upsert bodies
+STREAM_ROWS  = int(os.environ.get("SUPABASE_STREAM_ROWS", "2000"))  # stream bodies of batches larger than this
+
+# orjson is optional; it encodes several times faster than json
+try:
+    import orjson  # type: ignore
+except ImportError:
+    orjson = None
+
 # Try SDK; if missing, we auto-fallback to REST
 try:
     from supabase import create_client, Client  # type: ignore
@@ -27,55 +46,221 @@ def _headers(json: bool = True, extra: Optional[Dict[str, str]] = None) -> Dict[
         h.update(extra)
     return h
 
+# ---------------- Transport ----------------
+
+class _CountingRetry(Retry):
+    """Retry that reports every retried request to the metrics registry."""
+
+    def increment(self, *args, **kwargs):
+        metrics.count("http_retries")
+        return super().increment(*args, **kwargs)
+
+_lock = threading.Lock()
+_session = None
+_session_pid = None
+_client = None
+
+def get_session() -> requests.Session:
+    """Return the process-wide keep-alive session (pooled, retries 429/5xx with backoff)."""
+    global _session, _session_pid
+    if _session is None or _session_pid != os.getpid():
+        with _lock:
+            if _session is None or _session_pid != os.getpid():
+                retry = _CountingRetry(
+                    total=MAX_RETRIES,
+                    backoff_factor=0.5,
+                    status_forcelist=(429, 500, 502, 503, 504),
+                    allowed_methods=None,  # upserts/deletes here are idempotent
+                    respect_retry_after_header=True,
+                    raise_on_status=False,
+                )
+                adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry)
+                s = requests.Session()
+                s.mount("https://", adapter)
+                s.mount("http://", adapter)
+                _session, _session_pid = s, os.getpid()
+    return _session
+
+def _dumps(payload) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload, default=json_default)
+    return json.dumps(payload, ensure_ascii=False, default=json_default, separators=(",", ":")).encode("utf-8")
+
+class _StreamingBody:
+    """JSON array body encoded `chunk_rows` rows at a time and sent chunked.
+
+    Only one encoded slice (optionally gzipped) exists at a time, so a batch of
+    tens of thousands of rows never becomes one big string. Iterating again
+    re-encodes from the start, which lets urllib3 resend it on a retry.
+    """
+
+    def __init__(self, rows, compress: bool = False, chunk_rows: int = 1000):
+        self.rows = rows
+        self.compress = compress
+        self.chunk_rows = chunk_rows
+
+    def __iter__(self):
+        z = zlib.compressobj(5, zlib.DEFLATED, 31) if self.compress else None  # wbits 31 = gzip framing
+        sent = 0
+        for i in range(0, len(self.rows), self.chunk_rows):
+            piece = _dumps(self.rows[i:i + self.chunk_rows])
+            piece = (b"[" if i == 0 else b",") + piece[1:-1]
+            if z:
+                piece = z.compress(piece)
+            if piece:  # an empty chunk would end the chunked body early
+                sent += len(piece)
+                yield piece
+        tail = b"]" if self.rows else b"[]"
+        if z:
+            tail = z.compress(tail) + z.flush()
+        sent += len(tail)
+        metrics.count("bytes_sent", sent)
+        yield tail
+
+def _json_body(payload, headers: Dict[str, str], compress: bool = False):
+    if isinstance(payload, list) and len(payload) > STREAM_ROWS:
+        if compress:
+            headers["Content-Encoding"] = "gzip"
+        return _StreamingBody(payload, compress=compress)
+    body = _dumps(payload)
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+        body = gzip.compress(body, compresslevel=5)
+    metrics.count("bytes_sent", len(body))
+    return body
+
+def _post_json(url: str, payload, extra: Optional[Dict[str, str]] = None, timeout: int = 60,
+               compress: bool = False) -> requests.Response:
+    headers = _headers(True, extra)
+    return get_session().post(url, headers=headers, data=_json_body(payload, headers, compress), timeout=timeout)
+
 # ---------------- Core (kept API) ----------------
 
 def get_client():
-    """Return Supabase SDK client if available; else None (REST will be used)."""
-    if _SDK_AVAILABLE:
-        return create_client(SUPABASE_URL, SERVICE_KEY)
-    return None
+    """Return the cached Supabase SDK client if available; else None (REST will be used)."""
+    global _client
+    if _SDK_AVAILABLE and _client is None:
+        with _lock:
+            if _client is None:
+                _client = create_client(SUPABASE_URL, SERVICE_KEY)
+    return _client
+
+_batchers = {}
+
+class UpsertError(RuntimeError):
+    """An upsert request PostgREST answered with an error; status is the HTTP status code."""
+
+    def __init__(self, message: str, status: int):
+        super().__init__(message)
+        self.status = status
+
+def _may_be_size_error(e: Exception) -> bool:
+    # Only 413s, 5xx and timeouts can mean "too big"; any other 4xx (bad row,
+    # conflict, schema mismatch) fails the same way at any size, so it is raised at once
+    if isinstance(e, UpsertError):
+        return e.status == 413 or e.status >= 500
+    if isinstance(e, requests.ReadTimeout):
+        return True
+    if isinstance(e, requests.ConnectionError):
+        # Read timeouts arrive as ConnectionError once urllib3 has used up its retries
+        return isinstance(getattr(e.args[0], "reason", None) if e.args else None, ReadTimeoutError)
+    # COPY loader: statement_timeout cancelled the merge
+    return pg_copy.psycopg is not None and isinstance(e.__cause__, pg_copy.psycopg.errors.QueryCanceled)
+
+def _batcher(table_name: str, on_conflict: str) -> AdaptiveBatcher:
+    key = (table_name, on_conflict)
+    if key not in _batchers:
+        with _lock:
+            if key not in _batchers:
+                _batchers[key] = AdaptiveBatcher(lambda rows: _upsert_request(table_name, rows, on_conflict),
+                                                 should_split=_may_be_size_error)
+    return _batchers[key]
+
+def upload_stats() -> Dict[str, Any]:
+    """Request sizes and latencies chosen by the batch controller, per table."""
+    return {table: b.stats() for (table, _), b in _batchers.items()}
 
 def upsert_rows(table_name: str, rows: List[Dict[str, Any]], on_conflict: str = "row_hash") -> int:
-    """Upsert rows into a table. Uses SDK if available, otherwise REST (PostgREST)."""
+    """Upsert rows into a table in adaptively sized requests (see batching.AdaptiveBatcher)."""
     if not rows:
         return 0
-    if _SDK_AVAILABLE:
-        client = get_client()
-        client.table(table_name).upsert(rows, on_conflict=on_conflict).execute()
-        return len(rows)
+    return _batcher(table_name, on_conflict)(rows)
 
-    # REST fallback
+def _upsert_request(table_name: str, rows, on_conflict: str) -> int:
+    """One upsert request: COPY + merge when DATABASE_URL is set (pg_copy), else a bulk PostgREST POST."""
+    loader = pg_copy.get_loader()
+    if loader is not None:
+        return loader.upsert(table_name, rows, on_conflict)
     url = f"{REST_BASE}/{table_name}?on_conflict={on_conflict}"
-    r = requests.post(
-        url,
-        headers=_headers(True, {"Prefer": "resolution=merge-duplicates"}),
-        json=rows,
-        timeout=60,
-    )
+    # Large streamed batches take longer server-side: allow ~1s per 100 rows
+    r = _post_json(url, rows, {"Prefer": "resolution=merge-duplicates,return=minimal"}, timeout=max(60, len(rows) // 100),
+                   compress=GZIP_BODIES)
     if r.status_code not in (201, 204):
-        raise RuntimeError(f"Upsert {table_name} failed ({r.status_code}): {r.text}")
+        raise UpsertError(f"Upsert {table_name} failed ({r.status_code}): {r.text}", r.status_code)
     return len(rows)
 
+def rpc(function: str, params: Dict[str, Any], timeout: int = 60):
+    """Call a Postgres function through PostgREST /rpc and return its JSON result."""
+    r = _post_json(f"{REST_BASE}/rpc/{function}", params, timeout=timeout)
+    if r.status_code not in (200, 204):
+        raise RuntimeError(f"RPC {function} failed ({r.status_code}): {r.text}")
+    return r.json() if r.content else None
+
+def get_supplier_id(slug: str):
+    """Return suppliers.id for a slug, or None."""
+    r = get_session().get(f"{REST_BASE}/suppliers", headers=_headers(False),
+                          params={"select": "id", "slug": f"eq.{slug}"}, timeout=30)
+    if r.status_code != 200:
+        raise RuntimeError(f"Select suppliers failed ({r.status_code}): {r.text}")
+    data = r.json()
+    return data[0]["id"] if data else None
+
 def upsert_supplier(slug: str, name: str):
     """Create/update a supplier row (public.suppliers with UNIQUE slug)."""
     payload = [{"slug": slug, "name": name, "type": "catalog"}]
-
-    if _SDK_AVAILABLE:
-        client = get_client()
-        client.table("suppliers").upsert(payload, on_conflict="slug").execute()
-        return {"slug": slug, "name": name, "type": "catalog"}
-
     url = f"{REST_BASE}/suppliers?on_conflict=slug"
-    r = requests.post(
-        url,
-        headers=_headers(True, {"Prefer": "resolution=merge-duplicates"}),
-        json=payload,
-        timeout=30,
-    )
+    r = _post_json(url, payload, {"Prefer": "resolution=merge-duplicates,return=minimal"}, timeout=30)
     if r.status_code not in (201, 204):
         raise RuntimeError(f"Upsert suppliers failed ({r.status_code}): {r.text}")
     return {"slug": slug, "name": name, "type": "catalog"}
 
+def fetch_row_hashes(table_name: str, supplier_id, page_size: int = 1000):
+    """Yield every row_hash of a supplier, paging by row_hash (keyset) so memory stays flat."""
+    last = None
+    while True:
+        params = {
+            "select": "row_hash",
+            "supplier_id": f"eq.{supplier_id}",
+            "order": "row_hash.asc",
+            "limit": str(page_size),
+        }
+        if last is not None:
+            params["row_hash"] = f"gt.{last}"
+        r = get_session().get(f"{REST_BASE}/{table_name}", headers=_headers(False), params=params, timeout=60)
+        if r.status_code != 200:
+            raise RuntimeError(f"Select {table_name} failed ({r.status_code}): {r.text}")
+        data = r.json()
+        for row in data:
+            yield row["row_hash"]
+        if len(data) < page_size:
+            return
+        last = data[-1]["row_hash"]
+
+def delete_rows_by_hash(table_name: str, hashes, chunk_size: int = 100) -> int:
+    """Delete rows whose row_hash is in hashes, chunked to keep the URL filter short."""
+    hashes = list(hashes)
+    for i in range(0, len(hashes), chunk_size):
+        chunk = hashes[i:i + chunk_size]
+        r = get_session().delete(
+            f"{REST_BASE}/{table_name}",
+            headers=_headers(False),
+            params={"row_hash": f"in.({','.join(chunk)})"},
+            timeout=60,
+        )
+        if r.status_code not in (200, 204):
+            raise RuntimeError(f"Delete {table_name} failed ({r.status_code}): {r.text}")
+    return len(hashes)
+
 def upsert_catalog(supplier_slug: str, version_date: str, source_path: str):
     """No-op unless you add a catalogs table (kept for compatibility)."""
     return True
@@ -88,14 +273,47 @@ def mark_catalog_done(supplier_slug: str, version_date: str):
 
 def download_signed(signed_url: str) -> bytes:
     """GET a signed URL (private bucket)."""
-    r = requests.get(signed_url, timeout=600)
+    r = get_session().get(signed_url, timeout=600)
     r.raise_for_status()
     return r.content
 
-def storage_put(path: str, content: bytes, content_type: str):
-    """Upload to Storage via REST. path example: vendor_parsed/m-pines/2025-06.ndjson"""
+def download_to_file(url: str, expected_sha256: Optional[str] = None, suffix: str = ".pdf",
+                     chunk_size: int = 1 << 20, timeout: int = 600):
+    """Stream a URL to a temp file without holding it in memory.
+
+    Verifies Content-Length (when the body is not content-encoded) and, if
+    given, the SHA-256 of the file. Returns (path, size, sha256); the caller
+    owns the file and must delete it.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    try:
+        with os.fdopen(fd, "wb") as f, get_session().get(url, stream=True, timeout=timeout) as r:
+            r.raise_for_status()
+            for chunk in r.iter_content(chunk_size=chunk_size):
+                f.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+            expected_len = r.headers.get("Content-Length")
+            if expected_len and not r.headers.get("Content-Encoding") and int(expected_len) != size:
+                raise IOError(f"Truncated download: got {size} of {expected_len} bytes")
+        sha256 = digest.hexdigest()
+        if expected_sha256 and expected_sha256.lower() != sha256:
+            raise IOError(f"Checksum mismatch: expected {expected_sha256}, got {sha256}")
+        metrics.count("bytes_downloaded", size)
+        return path, size, sha256
+    except Exception:
+        os.unlink(path)
+        raise
+
+def storage_put(path: str, content, content_type: str):
+    """Upload to Storage via REST. path example: vendor_parsed/m-pines/2025-06.ndjson
+
+    content may be bytes or an open binary file, which is streamed.
+    """
     url = f"{STORAGE_BASE}/object/{path}"
-    r = requests.put(
+    r = get_session().put(
         url,
         headers=_headers(False, {"Content-Type": content_type, "x-upsert": "true"}),
         data=content,
@@ -106,12 +324,7 @@ def storage_put(path: str, content: bytes, content_type: str):
 def sign_object(path: str, expires_in: int = 10800) -> str:
     """Create a signed URL for a stored object and return an absolute URL."""
     url = f"{STORAGE_BASE}/object/sign/{path}"
-    r = requests.post(
-        url,
-        headers=_headers(True),
-        json={"expiresIn": expires_in},
-        timeout=60,
-    )
+    r = _post_json(url, {"expiresIn": expires_in}, timeout=60)
     r.raise_for_status()
     rel = r.json().get("signedURL")
-    return f"{STORAGE_BASE}{rel}"  # API returns /object/sign/...; prefix it
\ No newline at end of file
+    return f"{STORAGE_BASE}{rel}"  # API returns /object/sign/...; prefix it
@@ -0,0 +1,97 @@
+"""Lazy supplier parser registry, shared by suppliers/ and tools/parts_search/suppliers/.
+
+Parsers are imported on first use, so listing suppliers or starting the
+server does not load pdfplumber/PyMuPDF. A supplier is found, in order:
+  1. in the package's BUILTIN table,
+  2. as an installed entry point in the "smartval.suppliers" group
+     (name = slug, value = module path),
+  3. as a module <package>/<slug without dashes, or with dashes as _>.py.
+"""
+import importlib
+import importlib.util
+import threading
+
+ENTRY_POINT_GROUP = "smartval.suppliers"
+
+_lock = threading.RLock()
+
+class SupplierPlugin:
+    def __init__(self, slug: str, module: str, capabilities=None, source: str = "builtin"):
+        self.slug = slug
+        self.module_name = module
+        self.source = source
+        self._capabilities = frozenset(capabilities) if capabilities is not None else None
+        self._module = None
+
+    @property
+    def module(self):
+        if self._module is None:
+            with _lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self.module_name)
+        return self._module
+
+    @property
+    def capabilities(self) -> frozenset:
+        if self._capabilities is None:
+            self._capabilities = frozenset(getattr(self.module, "CAPABILITIES", ()))
+        return self._capabilities
+
+    def supports(self, capability: str) -> bool:
+        return capability in self.capabilities
+
+    def parse(self, *args, **kwargs):
+        return self.module.parse(*args, **kwargs)
+
+    def describe(self) -> dict:
+        return {"slug": self.slug, "module": self.module_name, "source": self.source,
+                "loaded": self._module is not None,
+                "capabilities": sorted(self._capabilities) if self._capabilities is not None else None}
+
+class Registry:
+    """Plugins of one parser package: builtin maps slug -> (module path, capabilities)."""
+
+    def __init__(self, package: str, builtin: dict):
+        self.package = package
+        self.builtin = builtin
+        self._plugins = {}
+        self._discovered = False
+
+    def register(self, slug: str, module: str, capabilities=None, source: str = "builtin") -> SupplierPlugin:
+        plugin = SupplierPlugin(slug, module, capabilities, source)
+        with _lock:
+            self._plugins[slug] = plugin
+        return plugin
+
+    def _discover(self):
+        with _lock:
+            if self._discovered:
+                return
+            self._discovered = True
+            for slug, (module, capabilities) in self.builtin.items():
+                self._plugins.setdefault(slug, SupplierPlugin(slug, module, capabilities))
+            try:
+                from importlib.metadata import entry_points
+                eps = entry_points()
+                eps = eps.select(group=ENTRY_POINT_GROUP) if hasattr(eps, "select") else eps.get(ENTRY_POINT_GROUP, ())
+            except Exception as e:
+                print(f"Supplier entry points unavailable: {e}")
+                eps = ()
+            for ep in eps:
+                self._plugins.setdefault(ep.name, SupplierPlugin(ep.name, ep.value.split(":")[0], source="entry_point"))
+
+    def get(self, slug: str) -> SupplierPlugin:
+        """Plugin for slug (not imported yet); KeyError if no parser is known."""
+        self._discover()
+        plugin = self._plugins.get(slug)
+        if plugin is not None:
+            return plugin
+        for name in dict.fromkeys((slug.replace("-", ""), slug.replace("-", "_"))):
+            module = f"{self.package}.{name}"
+            if name.isidentifier() and importlib.util.find_spec(module) is not None:
+                return self.register(slug, module, source="module")
+        raise KeyError(f"No parser for supplier {slug!r} (known: {', '.join(sorted(self._plugins))})")
+
+    def plugins(self) -> list:
+        self._discover()
+        return [self._plugins[s] for s in sorted(self._plugins)]
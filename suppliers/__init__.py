@@ -1,2 +1,29 @@
-# empty package initializer
+"""Supplier parser registry (lookup rules in supplier_registry.py).
 
+Every parser module has parse(pdf_source, supplier_slug, version_date,
+source_path, **options) and may declare CAPABILITIES; builtin entries
+declare them here so they are known without importing the module.
+"""
+from supplier_registry import ENTRY_POINT_GROUP, Registry, SupplierPlugin
+
+# What parse() supports beyond the base signature
+#   stream     - uploads through upload(rows) per page block and returns []
+#   parallel   - workers > 1 (process pool over page ranges)
+#   resume     - start_page / on_uploaded checkpoints
+#   text_layer - engine="text" / "auto"
+#   hebrew     - fix_hebrew
+#   diff       - version_in_hash=False
+#   versioned  - catalog_version
+#   page_cache - page_cache (reuse rows of unchanged pages)
+#   pre_extract - pre_extract (year/model/part family filled before upload)
+#   watchdog   - page_timeout / page_memory_mb (per-page budget, text fallback)
+BUILTIN = {
+    "m-pines": (__name__ + ".mpines",
+                ("stream", "parallel", "resume", "text_layer", "hebrew", "diff", "versioned", "page_cache",
+                 "pre_extract", "watchdog")),
+}
+
+_registry = Registry(__name__, BUILTIN)
+register = _registry.register
+get = _registry.get
+plugins = _registry.plugins
@@ -1,89 +1,487 @@
 import re
 import pdfplumber
 import io
-import hashlib
+import os
 import gc
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from hebrew import fix_hebrew_and_years
+import metrics
+from catalog_row import CatalogRow
+from hashing import RowHasher
+from suppliers import text_layer
+from page_cache import PageCache
+from page_watchdog import PageWatchdog, PAGE_SLOW_S
+import extraction
+
+BATCH_SIZE = 100  # Process 100 pages at a time
+VALIDATE_PAGES = 3  # sample pages compared against pdfplumber before trusting the text engine
+
+def _parse_price(price_str):
+    price = None
+    if price_str:
+        try:
+            price_clean = ''.join(c for c in price_str if c.isdigit() or c == '.')
+            price = float(price_clean) if price_clean else None
+        except:
+            pass
+    return price
+
+def _cache_settings(fix_hebrew, layout):
+    # Everything besides the page itself that changes the extracted rows
+    if layout is None:
+        return f"pdfplumber|{fix_hebrew}"
+    return f"text|{fix_hebrew}|{[round(b, 1) for b in layout.bounds]}|{layout.order}|{layout.left:.1f}|{layout.right:.1f}"
+
+def _extract_pages(pdf, start, end, total_pages, out, errors, fix_hebrew=False, layout=None, cache=None):
+    """Append compact (make, source, price, cat_num_desc, pcode, page) tuples for pages [start, end)
+
+    With a text_layer.ColumnLayout, pdf is a PyMuPDF document and the table is
+    rebuilt from character boxes instead of pdfplumber extract_tables().
+    With a PageCache, pages whose fingerprint was seen before reuse the cached
+    rows instead of being extracted again.
+    """
+    settings = _cache_settings(fix_hebrew, layout) if cache is not None else None
+    for page_num in range(start, end):
+        try:
+            # Progress indicator
+            if page_num % 50 == 0:
+                print(f"Processing page {page_num + 1}/{total_pages}...")
+
+            key = None
+            if cache is not None:
+                with metrics.timer("page_cache"):
+                    key = cache.key(pdf, page_num, settings)
+                    cached = cache.get(key)
+                if cached is not None:
+                    metrics.count("page_cache_hits")
+                    out.extend(r + (page_num + 1,) for r in cached)
+                    continue
+                metrics.count("page_cache_misses")
+            page_rows = []
+
+            with metrics.timer("extract"):
+                if layout is not None:
+                    tables = [layout.rows(pdf[page_num])]
+                else:
+                    tables = pdf.pages[page_num].extract_tables()
+            metrics.count("pages_extracted")
+
+            _table_rows(tables, page_rows, fix_hebrew)
+            out.extend(r + (page_num + 1,) for r in page_rows)
+            if key is not None:
+                cache.put(key, page_rows)
+        except MemoryError:
+            raise  # the page watchdog retries it with the cheaper strategy
+        except Exception as e:
+            errors.append((page_num, str(e)))
+            metrics.count("pages_skipped")
+
+def _table_rows(tables, page_rows, fix_hebrew=False):
+    """Append (make, source, price, cat_num_desc, pcode) for the data rows of extracted tables."""
+    if tables:
+        for table in tables:
+            for row_idx, row in enumerate(table):
+                # Skip header
+                if row_idx == 0 and row and 'Pcode' in str(row):
+                    continue
+
+                if row and len(row) >= 5:
+                    # Columns are: Make, Expr2 (source), Price, CatNumDesc, Pcode
+                    make = row[0] if row[0] else None
+                    source = row[1] if len(row) > 1 else None
+                    price = _parse_price(row[2] if len(row) > 2 else None)
+                    cat_num_desc = row[3] if len(row) > 3 else None
+                    pcode = row[4] if len(row) > 4 else None
+
+                    if fix_hebrew:
+                        with metrics.timer("normalize"):
+                            make = fix_hebrew_and_years(make)
+                            source = fix_hebrew_and_years(source)
+                            cat_num_desc = fix_hebrew_and_years(cat_num_desc)
+
+                    if pcode or cat_num_desc:
+                        page_rows.append((make, source, price, cat_num_desc, pcode))
+
+class _PageWorker:
+    """Page extraction inside a page_watchdog.PageWatchdog child process.
+
+    "extract" is the normal path (_extract_pages for one page, page cache
+    included). "fallback" is the cheap text-mode strategy for pages that blew
+    their budget: PyMuPDF character boxes cut at a column layout learned from
+    the header (pdfplumber runs), or plain text lines split on runs of spaces
+    (text engine runs, or no header found). Fallback rows are never cached.
+    """
+
+    def __init__(self, pdf_path, total_pages, fix_hebrew=False, layout=None, cache_dir=None):
+        self.pdf_path = pdf_path
+        self.total_pages = total_pages
+        self.fix_hebrew = fix_hebrew
+        self.layout = layout
+        self.cache_dir = cache_dir
+
+    def open(self):
+        opener = text_layer.open_document if self.layout is not None else pdfplumber.open
+        self.pdf = opener(self.pdf_path)
+        self.cache = PageCache(self.cache_dir) if self.cache_dir else None
+        self.doc = None
+        self.fallback_layout = None
+
+    def page(self, mode, page_num):
+        """(rows, errors, cache hits, cache misses) for one page."""
+        out, errors = [], []
+        hits, misses = (self.cache.hits, self.cache.misses) if self.cache else (0, 0)
+        if mode == "extract":
+            _extract_pages(self.pdf, page_num, page_num + 1, self.total_pages, out, errors, self.fix_hebrew,
+                           self.layout, self.cache)
+            if self.cache is not None:
+                self.cache.flush()
+                hits, misses = self.cache.hits - hits, self.cache.misses - misses
+        else:
+            self._fallback(page_num, out, errors)
+        return out, errors, hits, misses
+
+    def _fallback(self, page_num, out, errors):
+        if self.doc is None:
+            self.doc = self.pdf if self.layout is not None else text_layer.open_document(self.pdf_path)
+            if self.layout is None:
+                for n in range(min(3, self.total_pages)):
+                    self.fallback_layout = text_layer.ColumnLayout.learn(self.doc[n])
+                    if self.fallback_layout is not None:
+                        break
+        if self.fallback_layout is not None:
+            _extract_pages(self.doc, page_num, page_num + 1, self.total_pages, out, errors, self.fix_hebrew,
+                           self.fallback_layout)
+            return
+        try:
+            lines = self.doc[page_num].get_text("text").splitlines()
+            page_rows = []
+            _table_rows([re.split(r"\s{2,}", line.strip()) for line in lines], page_rows,
+                        self.fix_hebrew)
+            out.extend(r + (page_num + 1,) for r in page_rows)
+        except Exception as e:
+            errors.append((page_num, str(e)))
+
+    def close(self):
+        if self.cache is not None:
+            self.cache.close()
+        if self.doc is not None and self.doc is not self.pdf:
+            self.doc.close()
+        self.pdf.close()
+
+def _watched_pages(watchdog, start, end, out, errors, cache_stats):
+    """_extract_pages through a PageWatchdog; cache_stats is a [hits, misses] accumulator."""
+    for page_num in range(start, end):
+        result = watchdog.run(page_num)
+        if result is None:
+            errors.append((page_num, "quarantined: extraction and fallback both exceeded the page budget"))
+            metrics.count("pages_skipped")
+            continue
+        rows, page_errors, hits, misses = result
+        out.extend(rows)
+        errors.extend(page_errors)
+        cache_stats[0] += hits
+        cache_stats[1] += misses
+
+def _extract_range(pdf_path, start, end, total_pages, fix_hebrew=False, with_metrics=False, layout=None,
+                   cache_dir=None, watch=None):
+    """Worker entry point: open the PDF in this process and extract pages [start, end)
+
+    Returns (rows, errors, metrics snapshot or None, page cache stats or None,
+    watchdog report or None) so the parent can merge the worker's stage
+    timings, cache hits and slow/quarantined pages. watch is
+    (timeout, memory_mb, slow_seconds) to extract through a PageWatchdog.
+    """
+    metrics.enable(with_metrics)
+    metrics.registry.reset()
+    out, errors = [], []
+    if watch:
+        watchdog = PageWatchdog(_PageWorker(pdf_path, total_pages, fix_hebrew, layout, cache_dir), *watch)
+        cache_stats = [0, 0]
+        try:
+            _watched_pages(watchdog, start, end, out, errors, cache_stats)
+        finally:
+            watchdog.close()
+        stats = {"hits": cache_stats[0], "misses": cache_stats[1], "evicted": 0} if cache_dir else None
+        return out, errors, metrics.registry.snapshot() if with_metrics else None, stats, watchdog.report()
+    cache = PageCache(cache_dir) if cache_dir else None
+    opener = text_layer.open_document if layout is not None else pdfplumber.open
+    try:
+        with opener(pdf_path) as pdf:
+            _extract_pages(pdf, start, end, total_pages, out, errors, fix_hebrew, layout, cache)
+    finally:
+        if cache is not None:
+            cache.close()
+    return out, errors, metrics.registry.snapshot() if with_metrics else None, cache and cache.stats(), None
+
+def _build_row(t, supplier_id, version_date):
+    make, source, price, cat_num_desc, pcode, page = t
+    # row_hash is set per block by hashing.RowHasher
+    return CatalogRow(supplier_id, pcode, cat_num_desc, price, source, make, version_date, page)
+
+def _text_layout(pdf, doc, total_pages, start_page=0, validate=True):
+    """Learn the column layout from the header row; None means use pdfplumber.
+
+    With validate, VALIDATE_PAGES sample pages are extracted by both engines
+    and the text engine is only used if every sample matches exactly.
+    """
+    layout = None
+    for page_num in range(min(3, total_pages)):
+        layout = text_layer.ColumnLayout.learn(doc[page_num])
+        if layout is not None:
+            break
+    if layout is None:
+        print("Text engine: header row not found, using pdfplumber")
+        return None
+    if not validate:
+        return layout
+
+    remaining = total_pages - start_page
+    samples = sorted({start_page + remaining * i // VALIDATE_PAGES for i in range(VALIDATE_PAGES)}) if remaining > 0 else []
+    with metrics.timer("validate"):
+        for page_num in samples:
+            expected, got = [], []
+            _extract_pages(pdf, page_num, page_num + 1, total_pages, expected, [])
+            _extract_pages(doc, page_num, page_num + 1, total_pages, got, [], layout=layout)
+            if got != expected:
+                i = next((i for i, (a, b) in enumerate(zip(got, expected)) if a != b), min(len(got), len(expected)))
+                print(f"Text engine disagrees with pdfplumber on page {page_num + 1} "
+                      f"({len(got)} vs {len(expected)} rows; row {i}: {got[i:i + 1]} vs {expected[i:i + 1]}), using pdfplumber")
+                metrics.count("text_engine_fallbacks")
+                return None
+    print(f"Text engine validated on pages {[p + 1 for p in samples]}")
+    return layout
+
+def _serial_blocks(pdf, total_pages, start_page=0, fix_hebrew=False, layout=None, cache=None, watchdog=None):
+    cache_stats = [0, 0]
+    for start in range(start_page, total_pages, BATCH_SIZE):
+        end = min(start + BATCH_SIZE, total_pages)
+        out, errors = [], []
+        if watchdog is not None:
+            _watched_pages(watchdog, start, end, out, errors, cache_stats)
+        else:
+            _extract_pages(pdf, start, end, total_pages, out, errors, fix_hebrew, layout, cache)
+        if cache is not None:
+            cache.flush()
+            cache.hits, cache.misses = cache.hits + cache_stats[0], cache.misses + cache_stats[1]
+            cache_stats = [0, 0]
+        yield end, out, errors
+
+def _parallel_blocks(pdf_path, total_pages, workers, start_page=0, fix_hebrew=False, layout=None, cache=None,
+                     watch=None, watch_report=None):
+    """Extract BATCH_SIZE page ranges in worker processes, yielding results in page order.
+
+    At most 2 * workers ranges are in flight so finished blocks cannot pile up
+    in memory while uploads are slower than extraction. With watch, each
+    worker extracts through its own PageWatchdog; their reports are added
+    to watch_report.
+    """
+    pending = deque()
+    with_metrics = metrics.registry.enabled
+
+    def result(end, future):
+        out, errors, snapshot, cache_stats, report = future.result()
+        metrics.registry.merge(snapshot)
+        if report:
+            for k, items in report.items():
+                watch_report[k].extend(items)
+        if cache_stats:
+            cache.hits += cache_stats["hits"]
+            cache.misses += cache_stats["misses"]
+        return end, out, errors
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for start in range(start_page, total_pages, BATCH_SIZE):
+            end = min(start + BATCH_SIZE, total_pages)
+            pending.append((end, pool.submit(_extract_range, pdf_path, start, end, total_pages,
+                                                fix_hebrew, with_metrics, layout, cache and cache.path, watch)))
+            if len(pending) >= 2 * workers:
+                yield result(*pending.popleft())
+        while pending:
+            yield result(*pending.popleft())
+
+def parse(pdf_source, supplier_slug, version_date, source_path, workers=1, upload=None, version_in_hash=True,
+          start_page=0, on_uploaded=None, fix_hebrew=False, supplier_id=None, engine="pdfplumber",
+          hash_mode=None, catalog_version=None, page_cache=None, pre_extract=False, page_timeout=0,
+          page_memory_mb=0):
+    """Parse PDF in chunks to avoid memory issues.
+
+    pdf_source is a file path (preferred: nothing is loaded into memory) or
+    the PDF bytes.
+
+    workers > 1 splits the document into BATCH_SIZE page ranges that are
+    extracted by separate processes; rows and row_hash values are identical
+    to the serial path.
+
+    upload(rows) replaces the default upsert_rows("catalog_items", rows) call.
+    A failed upload keeps its rows for the next batch; if the last upload
+    fails there is no next batch, so parse raises instead of returning.
+    version_in_hash=False leaves version_date out of row_hash so unchanged
+    rows keep the same hash across monthly versions (used by diff ingest).
+
+    start_page skips pages already committed by an interrupted run (it is
+    rounded down to a BATCH_SIZE boundary). on_uploaded(page_end) is called
+    once all rows up to page_end have been handed to upload().
+
+    fix_hebrew=True normalizes make/source/cat_num_desc with
+    hebrew.fix_hebrew_and_years. It is off by default because the
+    catalog_items trigger auto_fix_hebrew_reversal already reverses Hebrew
+    on insert; enable it only together with a trigger that skips the fix.
+
+    supplier_id skips the suppliers lookup (benchmarks, offline runs).
+
+    engine selects table extraction: "pdfplumber" (extract_tables), "text"
+    (PyMuPDF character boxes cut at column boundaries learned from the
+    header row, much faster) or "auto" (text, after checking sample pages
+    against pdfplumber; falls back to pdfplumber if any differ).
+
+    Rows with a row_hash already produced in this run are dropped before
+    upload (see hashing.RowHasher); hash_mode="fast" switches to blake2b
+    hashes, which do not match previously stored ones.
+
+    catalog_version tags every row for versioned ingest; row_hash then
+    includes the version instead of version_date so each version gets its
+    own rows.
+
+    page_cache is a directory for a page_cache.PageCache: pages unchanged
+    since an earlier parse (same content stream, fonts and settings) reuse
+    their cached rows instead of being extracted again.
+
+    pre_extract=True fills year/model/side/part family columns in Python
+    (extraction.extract_rows) and marks rows pre_extracted so the
+    catalog_items extraction triggers skip them. Requires fix_hebrew, as
+    the triggers would otherwise still be reversing the stored text.
+
+    page_timeout > 0 extracts every page in a watchdog process
+    (page_watchdog.PageWatchdog) limited to page_timeout seconds and
+    page_memory_mb of address space (0 = no memory limit). A page over
+    budget is killed and retried in text mode; slow and quarantined pages
+    are printed at the end and recorded as metrics events.
+    """
+    if pre_extract and not fix_hebrew:
+        raise ValueError("pre_extract requires fix_hebrew")
+    tmp_path = None
+    if isinstance(pdf_source, (bytes, bytearray)):
+        if workers > 1 or page_timeout:
+            # Workers open the PDF themselves, so they need it on disk
+            with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+                f.write(pdf_source)
+                tmp_path = f.name
+            pdf_path = tmp_path
+        else:
+            pdf_path = None
+    else:
+        pdf_path = os.fspath(pdf_source)
+
+    doc = None
+    cache = PageCache(page_cache) if page_cache else None
+    watch = (page_timeout, page_memory_mb, PAGE_SLOW_S) if page_timeout else None
+    watch_report = {"slow": [], "quarantined": []}
+    watchdog = None
+    try:
+        with pdfplumber.open(pdf_path or io.BytesIO(pdf_source)) as pdf:
+            total_pages = len(pdf.pages)
+            print(f"PDF has {total_pages} pages")
+
+            layout = None
+            if engine != "pdfplumber":
+                doc = text_layer.open_document(pdf_path or pdf_source)
+                layout = _text_layout(pdf, doc, total_pages, start_page - start_page % BATCH_SIZE,
+                                      validate=engine == "auto")
+
+            # Get supplier ID once
+            from supabase_io import get_client, upsert_rows
+            if supplier_id is None:
+                client = get_client()
+                supplier = client.table("suppliers").select("id").eq("slug", supplier_slug).single().execute()
+                supplier_id = supplier.data["id"] if supplier.data else None
+            if upload is None:
+                upload = lambda rows: upsert_rows("catalog_items", rows)
+
+            start_page -= start_page % BATCH_SIZE
+            if start_page:
+                print(f"Skipping {start_page} already committed pages")
+            if workers > 1:
+                print(f"Extracting with {workers} worker processes")
+                blocks = _parallel_blocks(pdf_path, total_pages, workers, start_page, fix_hebrew, layout, cache,
+                                          watch, watch_report)
+            else:
+                if watch:
+                    watchdog = PageWatchdog(_PageWorker(pdf_path, total_pages, fix_hebrew, layout,
+                                                        cache and cache.path), *watch)
+                blocks = _serial_blocks(pdf if layout is None else doc, total_pages, start_page, fix_hebrew, layout,
+                                        cache, watchdog)
+
+            batch_rows = []
+            total_processed = 0
+            upload_error = None
+            if catalog_version:
+                recipe = "mpines_versioned"
+            else:
+                recipe = "mpines" if version_in_hash else "mpines_diff"
+            hasher = RowHasher(recipe, mode=hash_mode)
+
+            for end, block, errors in blocks:
+                for page_num, error in errors:
+                    print(f"Error on page {page_num + 1}: {error}")
+                with metrics.timer("batch"):
+                    rows = [_build_row(t, supplier_id, version_date) for t in block]
+                    if catalog_version:
+                        for r in rows:
+                            r.catalog_version = catalog_version
+                    with metrics.timer("hash"):
+                        unique = hasher.apply(rows)
+                    if pre_extract:
+                        with metrics.timer("extract_fields"):
+                            extraction.extract_rows(unique)
+                    batch_rows.extend(unique)
+                metrics.count("rows_parsed", len(block))
+                metrics.count("rows_duplicate", len(rows) - len(unique))
 
-def parse(pdf_bytes, supplier_slug, version_date, source_path):
-    """Parse PDF in chunks to avoid memory issues"""
-    
-    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
-        total_pages = len(pdf.pages)
-        print(f"PDF has {total_pages} pages")
-        
-        # Get supplier ID once
-        from supabase_io import get_client, upsert_rows
-        client = get_client()
-        supplier = client.table("suppliers").select("id").eq("slug", supplier_slug).single().execute()
-        supplier_id = supplier.data["id"] if supplier.data else None
-        
-        batch_rows = []
-        total_processed = 0
-        BATCH_SIZE = 100  # Process 100 pages at a time
-        
-        for page_num in range(total_pages):
-            try:
-                # Progress indicator
-                if page_num % 50 == 0:
-                    print(f"Processing page {page_num + 1}/{total_pages}...")
-                
-                page = pdf.pages[page_num]
-                tables = page.extract_tables()
-                
-                if tables:
-                    for table in tables:
-                        for row_idx, row in enumerate(table):
-                            # Skip header
-                            if row_idx == 0 and row and 'Pcode' in str(row):
-                                continue
-                            
-                            if row and len(row) >= 5:
-                                # Extract columns
-                                make = row[0] if row[0] else None
-                                source = row[1] if len(row) > 1 else None
-                                price_str = row[2] if len(row) > 2 else None
-                                cat_num_desc = row[3] if len(row) > 3 else None
-                                pcode = row[4] if len(row) > 4 else None
-                                
-                                # Parse price
-                                price = None
-                                if price_str:
-                                    try:
-                                        price_clean = ''.join(c for c in price_str if c.isdigit() or c == '.')
-                                        price = float(price_clean) if price_clean else None
-                                    except:
-                                        pass
-                                
-                                if pcode or cat_num_desc:
-                                    row_data = {
-                                        "supplier_id": supplier_id,
-                                        "pcode": pcode,
-                                        "cat_num_desc": cat_num_desc,
-                                        "price": price,
-                                        "source": source,
-                                        "make": make,
-                                        "version_date": version_date,
-                                        "raw_row": {"page": page_num + 1}
-                                    }
-                                    
-                                    hash_key = f"{version_date}|{pcode}|{cat_num_desc}|{price}|{make}"
-                                    row_data["row_hash"] = hashlib.sha256(hash_key.encode()).hexdigest()
-                                    
-                                    batch_rows.append(row_data)
-                
                 # Upload batch every 100 pages
-                if (page_num + 1) % BATCH_SIZE == 0 or page_num == total_pages - 1:
-                    if batch_rows:
+                if batch_rows:
+                    try:
                         print(f"Uploading batch of {len(batch_rows)} rows...")
-                        upsert_rows("catalog_items", batch_rows)
+                        upload(batch_rows)
                         total_processed += len(batch_rows)
                         print(f"Total processed so far: {total_processed} rows")
                         batch_rows = []  # Clear batch
                         gc.collect()  # Force garbage collection
-                        
-            except Exception as e:
-                print(f"Error on page {page_num + 1}: {str(e)}")
-                continue
-        
-        print(f"Parsing complete. Total rows processed: {total_processed}")
-        return []  # Return empty since we already uploaded everything
+                    except Exception as e:
+                        # Keep the rows; they are retried with the next batch
+                        print(f"Error uploading batch: {str(e)}")
+                        upload_error = e
+                        continue
+
+                if on_uploaded:
+                    on_uploaded(end)
+
+            if hasher.removed:
+                print(f"Dropped {hasher.removed} duplicate rows "
+                      f"({hasher.removed_in_batch} within a batch, {hasher.removed_across} from earlier batches)")
+            if batch_rows:
+                raise RuntimeError(f"{len(batch_rows)} rows were not uploaded: {upload_error}") from upload_error
+            print(f"Parsing complete. Total rows processed: {total_processed}")
+            return []  # Return empty since we already uploaded everything
+    finally:
+        if watchdog is not None:
+            watchdog.close()
+            watch_report = watchdog.report()
+        if watch:
+            slow, quarantined = watch_report["slow"], watch_report["quarantined"]
+            print(f"Page watchdog: {len(slow)} slow pages (>= {PAGE_SLOW_S}s), {len(quarantined)} quarantined")
+            for q in sorted(quarantined, key=lambda q: q["page"]):
+                print(f"  page {q['page']}: {q['reason']} after {q['seconds']}s, "
+                      f"fallback {q['fallback']} in {q['fallback_seconds']}s")
+        if cache is not None:
+            cache.evict()
+            stats = cache.stats()
+            cache.close()
+            looked_up = stats["hits"] + stats["misses"]
+            print(f"Page cache: {stats['hits']}/{looked_up} pages reused, {stats['evicted']} evicted")
+            metrics.count("page_cache_evicted", stats["evicted"])
+        if doc is not None:
+            doc.close()
+        if tmp_path:
+            os.unlink(tmp_path)
@@ -0,0 +1,107 @@
+import bisect
+import os
+
+HEADER = ("Make", "Expr2", "Price", "CatNumDesc", "Pcode")
+
+# Same tolerances pdfplumber uses when it turns table cell chars into text
+X_TOLERANCE = 3
+Y_TOLERANCE = 3
+
+def open_document(pdf_source):
+    """Open a PDF path or bytes with PyMuPDF (imported lazily; optional dependency)."""
+    import fitz
+    if isinstance(pdf_source, (bytes, bytearray)):
+        return fitz.open(stream=bytes(pdf_source), filetype="pdf")
+    return fitz.open(os.fspath(pdf_source))
+
+def _vertical_rules(page):
+    xs = []
+    for d in page.get_drawings():
+        for item in d["items"]:
+            if item[0] == "l" and abs(item[1].x - item[2].x) < 1 and abs(item[1].y - item[2].y) > 5:
+                xs.append(item[1].x)
+            elif item[0] == "re" and item[1].width < 2:
+                xs.append((item[1].x0 + item[1].x1) / 2)
+    return sorted(xs)
+
+class ColumnLayout:
+    """Fixed x-boundaries of the catalog table, learned once from a header row.
+
+    rows(page) rebuilds the table from the page's character boxes: chars are
+    grouped into lines by y, into cells by x, and each cell is read left to
+    right like pdfplumber does, so RTL cells keep their visual order.
+    """
+
+    def __init__(self, bounds, order, left, right):
+        self.bounds = bounds  # x boundaries between adjacent columns
+        self.order = order    # column position -> index in HEADER
+        self.left = left
+        self.right = right
+
+    @classmethod
+    def learn(cls, page, header=HEADER):
+        """Layout from a page containing the header words, or None if they are not all there."""
+        found = {}
+        for x0, y0, x1, y1, word, *_ in page.get_text("words"):
+            if word in header and word not in found:
+                found[word] = (x0, x1)
+        if len(found) != len(header):
+            return None
+        cols = sorted(found.items(), key=lambda kv: kv[1][0])
+        rules = _vertical_rules(page)
+        bounds = []
+        for (_, (_, a_x1)), (_, (b_x0, _)) in zip(cols, cols[1:]):
+            between = [x for x in rules if a_x1 <= x <= b_x0]
+            bounds.append(between[len(between) // 2] if between else (a_x1 + b_x0) / 2)
+        first_x0, last_x1 = cols[0][1][0], cols[-1][1][1]
+        left = max([x for x in rules if x <= first_x0], default=float("-inf"))
+        right = min([x for x in rules if x >= last_x1], default=float("inf"))
+        return cls(bounds, [header.index(name) for name, _ in cols], left, right)
+
+    def rows(self, page):
+        """Table rows of the page as lists of cell strings in HEADER order (header rows dropped)."""
+        chars = []
+        for block in page.get_text("rawdict", flags=0)["blocks"]:
+            for line in block.get("lines", ()):
+                for span in line["spans"]:
+                    for ch in span["chars"]:
+                        x0, y0, x1, y1 = ch["bbox"]
+                        xm = (x0 + x1) / 2
+                        if self.left <= xm <= self.right:
+                            chars.append(((y0 + y1) / 2, x0, x1, ch["c"]))
+        chars.sort()
+
+        lines, current, y = [], [], None
+        for c in chars:
+            if current and c[0] - y > Y_TOLERANCE:
+                lines.append(current)
+                current = []
+            if not current:
+                y = c[0]
+            current.append(c)
+        if current:
+            lines.append(current)
+
+        header = list(HEADER)
+        out = []
+        for line in lines:
+            cells = [[] for _ in self.order]
+            for c in line:
+                cells[bisect.bisect(self.bounds, (c[1] + c[2]) / 2)].append(c)
+            row = [""] * len(HEADER)
+            for pos, cell in enumerate(cells):
+                cell.sort(key=lambda c: c[1])
+                # Blanks and gaps wider than X_TOLERANCE separate words, joined by one space
+                text, prev_x1, gap = [], None, False
+                for _, x0, x1, ch in cell:
+                    if ch.isspace():
+                        gap = True
+                        continue
+                    if text and (gap or x0 - prev_x1 > X_TOLERANCE):
+                        text.append(" ")
+                    text.append(ch)
+                    prev_x1, gap = x1, False
+                row[self.order[pos]] = "".join(text)
+            if any(row) and row != header:
+                out.append(row)
+        return out
@@ -0,0 +1,37 @@
+import os
+import sys
+
+import pytest
+
+# The ingest modules live at the repository root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# supabase_io refuses to import without a project; tests never reach it
+os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:9")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "stub")
+
+# Rows of the small catalog write_catalog_pdf draws: (Make, Expr2, Price, CatNumDesc, Pcode)
+CATALOG_ROWS = [("TOYOTA", "orig", "120.00", "wing front left", "P100"),
+                ("MAZDA", "oem", "0.00", "lamp rear", "P200"),
+                ("BMW", "after", "99.50", "grille", "P300")]
+
+def write_catalog_pdf(path, pages=2):
+    """An M-Pines style table (header and ruled cells) on every page; pcodes get a -<page> suffix."""
+    fitz = pytest.importorskip("fitz")
+    xs, top, height = (40, 120, 200, 280, 460, 540), 60, 18
+    doc = fitz.open()
+    for p in range(pages):
+        page = doc.new_page()
+        lines = [("Make", "Expr2", "Price", "CatNumDesc", "Pcode")]
+        lines += [row[:4] + (f"{row[4]}-{p}",) for row in CATALOG_ROWS]
+        for x in xs:
+            page.draw_line((x, top), (x, top + height * len(lines)))
+        for k in range(len(lines) + 1):
+            page.draw_line((xs[0], top + k * height), (xs[-1], top + k * height))
+        for k, line in enumerate(lines):
+            for i, cell in enumerate(line):
+                page.insert_text((xs[i] + 3, top + k * height + 13), cell, fontsize=9)
+    doc.save(str(path))
+    return str(path)
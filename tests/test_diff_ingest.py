@@ -0,0 +1,39 @@
+import pytest
+
+import diff_ingest
+import hashing
+
+@pytest.fixture
+def db(monkeypatch):
+    state = {"stored": {"keep", "stale"}, "upserted": [], "deleted": [], "fail": False}
+
+    def upsert_rows(table, rows):
+        if state["fail"]:
+            raise RuntimeError("Upsert catalog_items failed (500)")
+        state["upserted"].extend(r["row_hash"] for r in rows)
+
+    monkeypatch.setattr(diff_ingest, "fetch_row_hashes", lambda table, supplier_id: iter(state["stored"]))
+    monkeypatch.setattr(diff_ingest, "upsert_rows", upsert_rows)
+    monkeypatch.setattr(diff_ingest, "delete_rows_by_hash", lambda table, hashes: state["deleted"].extend(hashes))
+    return state
+
+def test_only_new_rows_are_uploaded_and_stale_ones_deleted(db):
+    differ = diff_ingest.DiffUploader(1)
+    differ.upload([{"row_hash": "keep"}, {"row_hash": "new"}, {"row_hash": "new"}])
+    assert differ.finish() == {"added": 1, "removed": 1, "kept": 1}
+    assert db["upserted"] == ["new"] and db["deleted"] == ["stale"]
+
+def test_no_delete_after_a_failed_batch(db):
+    differ = diff_ingest.DiffUploader(1)
+    differ.upload([{"row_hash": "keep"}])
+    db["fail"] = True
+    with pytest.raises(RuntimeError):
+        differ.upload([{"row_hash": "new"}])
+    assert differ.finish()["removed"] == 0
+    assert db["deleted"] == []
+
+def test_diff_hash_ignores_the_page():
+    row = {"pcode": "P1", "cat_num_desc": "פנס", "price": 10.0, "make": "טויוטה"}
+    on_page = [dict(row, page=3), dict(row, page=4)]
+    assert len(set(hashing.hash_rows(on_page, "fixed_diff"))) == 1
+    assert len(set(hashing.hash_rows(on_page, "fixed"))) == 2
@@ -0,0 +1,123 @@
+"""extraction.py against the deployed trigger functions, run in a scratch PostgreSQL schema.
+
+Uses TEST_DATABASE_URL, else a local pgserver instance; skipped when neither is available.
+"""
+import json
+import os
+import random
+import re
+import uuid
+
+import pytest
+
+import extraction
+from conftest import ROOT
+
+psycopg = pytest.importorskip("psycopg")
+
+SQL_DIR = os.path.join(ROOT, "supabase", "sql")
+DEPLOYED = os.path.join(SQL_DIR, "Phase5_Parts_Search_2025-10-05", "tests.md")
+FINAL_CLEAN = os.path.join(SQL_DIR, "Unassigned_SQL", "FINAL_CLEAN_DEPLOYMENT.sql")
+FUNCTIONS = ("auto_extract_catalog_data", "auto_fix_and_extract", "extract_model_and_year")
+# BEFORE INSERT triggers as deployed; PostgreSQL fires them by name
+TRIGGERS = (("auto_process_catalog_on_insert", "auto_extract_catalog_data"),
+            ("trigger_auto_fix_and_extract", "auto_fix_and_extract"),
+            ("trigger_extract_model_and_year", "extract_model_and_year"))
+COLUMNS = [f for f in extraction.FIELDS if f != "pre_extracted"] + ["make"]
+
+SAMPLES = [
+    "פנס אחורי שמאל קורולה 08-012",
+    "מגן קדמי ימין גולף 2009-2013",
+    "כנף קדמית שמאל A3 016-019",
+    "דלת אחורית ימין RAV4 013-",
+    "מראה ימין חשמלית X5 E70 010-013",
+    "גריל קדמי פאסאט 015-018 דיזל",
+    "טמבון אחורי פוקוס 89-01",
+    "רפלקטור שמאל 95-99 היבריד",
+    "ידית דלת חיצונית 2015 - 2018",
+    "מכסה תא מטען q5 09–12 בנזין",
+    "נורה ראשית 810-815",
+    "צמיג 205/55 r16",
+    "מקורי 1K0941005B",
+    "dep123456789 פנס",
+    "חלון שמשה f26 x3 017 חשמלי",
+    "זרקור ערפל -019 ",
+    "ABC",
+    "",
+]
+MAKES = ["טויוטה", "טויוטה יפן", "TOYOTA", "אודי", "VAG", "פולקסווגן גרמניה", "במוו", "bmw", " מרצדס בנץ ",
+         "יונדאי קוריאה", "", None]
+WORDS = ["פנס", "מגן", "כנף", "דלת", "מראה", "גריל", "טמבון", "רפלקטור", "ידית", "שמשה", "צמיג", "זרקור", "נורה",
+         "שמאל", "ימין", "קדמי", "אחורי", "קורולה", "קאמרי", "יאריס", "ראב", "גולף", "פולו", "פריוס", "טיגואן",
+         "דיזל", "בנזין", "היבריד", "חשמלי", "מכסה מנוע", "A4", "a5", "Q3", "s60", "t5", "e90", "g30", "rav4",
+         "08-012", "015-", "-019", "99-03", "90-95", "79-81", "189-191", "2010-2014", "12 – 15", "1K0941005B", "5N0807221", "-", "/"]
+
+def _deployed_functions():
+    with open(DEPLOYED, encoding="utf-8") as f:
+        dump = f.read()
+    out = []
+    for name in FUNCTIONS:
+        m = re.search(r'"definition": ("CREATE OR REPLACE FUNCTION public\.%s\(\).*?[^\\]")\n' % name, dump)
+        out.append(json.loads(m.group(1)).replace("FUNCTION public.", "FUNCTION "))
+    with open(FINAL_CLEAN, encoding="utf-8") as f:
+        clean = f.read()
+    m = re.search(r"CREATE OR REPLACE FUNCTION normalize_make\(.*?LANGUAGE plpgsql IMMUTABLE;", clean, re.S)
+    out.append(m.group(0))
+    return out
+
+def _database_url():
+    url = os.environ.get("TEST_DATABASE_URL")
+    if url:
+        return url
+    pgserver = pytest.importorskip("pgserver")
+    return pgserver.get_server(os.environ.get("PGSERVER_DIR", "/tmp/pgdata")).get_uri()
+
+@pytest.fixture(scope="module")
+def db():
+    try:
+        conn = psycopg.connect(_database_url(), autocommit=True)
+    except Exception as e:
+        pytest.skip(f"no PostgreSQL for the parity test: {e}")
+    schema = f"extraction_parity_{uuid.uuid4().hex[:8]}"
+    conn.execute(f"CREATE SCHEMA {schema}")
+    conn.execute(f"SET search_path TO {schema}")
+    conn.execute("""CREATE TABLE catalog_items (
+        id serial PRIMARY KEY, cat_num_desc text, make text, oem text, year_from int, year_to int,
+        year_range text, side_position text, front_rear text, part_family text, model_code text, model text,
+        engine_type text, part_name text, extracted_year text)""")
+    for sql in _deployed_functions():
+        conn.execute(sql)
+    for trigger, function in TRIGGERS:
+        conn.execute(f"CREATE TRIGGER {trigger} BEFORE INSERT ON catalog_items "
+                     f"FOR EACH ROW EXECUTE FUNCTION {function}()")
+    yield conn
+    conn.execute(f"DROP SCHEMA {schema} CASCADE")
+    conn.close()
+
+def _cases():
+    rnd = random.Random(20)
+    cases = [(desc, make) for desc in SAMPLES for make in MAKES[::3]]
+    cases += [(desc, "טויוטה") for _, desc in json.load(open(os.path.join(ROOT, "hebrew_corpus.json"), encoding="utf-8"))]
+    cases += [(" ".join(rnd.choices(WORDS, k=rnd.randint(1, 6))), rnd.choice(MAKES)) for _ in range(1500)]
+    cases.append((None, "אודי"))
+    return cases
+
+def test_extract_fields_matches_triggers(db):
+    cases = _cases()
+    with db.cursor() as cur:
+        cur.executemany("INSERT INTO catalog_items (cat_num_desc, make) VALUES (%s, %s)", cases)
+        cur.execute(f"SELECT {', '.join(COLUMNS)} FROM catalog_items ORDER BY id")
+        rows = cur.fetchall()
+    mismatches = []
+    for (desc, make), row in zip(cases, rows):
+        expected = dict(zip(COLUMNS, row))
+        got = extraction.extract_fields(desc, make)
+        if got != expected:
+            mismatches.append((desc, make, {k: (expected[k], got[k]) for k in COLUMNS if expected[k] != got[k]}))
+    assert not mismatches, mismatches[:10]
+
+def test_extract_rows_flags_rows():
+    rows = [{"cat_num_desc": "פנס אחורי שמאל 08-012", "make": "טויוטה יפן"}]
+    assert extraction.extract_rows(rows) == 1
+    assert rows[0]["pre_extracted"] is True
+    assert rows[0]["make"] == "טויוטה" and rows[0]["side_position"] == "שמאל"
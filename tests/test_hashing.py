@@ -0,0 +1,31 @@
+import hashlib
+
+import hashing
+from catalog_row import CatalogRow
+
+def test_compat_hashes_match_the_recipe_basis():
+    row = {"version_date": "2025-10-01", "pcode": "P1", "cat_num_desc": "פנס", "price": 12.5, "make": None}
+    expected = hashlib.sha256("2025-10-01|P1|פנס|12.5|None".encode("utf-8")).hexdigest()
+    assert hashing.hash_rows([row], "mpines") == [expected]
+    obj = CatalogRow(1, "P1", "פנס", 12.5, "src", None, "2025-10-01", 3)
+    assert hashing.hash_rows([obj], "mpines") == [expected]
+
+def test_generic_recipe_blanks_none():
+    row = dict.fromkeys(hashing.RECIPES["generic"][0])
+    row.update(version_date="d", price=3)
+    expected = hashlib.sha1("d||||||||3".encode("utf-8")).hexdigest()
+    assert hashing.hash_rows([row], "generic") == [expected]
+
+def test_row_hasher_drops_duplicates_within_and_across_batches():
+    hasher = hashing.RowHasher("mpines_diff")
+    rows = [{"pcode": "A", "cat_num_desc": "x", "price": 1, "make": "m"} for _ in range(2)]
+    assert len(hasher.apply(rows)) == 1
+    assert hasher.apply([dict(rows[0])]) == []
+    assert hasher.summary() == {"removed": 2, "in_batch": 1, "across_batches": 1}
+
+def test_generic_recipe_matches_utils_row_hash():
+    from utils import row_hash
+    fields = hashing.RECIPES["generic"][0]
+    rows = [dict(zip(fields, ("2025-10-01", "m-pines", "טויוטה", None, 2010, "כנף", None, "1", 12.5))),
+            dict(zip(fields, ("2025-10-01", "m-pines", None, None, None, "פנס", None, None, 0)))]
+    assert hashing.hash_rows(rows, "generic") == [row_hash(*(r[f] for f in fields)) for r in rows]
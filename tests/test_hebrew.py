@@ -0,0 +1,15 @@
+import json
+import os
+
+import hebrew
+from conftest import ROOT
+
+def test_fix_hebrew_matches_corpus():
+    with open(os.path.join(ROOT, "hebrew_corpus.json"), encoding="utf-8") as f:
+        corpus = json.load(f)
+    mismatches = [(raw, expected, hebrew.fix_hebrew_and_years(raw))
+                  for raw, expected in corpus if hebrew.fix_hebrew_and_years(raw) != expected]
+    assert not mismatches, mismatches[:10]
+
+def test_verify_reports_no_mismatches():
+    assert hebrew.verify() == 0
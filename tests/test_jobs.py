@@ -0,0 +1,115 @@
+import threading
+import time
+
+import pytest
+
+from tools.parts_search import jobs
+from tools.parts_search.bench import StubSink
+
+PARAMS = {"pdf_url": "http://example.invalid/catalog.pdf", "supplier": "m-pines", "version_date": "2025-10-01"}
+
+def download(url, fp, job):
+    with open(fp, "wb") as f:
+        f.write(b"%PDF stub")
+    return 9, "0" * 64
+
+def wait(job, timeout=5):
+    deadline = time.time() + timeout
+    while job.status in jobs.ACTIVE:
+        assert time.time() < deadline, f"job still {job.status}"
+        time.sleep(0.01)
+    return job
+
+@pytest.fixture(autouse=True)
+def pages(monkeypatch):
+    monkeypatch.setattr(jobs, "page_count", lambda fp: 3)
+    monkeypatch.delenv("OFFER_INDEX_DIR", raising=False)
+
+def make_queue(parse, sink=None, reload=None, **kwargs):
+    return jobs.JobQueue(workers=1, download=download, parse=parse, sink=sink or StubSink(),
+                         reload=reload or (lambda job: None), **kwargs)
+
+def parse_pages(gate=None):
+    def parse(job, fp, upload):
+        for page in range(1, 4):
+            if gate is not None:
+                gate.wait(5)
+            upload([{"pcode": f"P{page}", "price": page}])
+            job.pages_done = page
+            job.check()
+    return parse
+
+def test_job_runs_to_done_and_reloads_the_index():
+    sink, reloaded = StubSink(), []
+    queue = make_queue(parse_pages(), sink=sink, reload=reloaded.append)
+    job, created = queue.submit(dict(PARAMS))
+    assert created
+    wait(job)
+    d = job.to_dict()
+    assert (d["status"], d["pages_done"], d["rows_uploaded"], d["error"]) == ("done", 3, 3, None)
+    assert d["result"]["bytes"] == 9
+    assert sink.rows == 3 and sink.batches == 3
+    assert reloaded == [job]
+
+def test_identical_submission_returns_the_running_job():
+    gate = threading.Event()
+    queue = make_queue(parse_pages(gate))
+    job, created = queue.submit(dict(PARAMS))
+    again, created_again = queue.submit(dict(PARAMS))
+    other, created_other = queue.submit(dict(PARAMS, version_date="2025-11-01"))
+    assert created and not created_again and again is job
+    assert created_other and other is not job
+    gate.set()
+    assert wait(job).status == "done" and wait(other).status == "done"
+    after, created_after = queue.submit(dict(PARAMS))
+    assert created_after and after is not job
+    wait(after)
+
+def test_cancel_stops_a_running_job():
+    gate = threading.Event()
+    reloaded = []
+    queue = make_queue(parse_pages(gate), reload=reloaded.append)
+    job, _ = queue.submit(dict(PARAMS))
+    while job.status == "queued":
+        time.sleep(0.01)
+    assert queue.cancel(job.id).status == "cancelling"
+    gate.set()
+    assert wait(job).status == "cancelled"
+    assert job.pages_done < 3 and reloaded == []
+
+def test_cancel_of_a_queued_job():
+    gate = threading.Event()
+    queue = make_queue(parse_pages(gate))
+    first, _ = queue.submit(dict(PARAMS))
+    queued, _ = queue.submit(dict(PARAMS, version_date="2025-11-01"))
+    assert queue.cancel(queued.id).status == "cancelled"
+    gate.set()
+    assert wait(first).status == "done" and queued.pages_done == 0
+
+def test_full_queue_is_refused():
+    gate = threading.Event()
+    queue = make_queue(parse_pages(gate), max_queued=1)
+    job, _ = queue.submit(dict(PARAMS))
+    with pytest.raises(OverflowError):
+        queue.submit(dict(PARAMS, version_date="2025-11-01"))
+    gate.set()
+    wait(job)
+
+def test_failed_last_upload_fails_the_job():
+    def sink(rows):
+        if rows[0]["pcode"] == "P3":
+            raise IOError("upstream down")
+        return len(rows)
+
+    def parse(job, fp, upload):
+        for page in range(1, 4):
+            try:
+                upload([{"pcode": f"P{page}"}])
+            except Exception:
+                pass  # parsers that keep the rows for a later batch
+    reloaded = []
+    queue = make_queue(parse, sink=sink, reload=reloaded.append)
+    job, _ = queue.submit(dict(PARAMS))
+    wait(job)
+    assert job.status == "failed" and "upstream down" in job.error
+    assert job.to_dict()["upload_errors"] == 1 and reloaded == []
@@ -0,0 +1,52 @@
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+import offer_index
+
+def _write(root, supplier, rows):
+    w = offer_index.OfferWriter(supplier, "2025-10-01", str(root))
+    w.add(rows)
+    w.close()
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    monkeypatch.setattr(offer_index, "_partitions", {})
+    monkeypatch.setattr(offer_index, "_checked", 0.0)
+    _write(tmp_path, "a", [{"pcode": "04152-YZZA1", "oem_code": "OEM-1", "price": 50.0},
+                           {"pcode": "04152-YZZA1", "price": 40.0},
+                           {"pcode": "P9", "price": None}])
+    _write(tmp_path, "b", [{"pcode": "04152 yzza1", "price": 0.0}])
+    _write(tmp_path, "empty", [])
+    return str(tmp_path)
+
+def test_cheapest_across_suppliers(index):
+    [hit, oem, unpriced, missing, blank] = offer_index.cheapest(
+        ["04152yzza1", "oem 1", "P9", "NOPE", ""], offers=True, root=index)
+    assert hit["suppliers"] == 2
+    assert (hit["cheapest"]["supplier"], hit["cheapest"]["price"]) == ("b", 0.0)  # 0 is a price
+    assert [(o["supplier"], o["price"]) for o in hit["offers"]] == [("b", 0.0), ("a", 40.0)]
+    assert oem["cheapest"]["pcode"] == "04152-YZZA1" and oem["cheapest"]["price"] == 50.0
+    assert unpriced["cheapest"] is None and unpriced["suppliers"] == 1
+    assert missing["cheapest"] is None and missing["suppliers"] == 0 and missing["offers"] == []
+    assert blank["key"] == "" and blank["suppliers"] == 0
+
+def test_supplier_filter(index):
+    [hit] = offer_index.cheapest(["04152-YZZA1"], suppliers={"a"}, root=index)
+    assert hit["cheapest"]["supplier"] == "a" and hit["suppliers"] == 1
+
+def test_refresh_loads_empty_partitions_and_drops_removed_ones(index, monkeypatch):
+    monkeypatch.setattr(offer_index, "_partitions", {})  # as seen by another process
+    parts = offer_index.refresh(index, force=True)
+    assert sorted(parts) == ["a", "b", "empty"] and len(parts["empty"]["code"]) == 0
+    assert offer_index.cheapest(["X"], suppliers={"empty"}, root=index)[0]["suppliers"] == 0
+
+    os.remove(os.path.join(index, "b.npz"))
+    assert sorted(offer_index.refresh(index)) == ["a", "b", "empty"]  # within OFFER_INDEX_REFRESH_S
+    assert sorted(offer_index.refresh(index, force=True)) == ["a", "empty"]
+
+    stale = offer_index._partitions
+    _write(index, "a", [{"pcode": "04152-YZZA1", "price": 30.0}])
+    monkeypatch.setattr(offer_index, "_partitions", stale)  # rewritten by another process
+    assert offer_index.refresh(index, force=True)["a"]["price"].tolist() == [30.0]
@@ -0,0 +1,37 @@
+import pytest
+
+from conftest import write_catalog_pdf
+from page_cache import PageCache
+from suppliers import mpines, text_layer
+
+pdfplumber = pytest.importorskip("pdfplumber")
+
+def _parse(pdf, cache_dir=None):
+    rows = []
+    mpines.parse(pdf, "m-pines", "2025-10-01", "catalog.pdf", supplier_id=1, page_cache=cache_dir,
+                 upload=lambda batch: rows.extend(r.to_dict() for r in batch))
+    return rows
+
+def _keys(tmp_path, pdf, opener, pages, settings="s"):
+    cache = PageCache(str(tmp_path / "cache"))  # font digests are per document
+    with opener(pdf) as doc:
+        keys = [cache.key(doc, n, settings) for n in range(pages)]
+    cache.close()
+    return keys
+
+@pytest.mark.parametrize("opener", [pdfplumber.open, text_layer.open_document])
+def test_page_keys_follow_content_not_position(tmp_path, opener):
+    old = _keys(tmp_path, write_catalog_pdf(tmp_path / "old.pdf", pages=2), opener, 2)
+    new = _keys(tmp_path, write_catalog_pdf(tmp_path / "new.pdf", pages=3), opener, 3)
+    assert new[:2] == old and len(set(old)) == 2
+    assert new[2] not in old
+    assert _keys(tmp_path, tmp_path / "new.pdf", opener, 1, "other settings") != new[:1]
+
+def test_second_parse_reuses_unchanged_pages(tmp_path, capsys):
+    cache_dir = str(tmp_path / "cache")
+    _parse(write_catalog_pdf(tmp_path / "old.pdf", pages=2), cache_dir)
+    assert "Page cache: 0/2 pages reused" in capsys.readouterr().out
+    new = write_catalog_pdf(tmp_path / "new.pdf", pages=3)
+    cached = _parse(new, cache_dir)
+    assert "Page cache: 2/3 pages reused" in capsys.readouterr().out
+    assert cached == _parse(new)  # hits keep their new page numbers
@@ -0,0 +1,30 @@
+import time
+
+from conftest import write_catalog_pdf
+from page_watchdog import PageWatchdog
+from suppliers.mpines import _PageWorker
+
+class SlowWorker(_PageWorker):
+    """Extraction of slow_page never finishes in time; everything else is the real worker."""
+
+    slow_page = 1
+
+    def page(self, mode, page_num):
+        if mode == "extract" and page_num == self.slow_page:
+            time.sleep(30)
+        return super().page(mode, page_num)
+
+def test_timed_out_page_falls_back_to_the_text_layer(tmp_path):
+    pdf = write_catalog_pdf(tmp_path / "catalog.pdf")
+    watchdog = PageWatchdog(SlowWorker(pdf, 2), timeout=1, memory_mb=0)
+    try:
+        extracted, _, _, _ = watchdog.run(0)
+        fallback, errors, _, _ = watchdog.run(1)
+    finally:
+        watchdog.close()
+    assert errors == [] and len(fallback) == 3
+    # The fallback reads the same cells pdfplumber does
+    assert [r[:4] + (r[4][:-2],) for r in fallback] == [r[:4] + (r[4][:-2],) for r in extracted]
+    assert [r[4] for r in fallback] == ["P100-1", "P200-1", "P300-1"]
+    [record] = watchdog.report()["quarantined"]
+    assert record["page"] == 2 and record["reason"] == "timeout" and record["fallback"] == "ok"
@@ -0,0 +1,37 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+import price_history
+
+def _write(root, version, prices):
+    w = price_history.HistoryWriter("m-pines", version, str(root))
+    w.add([{"pcode": p, "price": price, "make": "טויוטה", "cat_num_desc": "פנס"} for p, price in prices.items()])
+    return w.close()
+
+@pytest.fixture
+def history(tmp_path):
+    _write(tmp_path, "2025-09-01", {"A": 100.0, "B": 0.0, "C": None, "D": 50.0, "E": 10.0, "G": None})
+    _write(tmp_path, "2025-10-01", {"A": 110.0, "B": 5.0, "C": None, "D": 50.0, "F": 7.0, "G": 20.0})
+    return str(tmp_path)
+
+def test_diff_treats_zero_as_a_price_and_nan_as_unknown(history):
+    d = price_history.diff("m-pines", root=history)
+    assert (d["old"], d["new"]) == ("2025-09-01", "2025-10-01")
+    assert d["counts"] == {"old": 6, "new": 6, "added": 1, "removed": 1, "repriced": 3, "unchanged": 2}
+    repriced = {r["pcode"]: r for r in d["repriced"]}
+    # 0 -> 5 and unknown -> 20 have no percentage, so they sort before the 10% change
+    assert [r["pcode"] for r in d["repriced"]] == ["B", "G", "A"]
+    assert repriced["B"]["old_price"] == 0.0 and repriced["B"]["delta"] == 5.0 and repriced["B"]["pct"] is None
+    assert repriced["G"]["old_price"] is None and repriced["G"]["price"] == 20.0
+    assert repriced["A"]["pct"] == 10.0
+    assert [r["pcode"] for r in d["added"]] == ["F"] and [r["pcode"] for r in d["removed"]] == ["E"]
+
+def test_min_pct_keeps_changes_without_a_percentage(history):
+    d = price_history.diff("m-pines", min_pct=20, root=history)
+    assert [r["pcode"] for r in d["repriced"]] == ["B", "G"]
+
+def test_duplicate_pcodes_keep_the_first_row(tmp_path):
+    w = price_history.HistoryWriter("m-pines", "v1", str(tmp_path))
+    w.add([{"pcode": "A", "price": 1.0}, {"pcode": "A", "price": 2.0}, {"pcode": None, "price": 3.0}])
+    assert w.close()["duplicates"] == 1
+    assert price_history.load("m-pines", "v1", str(tmp_path))["price"].tolist() == [1.0]
@@ -0,0 +1,65 @@
+import gzip
+import json
+
+import pytest
+
+from tools.parts_search import search_index
+from tools.parts_search.search_index import CatalogIndex
+
+ROWS = [
+    {"id": 1, "pcode": "A1", "cat_num_desc": "כנף קדמית שמאל קורולה 08-012", "make": "טויוטה", "price": 450.0},
+    {"id": 2, "pcode": "A2", "cat_num_desc": "כנף אחורית ימין", "make": "טויוטה", "price": None},
+    {"id": 3, "pcode": "A3", "cat_num_desc": "פנס אחורי ימין", "make": "מאזדה", "price": 0},
+    {"id": 4, "pcode": "A4", "cat_num_desc": "מכסה מנוע קורולה", "make": "טויוטה", "price": 1200.0},
+    {"id": 5, "pcode": "A5", "cat_num_desc": "כנפיים קדמיות", "make": "טויוטה", "price": 90.0},
+]
+
+@pytest.fixture
+def index():
+    return CatalogIndex(ROWS, supplier="m-pines", version="v1")
+
+def ids(results):
+    return [r["id"] for r in results]
+
+def test_results_are_cheapest_first_with_missing_prices_last(index):
+    assert ids(index.search()) == [3, 5, 1, 4, 2]
+
+def test_term_matches_words_and_ranks_by_price(index):
+    # "כנף" matches the word itself and, through trigrams, the longer "כנפיים" (final letter folded)
+    assert ids(index.search("כנף")) == [5, 1, 2]
+    assert ids(index.search("כנף קורולה")) == [1]
+    assert ids(index.search("כנף", limit=2)) == [5, 1]
+
+def test_trigram_fallback_matches_inside_words(index):
+    assert ids(index.search("ורול")) == [1, 4]
+    assert ids(index.search("ימי")) == [3, 2]
+    assert index.search("זזז") == []
+
+def test_price_filter_keeps_zero_and_drops_missing(index):
+    assert ids(index.search(max_price=100)) == [3, 5]
+    assert ids(index.search(min_price=0)) == [3, 5, 1, 4]
+    assert ids(index.search(min_price=100, max_price=1200)) == [1, 4]
+    assert ids(index.search("כנף", min_price=1)) == [5, 1]
+
+def test_make_and_year_filters(index):
+    assert ids(index.search(make="מאזדה")) == [3]
+    assert ids(index.search(year_from=2010, year_to=2011)) == [1]
+
+def test_load_swaps_the_index_atomically(tmp_path, monkeypatch):
+    monkeypatch.setattr(search_index, "_indexes", {})
+    artifact = tmp_path / "catalog.ndjson.gz"
+
+    def stage(rows):
+        with gzip.open(artifact, "wt", encoding="utf-8") as f:
+            f.writelines(json.dumps(r, ensure_ascii=False) + "\n" for r in rows)
+
+    stage(ROWS)
+    search_index.load("m-pines", str(artifact), "v1")
+    before = search_index._indexes
+    stage(ROWS[:2])
+    new = search_index.load("m-pines", str(artifact), "v2")
+    # The registry is replaced, not mutated: a reader holding the old one keeps a consistent view
+    assert len(before["m-pines"]) == 5
+    assert search_index._indexes is not before and search_index._indexes["m-pines"] is new
+    assert search_index.loaded() == {"m-pines": {"rows": 2, "version": "v2"}}
+    assert ids(search_index.search(q="כנף")) == [1, 2]
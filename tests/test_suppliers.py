@@ -0,0 +1,24 @@
+import os
+
+import pytest
+
+import parser as ingest
+import suppliers
+from tools.parts_search import suppliers as tools_suppliers
+
+def test_builtin_parsers_resolve_inside_their_own_package():
+    plugin = tools_suppliers.get("m-pines")
+    assert plugin.module_name == "tools.parts_search.suppliers.mpines"
+    assert plugin.module.__file__.endswith(os.path.join("tools", "parts_search", "suppliers", "mpines.py"))
+    assert suppliers.get("m-pines").module_name == "suppliers.mpines"
+
+def test_unknown_supplier():
+    with pytest.raises(KeyError, match="no-such"):
+        suppliers.get("no-such")
+
+def test_run_many_rejects_per_catalog_shared_settings(monkeypatch):
+    monkeypatch.setenv("SUPABASE_POOL_SIZE", "10")
+    catalogs = [{"SUPPLIER_SLUG": "m-pines", "VERSION_DATE": "2025-10-01", "SUPABASE_POOL_SIZE": "10"},
+                {"SUPPLIER_SLUG": "other", "VERSION_DATE": "2025-10-01", "SUPABASE_POOL_SIZE": 4}]
+    with pytest.raises(ValueError, match="other: SUPABASE_POOL_SIZE"):
+        ingest.run_many(catalogs)
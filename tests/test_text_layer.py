@@ -0,0 +1,35 @@
+import pytest
+
+from conftest import CATALOG_ROWS, write_catalog_pdf
+from suppliers import mpines, text_layer
+
+pdfplumber = pytest.importorskip("pdfplumber")
+
+def test_column_layout_reads_the_cells_pdfplumber_reads(tmp_path):
+    pdf = write_catalog_pdf(tmp_path / "catalog.pdf")
+    doc = text_layer.open_document(pdf)
+    layout = text_layer.ColumnLayout.learn(doc[0])
+    with pdfplumber.open(pdf) as plumber:
+        for n in range(2):
+            [table] = plumber.pages[n].extract_tables()
+            assert layout.rows(doc[n]) == table[1:]  # header row dropped
+    doc.close()
+
+def test_learn_needs_every_header_word(tmp_path):
+    fitz = pytest.importorskip("fitz")
+    doc = fitz.open()
+    doc.new_page().insert_text((40, 60), "Make  Expr2  Price  CatNumDesc")
+    assert text_layer.ColumnLayout.learn(doc[0]) is None
+
+def test_text_engine_parses_the_same_rows(tmp_path):
+    pdf = write_catalog_pdf(tmp_path / "catalog.pdf", pages=3)
+
+    def parse(engine):
+        rows = []
+        mpines.parse(pdf, "m-pines", "2025-10-01", "catalog.pdf", supplier_id=1, engine=engine,
+                     upload=lambda batch: rows.extend(r.to_dict() for r in batch))
+        return rows
+
+    text_rows = parse("text")
+    assert len(text_rows) == len(CATALOG_ROWS) * 3
+    assert text_rows == parse("pdfplumber")
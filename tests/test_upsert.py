@@ -0,0 +1,102 @@
+import gzip
+import json
+
+import pytest
+
+import supabase_io
+from batching import AdaptiveBatcher
+
+class Response:
+    def __init__(self, status_code, body=None):
+        self.status_code = status_code
+        self.content = json.dumps(body).encode() if body is not None else b""
+        self.text = self.content.decode()
+
+    def json(self):
+        return json.loads(self.content)
+
+class FakeSession:
+    """Answers POSTs like PostgREST, with 413 for bodies over max_rows rows."""
+
+    def __init__(self, max_rows=None):
+        self.max_rows = max_rows
+        self.status = None  # answer every upsert with this status instead
+        self.requests = []
+        self.stored = []
+
+    def post(self, url, headers, data, timeout):
+        body = data if isinstance(data, bytes) else b"".join(data)
+        gzipped = headers.get("Content-Encoding") == "gzip"
+        payload = json.loads(gzip.decompress(body) if gzipped else body)
+        self.requests.append((url, gzipped, payload))
+        if "/rpc/" in url:
+            return Response(200, {"ok": True})
+        if self.status:
+            return Response(self.status, {"message": "rejected"})
+        if self.max_rows and len(payload) > self.max_rows:
+            return Response(413, {"message": "Payload too large"})
+        self.stored.extend(payload)
+        return Response(201)
+
+@pytest.fixture
+def session(monkeypatch):
+    s = FakeSession()
+    monkeypatch.setattr(supabase_io, "get_session", lambda: s)
+    monkeypatch.setattr(supabase_io.pg_copy, "get_loader", lambda: None)
+    monkeypatch.setattr(supabase_io, "_batchers", {})
+    return s
+
+def _rows(n):
+    return [{"row_hash": f"h{i}", "pcode": f"P{i}", "cat_num_desc": "פנס אחורי", "price": i} for i in range(n)]
+
+def test_oversized_requests_are_split_until_they_fit(session):
+    session.max_rows = 60
+    rows = _rows(500)
+    assert supabase_io.upsert_rows("catalog_items", rows) == 500
+    assert [r["row_hash"] for r in session.stored] == [r["row_hash"] for r in rows]
+    stats = supabase_io.upload_stats()["catalog_items"]
+    assert stats["splits"] > 0 and stats["rows"] == 500
+    assert stats["rows_per_request_ceiling"] <= 60 * 2
+
+def test_request_failing_at_min_rows_raises(session):
+    session.max_rows = 1
+    with pytest.raises(RuntimeError, match="413"):
+        supabase_io.upsert_rows("catalog_items", _rows(100))
+
+@pytest.mark.parametrize("status", [400, 409, 422])
+def test_client_errors_fail_without_splitting(session, status):
+    session.status = status
+    with pytest.raises(supabase_io.UpsertError) as e:
+        supabase_io.upsert_rows("catalog_items", _rows(500))
+    assert e.value.status == status
+    assert len(session.requests) == 1
+
+@pytest.mark.parametrize("status", [413, 500, 504])
+def test_size_and_server_errors_split(session, status):
+    session.status = status
+    with pytest.raises(supabase_io.UpsertError):
+        supabase_io.upsert_rows("catalog_items", _rows(100))
+    assert supabase_io.upload_stats()["catalog_items"]["splits"] > 0
+
+def test_batcher_retries_each_half():
+    sent, calls = [], []
+
+    def send(chunk):
+        calls.append(len(chunk))
+        if len(chunk) > 30:
+            raise TimeoutError("too slow")
+        sent.extend(chunk)
+
+    batcher = AdaptiveBatcher(send, min_rows=10, start_rows=100, max_rows=100)
+    assert batcher(list(range(100))) == 100
+    assert sent == list(range(100))
+    assert calls[:3] == [100, 50, 25]
+
+def test_gzip_only_for_upserts(session, monkeypatch):
+    monkeypatch.setattr(supabase_io, "GZIP_BODIES", True)
+    supabase_io.upsert_rows("catalog_items", _rows(10))
+    supabase_io.rpc("some_function", {"x": 1})
+    supabase_io.upsert_supplier("m-pines", "m-pines")
+    assert [(url.split("/rest/v1/")[1], gzipped) for url, gzipped, _ in session.requests] == [
+        ("catalog_items?on_conflict=row_hash", True), ("rpc/some_function", False),
+        ("suppliers?on_conflict=slug", False)]
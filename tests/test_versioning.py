@@ -0,0 +1,174 @@
+"""parser.main against SESSION_37 (versioned catalogs) in a scratch PostgreSQL schema.
+
+Supabase calls go straight to the database; uses TEST_DATABASE_URL, else a
+local pgserver instance, and is skipped when neither is available.
+"""
+import os
+import tempfile
+import threading
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+import parser as ingest
+import supabase_io
+import versioning
+from conftest import ROOT
+
+psycopg = pytest.importorskip("psycopg")
+
+SESSION_37 = os.path.join(ROOT, "supabase", "sql", "Phase5_Parts_Search_2025-10-05",
+                          "SESSION_37_VERSIONED_CATALOG_INGEST.sql")
+
+def _database_url():
+    url = os.environ.get("TEST_DATABASE_URL")
+    if url:
+        return url
+    pgserver = pytest.importorskip("pgserver")
+    return pgserver.get_server(os.environ.get("PGSERVER_DIR", "/tmp/pgdata")).get_uri()
+
+class Query:
+    """The slice of the supabase-py query builder parser.main and versioning use."""
+
+    def __init__(self, db, table):
+        self.db, self.table, self.where, self.action, self.count = db, table, [], "select", None
+
+    def select(self, columns, count=None):
+        self.columns, self.count = columns, count
+        return self
+
+    def delete(self):
+        self.action = "delete"
+        return self
+
+    def eq(self, column, value):
+        self.where.append((column, value))
+        return self
+
+    def single(self):
+        self.action = "single"
+        return self
+
+    def execute(self):
+        cond = " AND ".join(f"{c} = %s" for c, _ in self.where) or "true"
+        params = [v for _, v in self.where]
+        if self.action == "delete":
+            self.db.execute(f"DELETE FROM {self.table} WHERE {cond}", params)
+            return SimpleNamespace(data=[], count=None)
+        if self.count:
+            n = self.db.execute(f"SELECT count(*) FROM {self.table} WHERE {cond}", params).fetchone()[0]
+            return SimpleNamespace(data=[], count=n)
+        cur = self.db.execute(f"SELECT {self.columns} FROM {self.table} WHERE {cond}", params)
+        data = [dict(zip([d.name for d in cur.description], (str(v) for v in row))) for row in cur.fetchall()]
+        return SimpleNamespace(data=data[0] if self.action == "single" else data, count=None)
+
+class FakeParser:
+    slug = "test-supplier"
+
+    def __init__(self):
+        self.prices = None
+        self.error = None  # raised after uploading
+
+    def supports(self, feature):
+        return feature in ("stream", "diff", "versioned")
+
+    def parse(self, pdf_path, supplier_slug, version_date, source_path, upload=None, catalog_version=None, **options):
+        supplier = versioning.get_client().table("suppliers").select("id").eq("slug", supplier_slug).single().execute()
+        supplier_id = supplier.data["id"]
+        upload([{"supplier_id": supplier_id, "pcode": pcode, "price": price, "catalog_version": catalog_version,
+                 "row_hash": f"{pcode}:{price}:{catalog_version}"} for pcode, price in self.prices])
+        if self.error:
+            raise self.error
+        return []
+
+@pytest.fixture
+def db(monkeypatch, tmp_path):
+    try:
+        conn = psycopg.connect(_database_url(), autocommit=True)
+    except Exception as e:
+        pytest.skip(f"no PostgreSQL for the versioning test: {e}")
+    schema = f"versioning_{uuid.uuid4().hex[:8]}"
+    conn.execute(f"CREATE SCHEMA {schema}")
+    conn.execute(f"SET search_path TO {schema}")
+    conn.execute("""CREATE TABLE suppliers (id uuid PRIMARY KEY DEFAULT gen_random_uuid(), slug text UNIQUE, name text)""")
+    conn.execute("""CREATE TABLE catalog_items (
+        id uuid PRIMARY KEY DEFAULT gen_random_uuid(), supplier_id uuid REFERENCES suppliers(id), pcode text,
+        cat_num_desc text, price numeric, oem text, make text, model text, part_family text, side_position text,
+        version_date date, availability text, extracted_year text, model_display text, year_from int, year_to int,
+        supplier_name text, location text, comments text, created_at timestamptz DEFAULT now(), source text,
+        row_hash text UNIQUE)""")
+    with open(SESSION_37, encoding="utf-8") as f:
+        conn.execute(f.read().split("-- 5. Readers")[0])  # tables, view and version functions
+    lock = threading.Lock()  # upload workers share the connection
+
+    def execute(sql, params=()):
+        with lock:
+            return conn.execute(sql, params)
+
+    db = SimpleNamespace(execute=execute)
+    client = SimpleNamespace(table=lambda name: Query(db, name))
+
+    def upsert_rows(table, rows):
+        for r in rows:
+            execute(f"INSERT INTO {table} (supplier_id, pcode, price, catalog_version, row_hash) "
+                    "VALUES (%(supplier_id)s, %(pcode)s, %(price)s, %(catalog_version)s, %(row_hash)s) "
+                    "ON CONFLICT (row_hash) DO NOTHING", r)
+        return len(rows)
+
+    def rpc(function, params, timeout=60):
+        args = ", ".join(f"{k} => %({k})s" for k in params)
+        return execute(f"SELECT {function}({args})", params).fetchone()[0]
+
+    def download_to_file(url, expected_sha256=None):
+        fd, path = tempfile.mkstemp(suffix=".pdf")
+        os.write(fd, url.encode())
+        os.close(fd)
+        return path, len(url), url.ljust(64, "0")
+
+    parser = FakeParser()
+    monkeypatch.setattr(supabase_io, "get_client", lambda: client)
+    monkeypatch.setattr(supabase_io, "upsert_supplier",
+                        lambda slug, name: execute("INSERT INTO suppliers (slug, name) VALUES (%s, %s) "
+                                                   "ON CONFLICT (slug) DO NOTHING", (slug, name)))
+    monkeypatch.setattr(supabase_io, "upsert_rows", upsert_rows)
+    monkeypatch.setattr(supabase_io, "download_to_file", download_to_file)
+    monkeypatch.setattr(versioning, "get_client", lambda: client)
+    monkeypatch.setattr(versioning, "rpc", rpc)
+    monkeypatch.setattr(ingest.suppliers, "get", lambda slug: parser)
+    monkeypatch.setenv("CHECKPOINT_DIR", str(tmp_path))
+    yield SimpleNamespace(execute=execute, parser=parser)
+    conn.execute(f"DROP SCHEMA {schema} CASCADE")
+    conn.close()
+
+def _ingest(db, mode, signed_url, prices):
+    db.parser.prices = prices
+    ingest.main({"SUPPLIER_SLUG": "test-supplier", "VERSION_DATE": "2025-10-18", "SOURCE_PATH": "test.pdf",
+                 "SIGNED_URL": signed_url, "INGEST_MODE": mode, "UPLOAD_WORKERS": "1", "CATALOG_GC": "0"})
+
+def _visible(db):
+    return sorted(db.execute("SELECT pcode, price::int FROM catalog_items_current").fetchall())
+
+def test_replace_after_versioned_ingest_flips_a_new_version(db):
+    _ingest(db, "replace", "legacy", [("P1", 5)])
+    assert _visible(db) == [("P1", 5)]
+    _ingest(db, "versioned", "first", [("P1", 10)])
+    assert _visible(db) == [("P1", 10)]
+    _ingest(db, "replace", "second", [("P1", 20), ("P2", 30)])
+    assert _visible(db) == [("P1", 20), ("P2", 30)]
+    # The replaced version is retired, not deleted, so it can still be rolled back to
+    statuses = dict(db.execute("SELECT catalog_version, status FROM catalog_versions").fetchall())
+    assert sorted(statuses.values()) == ["current", "retired"]
+
+def test_diff_after_versioned_ingest_is_rejected(db):
+    _ingest(db, "versioned", "first", [("P1", 10)])
+    with pytest.raises(ValueError, match="INGEST_MODE=versioned"):
+        _ingest(db, "diff", "second", [("P1", 20)])
+    assert _visible(db) == [("P1", 10)]
+
+def test_failed_parse_shuts_the_upload_pipeline_down(db):
+    db.parser.error = RuntimeError("bad page")
+    with pytest.raises(RuntimeError, match="bad page"):
+        _ingest(db, "replace", "legacy", [("P1", 5)])
+    assert not [t for t in threading.enumerate() if t.name.startswith("upload")]
+    assert _visible(db) == [("P1", 5)]  # the batch submitted before the error was uploaded
@@ -0,0 +1,282 @@
+"""Ingest benchmark: synthetic M-Pines PDFs through each parser into a local stub sink.
+
+    python -m tools.parts_search.main bench --pages 10 500 5000 --out bench_results.json
+
+Every (parser, size) case runs in its own subprocess so peak RSS is per case
+and the root and tools copies of `utils`/`suppliers` never share sys.modules.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(os.path.dirname(HERE))
+
+PARSERS = ("mpines", "fixed", "tools")
+DEFAULT_PAGES = (10, 500, 5000)
+ROWS_PER_PAGE = 40
+FONT_PATH = os.environ.get("BENCH_FONT", "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf")
+
+MAKES = ["טויוטה", "יונדאי", "מאזדה", "קיה", "סקודה", "פולקסווגן", "מיצובישי", "ניסאן"]
+SOURCES = ["מקורי", "תחליפי", "משומש", "חליפי"]
+PARTS = ["פנס אחורי", "מגן קדמי", "כנף שמאל", "מראה ימין", "דלת אחורית", "מכסה מנוע", "גריל", "פח אחורי"]
+MODELS = ["קורולה", "i30", "ספורטאז'", "אוקטביה", "גולף", "אאוטלנדר", "CX5", "טוסון"]
+
+# ---------------- Synthetic PDFs ----------------
+
+def _visual(text: str) -> str:
+    # M-Pines PDFs store RTL cells in visual order, so extraction yields them reversed
+    return text[::-1]
+
+def _rows(rng, count):
+    for _ in range(count):
+        y1 = rng.randint(0, 20)
+        desc = f"{rng.choice(PARTS)} {rng.choice(MODELS)} {y1:02d}-{y1 + rng.randint(1, 6):03d}"
+        yield (
+            _visual(rng.choice(MAKES)),
+            _visual(rng.choice(SOURCES)),
+            f"{rng.randint(50, 9000)}.{rng.randint(0, 99):02d}",
+            _visual(desc),
+            f"{rng.choice('ABCDEFGHK')}{rng.randint(10000, 99999)}-{rng.randint(1, 9)}",
+        )
+
+def make_pdf(path: str, pages: int, rows_per_page: int = ROWS_PER_PAGE, seed: int = 1):
+    """Write an M-Pines-layout PDF: one ruled 5-column table (Make/Expr2/Price/CatNumDesc/Pcode) per page."""
+    try:
+        from reportlab.lib.pagesizes import A4
+        from reportlab.pdfbase import pdfmetrics
+        from reportlab.pdfbase.ttfonts import TTFont
+        from reportlab.pdfgen import canvas
+    except ImportError:
+        raise SystemExit("The benchmark needs reportlab to generate PDFs: pip install reportlab")
+
+    pdfmetrics.registerFont(TTFont("BenchHebrew", FONT_PATH))
+    rng = random.Random(seed)
+    width, height = A4
+    cols = [30, 110, 180, 240, 470, 565]  # x of the vertical rules
+    row_h = (height - 80) / (rows_per_page + 1)
+    header = ("Make", "Expr2", "Price", "CatNumDesc", "Pcode")
+
+    c = canvas.Canvas(path, pagesize=A4)
+    for _ in range(pages):
+        c.setFont("BenchHebrew", 7)
+        top = height - 40
+        lines = [header] + list(_rows(rng, rows_per_page))
+        bottom = top - row_h * len(lines)
+        for x in cols:
+            c.line(x, top, x, bottom)
+        for i, cells in enumerate(lines):
+            y = top - row_h * i
+            c.line(cols[0], y, cols[-1], y)
+            for x, cell in zip(cols, cells):
+                c.drawString(x + 2, y - row_h + 3, cell)
+        c.line(cols[0], bottom, cols[-1], bottom)
+        c.showPage()
+    c.save()
+
+def fixture(workdir: str, pages: int) -> str:
+    os.makedirs(workdir, exist_ok=True)
+    path = os.path.join(workdir, f"mpines_{pages}p.pdf")
+    if not os.path.exists(path):
+        t = time.perf_counter()
+        make_pdf(path + ".tmp", pages)
+        os.replace(path + ".tmp", path)
+        print(f"Generated {path} in {time.perf_counter() - t:.1f}s")
+    return path
+
+# ---------------- Child process: one case ----------------
+
+def _json_default(obj):
+    # Compact row objects (catalog_row.py) are materialized like the REST body does
+    return obj.to_dict()
+
+def deep_size(obj, seen=None) -> int:
+    """Bytes retained by obj and everything it references, counting shared objects once."""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(k, seen) + deep_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_size(v, seen) for v in obj)
+    elif hasattr(obj, "__slots__"):
+        slots = [s for cls in type(obj).__mro__ for s in getattr(cls, "__slots__", ())]
+        size += sum(deep_size(getattr(obj, s), seen) for s in slots if hasattr(obj, s))
+    return size
+
+class StubSink:
+    """Stands in for upsert_rows: serializes the batch like the REST body and counts it.
+
+    The first batch is also measured in memory to report bytes per parsed row.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.batches = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.bytes_per_row = None
+
+    def __call__(self, rows):
+        if self.bytes_per_row is None and rows:
+            self.bytes_per_row = round(deep_size(rows) / len(rows), 1)
+        t = time.perf_counter()
+        self.bytes += len(json.dumps(rows, ensure_ascii=False, default=_json_default).encode("utf-8"))
+        self.rows += len(rows)
+        self.batches += 1
+        self.seconds += time.perf_counter() - t
+        return len(rows)
+
+def _peak_rss_mb() -> float:
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def _run_case(parser: str, pdf_path: str, workers: int, with_metrics: bool = False, engine: str = "pdfplumber") -> dict:
+    # Never talk to a real project from the benchmark
+    os.environ["SUPABASE_URL"] = "http://127.0.0.1:9"
+    os.environ["SUPABASE_SERVICE_KEY"] = "bench"
+    sys.path[0] = HERE if parser == "tools" else ROOT
+    sys.path.append(ROOT)  # metrics.py lives at the repo root
+    import metrics
+    metrics.enable(with_metrics)
+    sink = StubSink()
+
+    t = time.perf_counter()
+    if parser == "mpines":
+        from suppliers import mpines
+        imported = time.perf_counter()
+        mpines.parse(pdf_path, "m-pines", "bench", pdf_path, workers=workers, upload=sink, supplier_id=0,
+                     engine=engine)
+    elif parser == "fixed":
+        from utils import chunked
+        import parse_mpines_fixed
+        imported = time.perf_counter()
+        rows = parse_mpines_fixed.parse_mpines_pdf(pdf_path)
+        for batch in chunked(rows, 500):
+            sink(batch)
+    else:
+        from utils import chunked
+        from suppliers import mpines
+        imported = time.perf_counter()
+        with open(pdf_path, "rb") as f:
+            rows = mpines.parse(f.read(), "m-pines", "bench", pdf_path)
+        for batch in chunked(rows, 800):
+            sink(batch)
+    done = time.perf_counter()
+
+    result = {
+        "rows": sink.rows,
+        "batches": sink.batches,
+        "payload_bytes": sink.bytes,
+        "bytes_per_row": sink.bytes_per_row,
+        "seconds": round(done - imported, 3),
+        "stages": {
+            "import": round(imported - t, 3),
+            "parse": round(done - imported - sink.seconds, 3),
+            "serialize": round(sink.seconds, 3),
+        },
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+    if with_metrics:
+        result["metrics"] = metrics.registry.snapshot()
+    return result
+
+# ---------------- Driver ----------------
+
+def run_case(parser: str, pdf_path: str, pages: int, workers: int = 1, with_metrics: bool = False,
+             engine: str = "pdfplumber") -> dict:
+    cmd = [sys.executable, os.path.abspath(__file__), "--child", parser, pdf_path, "--workers", str(workers),
+           "--engine", engine]
+    if with_metrics:
+        cmd.append("--metrics")
+    proc = subprocess.run(cmd, cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    result = {"parser": parser, "pages": pages, "workers": workers}
+    if parser == "mpines":
+        result["engine"] = engine
+    if proc.returncode != 0:
+        result["error"] = (proc.stderr.strip().splitlines() or ["exit %d" % proc.returncode])[-1]
+        return result
+    result.update(json.loads(proc.stdout.strip().splitlines()[-1]))
+    secs = result["seconds"] or 1e-9
+    result["pages_per_s"] = round(pages / secs, 1)
+    result["rows_per_s"] = round(result["rows"] / secs, 1)
+    return result
+
+def _git_rev():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, stdout=subprocess.PIPE,
+                              stderr=subprocess.DEVNULL, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+def compare(results: list, baseline_path: str):
+    """Print rows/s and peak RSS change against an earlier results file."""
+    with open(baseline_path, encoding="utf-8") as f:
+        old = {(r["parser"], r["pages"], r.get("workers", 1)): r for r in json.load(f)["results"]}
+    for r in results:
+        prev = old.get((r["parser"], r["pages"], r["workers"]))
+        if not prev or "error" in r or "error" in prev:
+            continue
+        speed = (r["rows_per_s"] / prev["rows_per_s"] - 1) * 100 if prev["rows_per_s"] else 0
+        rss = r["peak_rss_mb"] - prev["peak_rss_mb"]
+        print(f"  {r['parser']:7} {r['pages']:>5}p  rows/s {speed:+.1f}%  peak RSS {rss:+.1f} MB")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="bench", description=__doc__.splitlines()[0])
+    ap.add_argument("--pages", type=int, nargs="+", default=list(DEFAULT_PAGES))
+    ap.add_argument("--parsers", nargs="+", choices=PARSERS, default=list(PARSERS))
+    ap.add_argument("--workers", type=int, default=1, help="PARSER_WORKERS for suppliers/mpines")
+    ap.add_argument("--workdir", default=os.environ.get("BENCH_DIR", os.path.join(ROOT, ".bench")))
+    ap.add_argument("--out", default="bench_results.json")
+    ap.add_argument("--baseline", help="earlier results file to compare against")
+    ap.add_argument("--engine", choices=("pdfplumber", "text", "auto"), default="pdfplumber",
+                    help="extraction engine for suppliers/mpines")
+    ap.add_argument("--metrics", action="store_true", help="collect metrics.py stage timings (adds some overhead)")
+    ap.add_argument("--child", nargs=2, metavar=("PARSER", "PDF"), help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(_run_case(args.child[0], args.child[1], args.workers, args.metrics, args.engine)))
+        return
+
+    results = []
+    for pages in args.pages:
+        pdf_path = fixture(args.workdir, pages)
+        for parser in args.parsers:
+            r = run_case(parser, pdf_path, pages, args.workers if parser == "mpines" else 1, args.metrics,
+                         args.engine)
+            results.append(r)
+            if "error" in r:
+                print(f"{parser:7} {pages:>5}p  FAILED: {r['error']}")
+            else:
+                print(f"{parser:7} {pages:>5}p  {r['pages_per_s']:>7} pages/s  {r['rows_per_s']:>9} rows/s  "
+                      f"peak {r['peak_rss_mb']} MB  {r['bytes_per_row']} B/row  stages {r['stages']}")
+
+    report = {
+        "meta": {
+            "git": _git_rev(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "rows_per_page": ROWS_PER_PAGE,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.out}")
+    if args.baseline:
+        compare(results, args.baseline)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+"""Background ingest jobs for server.py: POST /ingest queues, GET /jobs/<id> reports progress.
+
+A job downloads the PDF, parses it with the supplier's parser and hands each batch
+to a sink (upsert_rows into catalog_items, or StubSink with INGEST_SINK=stub).
+A job that uploaded everything reloads the supplier's search index.
+Identical submissions while one is queued or running return the same job.
+
+Local run without Supabase:
+
+    python -m http.server -d .bench 8001 &
+    INGEST_SINK=stub gunicorn tools.parts_search.server:app
+    curl -XPOST localhost:8000/ingest -d '{"pdf_url": "http://127.0.0.1:8001/mpines_500p.pdf", "supplier_id": 0}'
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import metrics
+
+INGEST_WORKERS = int(os.environ.get("INGEST_WORKERS", "2"))        # jobs running at once
+INGEST_QUEUE_MAX = int(os.environ.get("INGEST_QUEUE_MAX", "16"))   # queued + running before 503
+INGEST_JOBS_KEEP = int(os.environ.get("INGEST_JOBS_KEEP", "200"))  # finished jobs kept for GET /jobs
+
+ACTIVE = ("queued", "running", "cancelling")
+
+class Cancelled(BaseException):
+    # Not an Exception: mpines.parse catches those from upload() and keeps going
+    pass
+
+class Job:
+    def __init__(self, params: dict, key: str):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.params = params
+        self.status = "queued"
+        self.error = None
+        self.result = None
+        self.bytes_downloaded = 0
+        self.pages_total = None
+        self.pages_done = 0
+        self.rows_uploaded = 0
+        self.upload_errors = 0
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.cancel_event = threading.Event()
+
+    def check(self):
+        if self.cancel_event.is_set():
+            raise Cancelled()
+
+    def to_dict(self) -> dict:
+        end = self.finished or time.time()
+        elapsed = end - self.started if self.started else 0.0
+        return {
+            "id": self.id,
+            "status": self.status,
+            "pdf_url": self.params.get("pdf_url"),
+            "supplier": self.params.get("supplier"),
+            "version_date": self.params.get("version_date"),
+            "bytes_downloaded": self.bytes_downloaded,
+            "pages_total": self.pages_total,
+            "pages_done": self.pages_done,
+            "rows_uploaded": self.rows_uploaded,
+            "upload_errors": self.upload_errors,
+            "elapsed_s": round(elapsed, 2),
+            "pages_per_s": round(self.pages_done / elapsed, 2) if elapsed else None,
+            "rows_per_s": round(self.rows_uploaded / elapsed, 1) if elapsed else None,
+            "error": self.error,
+            "result": self.result,
+        }
+
+def job_key(params: dict) -> str:
+    """Submissions with the same source, checksum and target are the same job."""
+    basis = {k: params.get(k) for k in ("pdf_url", "sha256", "supplier", "supplier_id", "version_date")}
+    return hashlib.sha256(json.dumps(basis, sort_keys=True).encode("utf-8")).hexdigest()
+
+def download_to(url, fp, job=None, chunk_size=1 << 20):
+    """Stream url into fp chunk by chunk; check Content-Length and return (size, sha256)."""
+    digest = hashlib.sha256()
+    size = 0
+    with requests.get(url, stream=True, timeout=30) as r, open(fp, "wb") as f:
+        r.raise_for_status()
+        for chunk in r.iter_content(chunk_size=chunk_size):
+            f.write(chunk)
+            digest.update(chunk)
+            size += len(chunk)
+            if job:
+                job.bytes_downloaded = size
+                job.check()
+        expected = r.headers.get("Content-Length")
+        if expected and not r.headers.get("Content-Encoding") and int(expected) != size:
+            raise IOError(f"Truncated download: got {size} of {expected} bytes")
+    return size, digest.hexdigest()
+
+def page_count(fp) -> int:
+    import pdfplumber
+    with pdfplumber.open(fp) as pdf:
+        return len(pdf.pages)
+
+def parse_supplier(job, fp, upload):
+    """Parse with the supplier's registered parser, uploading per batch and recording pages done."""
+    import suppliers
+    parser = suppliers.get(job.params["supplier"])
+    if not (parser.supports("stream") and parser.supports("resume")):
+        raise ValueError(f"{parser.slug} parser cannot stream batches with progress")
+
+    def on_uploaded(page_end):
+        job.pages_done = page_end
+        job.check()
+
+    if os.environ.get("INGEST_SINK") != "stub":
+        check_unversioned(job.params["supplier"], job.params.get("supplier_id"))
+
+    options = {"upload": upload, "on_uploaded": on_uploaded, "supplier_id": job.params.get("supplier_id")}
+    if parser.supports("parallel"):
+        options["workers"] = int(os.environ.get("INGEST_PARSER_WORKERS", "1"))
+    if parser.supports("text_layer"):
+        options["engine"] = os.environ.get("PARSER_ENGINE", "pdfplumber")
+    page_timeout = float(os.environ.get("PAGE_TIMEOUT_S", "0"))  # off unless set: costs a process and IPC per page
+    if page_timeout and parser.supports("watchdog"):
+        options["page_timeout"] = page_timeout
+        options["page_memory_mb"] = int(os.environ.get("PAGE_MEMORY_MB", "4096"))
+    p = job.params
+    parser.parse(fp, p["supplier"], p["version_date"], p.get("source_path") or p["pdf_url"], **options)
+
+def check_unversioned(slug, supplier_id=None):
+    """Jobs write untagged rows, which catalog_items_current hides once the supplier has a current version."""
+    import versioning
+    supplier_id = supplier_id or versioning.get_supplier_id(slug)
+    current = versioning.current(supplier_id) if supplier_id else None
+    if current:
+        raise ValueError(f"{slug} is on catalog version {current}; ingest it with INGEST_MODE=versioned")
+
+def supabase_sink(rows):
+    from supabase_io import upsert_rows
+    return upsert_rows("catalog_items", rows)
+
+def reload_index(job):
+    """Swap in a fresh search index of the job's supplier (in the background, like POST /search/load)."""
+    if os.environ.get("INGEST_SINK") == "stub":
+        return  # nothing reached the DB
+    from tools.parts_search import search_index
+    threading.Thread(target=search_index.load, args=(job.params["supplier"],), daemon=True).start()
+
+def default_sink():
+    if os.environ.get("INGEST_SINK") == "stub":
+        # Never talk to a real project from a stub run (parsers import supabase_io)
+        os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:9")
+        os.environ.setdefault("SUPABASE_SERVICE_KEY", "stub")
+        from tools.parts_search.bench import StubSink
+        return StubSink()
+    return supabase_sink
+
+class JobQueue:
+    """Bounded pool of ingest jobs.
+
+    download(url, fp, job), parse(job, fp, upload) and sink(rows) are the
+    source, parser and DB hooks, reload(job) runs once a job is done; tests
+    and local runs swap in stubs.
+    Cancellation is cooperative: the job stops at the next downloaded chunk
+    or uploaded page block.
+    """
+
+    def __init__(self, workers: int = INGEST_WORKERS, max_queued: int = INGEST_QUEUE_MAX,
+                 download=download_to, parse=parse_supplier, sink=None, reload=reload_index):
+        self.download = download
+        self.parse = parse
+        self.sink = sink or default_sink()
+        self.reload = reload
+        self.max_queued = max_queued
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest")
+        self.lock = threading.Lock()
+        self.jobs = OrderedDict()  # id -> Job, oldest first
+        self.active = {}           # key -> Job while queued or running
+
+    def submit(self, params: dict):
+        """Queue a job; returns (job, created). Raises OverflowError when the queue is full."""
+        key = job_key(params)
+        with self.lock:
+            job = self.active.get(key)
+            if job is not None:
+                return job, False
+            if len(self.active) >= self.max_queued:
+                raise OverflowError(f"{len(self.active)} ingest jobs already queued or running")
+            job = Job(params, key)
+            self.jobs[job.id] = job
+            self.active[key] = job
+            self._prune()
+        self.pool.submit(self._run, job)
+        metrics.count("ingest_jobs_submitted")
+        return job, True
+
+    def get(self, job_id: str):
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str):
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        with self.lock:
+            if job.status == "queued":
+                self._finish(job, "cancelled")
+            elif job.status == "running":
+                job.status = "cancelling"
+                job.cancel_event.set()
+                if self.active.get(job.key) is job:
+                    del self.active[job.key]  # a new identical submission starts fresh
+        return job
+
+    def list_jobs(self) -> list:
+        return [j.to_dict() for j in reversed(self.jobs.values())]
+
+    def _prune(self):
+        done = [j for j in self.jobs.values() if j.status not in ACTIVE]
+        for j in done[:max(0, len(done) - INGEST_JOBS_KEEP)]:
+            del self.jobs[j.id]
+
+    def _finish(self, job, status, error=None):
+        job.status = status
+        job.error = error
+        job.finished = time.time()
+        if self.active.get(job.key) is job:
+            del self.active[job.key]
+
+    def _run(self, job):
+        with self.lock:
+            if job.status != "queued":
+                return  # cancelled while waiting
+            job.status = "running"
+            job.started = time.time()
+        sink = self.sink
+        upload_error = None
+        offers = None
+        if os.environ.get("OFFER_INDEX_DIR"):
+            import offer_index
+            offers = offer_index.OfferWriter(job.params["supplier"], job.params["version_date"],
+                                             os.environ["OFFER_INDEX_DIR"])
+
+        def upload(rows):
+            nonlocal upload_error
+            job.check()
+            try:
+                n = sink(rows)
+            except Exception as e:
+                job.upload_errors += 1
+                upload_error = f"{type(e).__name__}: {e}"
+                raise
+            upload_error = None  # the parser resends kept rows, so a success covers earlier failures
+            job.rows_uploaded += len(rows)
+            if offers:
+                offers.add(rows)
+            return n
+
+        try:
+            with tempfile.TemporaryDirectory() as td:
+                fp = os.path.join(td, "input.pdf")
+                with metrics.timer("download"):
+                    size, sha256 = self.download(job.params["pdf_url"], fp, job)
+                metrics.count("bytes_downloaded", size)
+                expected = job.params.get("sha256")
+                if expected and expected.lower() != sha256:
+                    raise ValueError(f"checksum mismatch: got {sha256}")
+                job.pages_total = page_count(fp)
+                with metrics.timer("parse"):
+                    self.parse(job, fp, upload)
+            if upload_error:
+                raise RuntimeError(f"last upload failed: {upload_error}")
+            if offers:
+                offers.close()  # only a complete catalog replaces the supplier's offers
+            job.result = {"bytes": size, "sha256": sha256}
+            status, error = "done", None
+        except Cancelled:
+            status, error = "cancelled", None
+        except Exception as e:
+            status, error = "failed", f"{type(e).__name__}: {e}"
+        with self.lock:
+            self._finish(job, status, error)
+        if status == "done" and self.reload:
+            try:
+                self.reload(job)
+            except Exception as e:
+                print(f"Ingest job {job.id}: search index reload failed: {e}")
+        metrics.count(f"ingest_jobs_{status}")
+        print(f"Ingest job {job.id} {status}: {job.pages_done}/{job.pages_total} pages, "
+              f"{job.rows_uploaded} rows" + (f" ({error})" if error else ""))
@@ -1,4 +1,16 @@
-def run():
+import sys
+
+def run(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == "bench":
+        from tools.parts_search import bench
+        return bench.main(argv[1:])
+    if argv and argv[0] == "loadbench":
+        from tools.parts_search import loadbench
+        return loadbench.main(argv[1:])
+    if argv and argv[0] == "prices":
+        import price_history
+        return price_history.main(argv[1:])
     print("Parts Search tool is connected correctly (isolated).")
 
 if __name__ == "__main__":
@@ -1,16 +1,7 @@
-import os, requests
+import os
 from utils import chunked
-from supabase_io import upsert_rows, upsert_supplier, upsert_catalog, mark_catalog_done
-from suppliers import mpines
-
-SUPPLIER_MAP = {
-    "m-pines": mpines,
-}
-
-def download_signed(signed_url: str) -> bytes:
-    r = requests.get(signed_url, timeout=600)
-    r.raise_for_status()
-    return r.content
+from supabase_io import upsert_rows, upsert_supplier, upsert_catalog, mark_catalog_done, download_to_file
+import suppliers
 
 def main():
     supplier_slug = os.environ["SUPPLIER_SLUG"]
@@ -18,16 +9,20 @@ def main():
     signed_url    = os.environ["SIGNED_URL"]
     source_path   = os.environ["SOURCE_PATH"]
 
-    parser = SUPPLIER_MAP[supplier_slug]
+    parser = suppliers.get(supplier_slug)  # imported lazily on first parse
 
     upsert_supplier(supplier_slug, name=supplier_slug)
     upsert_catalog(supplier_slug, version_date, source_path)
 
-    pdf_bytes = download_signed(signed_url)
-    rows = parser.parse(pdf_bytes, supplier_slug, version_date, source_path)
+    # Streamed to a temp file, so memory does not grow with the PDF
+    pdf_path, size, _ = download_to_file(signed_url)
+    try:
+        rows = parser.parse(pdf_path, supplier_slug, version_date, source_path)
+    finally:
+        os.unlink(pdf_path)
 
     total = 0
-    for batch in chunked(rows, 800):
+    for batch in chunked(rows, int(os.environ.get("UPLOAD_BATCH_ROWS", "5000"))):  # split further per request
         total += upsert_rows("catalog_items", batch)
 
     mark_catalog_done(supplier_slug, version_date)
@@ -0,0 +1,250 @@
+import bisect
+import gzip
+import heapq
+import json
+import os
+import re
+import threading
+import time
+import requests
+
+_HEBREW = re.compile(r"[\u0590-\u05FF]")
+_NIQQUD = re.compile(r"[\u0591-\u05C7]")
+_TOKEN = re.compile(r"[\w\-/.]+")
+_YEARS = re.compile(r"(\d{2,4})-(\d{2,4})")
+_FINALS = str.maketrans("ךםןףץ", "כמנפצ")
+
+def normalize(text) -> str:
+    """Lowercase, drop niqqud and fold Hebrew final letters so 'כנף' matches 'כנפ'."""
+    if not text:
+        return ""
+    return _NIQQUD.sub("", str(text)).lower().translate(_FINALS)
+
+def tokens(text):
+    return _TOKEN.findall(normalize(text))
+
+def _year(s: str) -> int:
+    # Same century rules as the extract_model_and_year trigger
+    n = int(s)
+    if len(s) == 2:
+        return 1900 + n if n >= 80 else 2000 + n
+    if len(s) == 3:
+        return 1900 + n if n >= 100 else 2000 + n
+    return n
+
+def year_range(row):
+    """(year_from, year_to) from the row, or parsed from cat_num_desc like the DB trigger does."""
+    if row.get("year_from") or row.get("year_to"):
+        return row.get("year_from"), row.get("year_to")
+    m = _YEARS.search(row.get("cat_num_desc") or "")
+    if not m:
+        return None, None
+    y1, y2 = _year(m.group(1)), _year(m.group(2))
+    if 1980 <= y1 <= y2 <= 2030:
+        return y1, y2
+    return None, None
+
+def price_key(row):
+    price = row["price"]
+    return (price is None, 0 if price is None else price)
+
+class CatalogIndex:
+    """Immutable in-memory index over one supplier catalog version.
+
+    Words of cat_num_desc, pcode, make and source go into an inverted index;
+    every vocabulary word is also indexed by its character trigrams so a
+    query term matches inside longer Hebrew words (prefixes, construct forms).
+    """
+
+    FIELDS = ("id", "pcode", "cat_num_desc", "make", "source", "price", "version_date")
+
+    def __init__(self, rows, supplier: str = None, version: str = None):
+        self.supplier = supplier
+        self.version = version
+        self.rows = []
+        self.years = []
+        postings = {}
+        by_make = {}
+        for row_id, row in enumerate(rows):
+            self.rows.append({k: row.get(k) for k in self.FIELDS})
+            self.years.append(year_range(row))
+            for field in ("cat_num_desc", "pcode", "make", "source"):
+                for tok in tokens(row.get(field)):
+                    postings.setdefault(tok, set()).add(row_id)
+            make = normalize(row.get("make")).strip()
+            if make:
+                by_make.setdefault(make, set()).add(row_id)
+
+        self.postings = postings
+        self.by_make = by_make
+        self.vocab = sorted(postings)
+        self.trigrams = {}
+        for word in self.vocab:
+            for i in range(len(word) - 2):
+                self.trigrams.setdefault(word[i:i + 3], set()).add(word)
+
+        # Row ids ordered like smart_parts_search (price ASC NULLS LAST; 0 is a price);
+        # rank[i] is the position of row i in that order, prices the bisect keys of the priced prefix
+        self.by_price = sorted(range(len(self.rows)), key=lambda i: price_key(self.rows[i]))
+        self.rank = [0] * len(self.rows)
+        for pos, i in enumerate(self.by_price):
+            self.rank[i] = pos
+        self.prices = [self.rows[i]["price"] for i in self.by_price if self.rows[i]["price"] is not None]
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _words_matching(self, term: str):
+        if len(term) < 3:
+            # Short terms: prefix match over the sorted vocabulary
+            i = bisect.bisect_left(self.vocab, term)
+            out = []
+            while i < len(self.vocab) and self.vocab[i].startswith(term):
+                out.append(self.vocab[i])
+                i += 1
+            return out
+        grams = [self.trigrams.get(term[i:i + 3], set()) for i in range(len(term) - 2)]
+        candidates = set.intersection(*sorted(grams, key=len))
+        return [w for w in candidates if term in w]
+
+    def _term_ids(self, term: str) -> set:
+        variants = {term}
+        if _HEBREW.search(term):
+            variants.add(normalize(term[::-1]))  # stored text may still be visually reversed
+        sets = [self.postings[word] for v in variants for word in self._words_matching(v)]
+        if len(sets) == 1:
+            return sets[0]  # shared, never mutated
+        return set().union(*sets)
+
+    def search(self, q: str = None, make: str = None, min_price: float = None, max_price: float = None,
+               year_from: int = None, year_to: int = None, limit: int = 50):
+        candidates = None
+        for term in tokens(q):
+            ids = self._term_ids(term)
+            candidates = ids if candidates is None else candidates & ids
+            if not candidates:
+                return []
+        if make:
+            m = normalize(make).strip()
+            ids = self.by_make.get(m)
+            if ids is None:
+                ids = set().union(*(rows for key, rows in self.by_make.items() if m in key))
+            candidates = ids if candidates is None else candidates & ids
+            if not candidates:
+                return []
+
+        # Price filter is a slice of the price-ordered row list; rows without a price only match unfiltered
+        start = 0 if min_price is None else bisect.bisect_left(self.prices, min_price)
+        if max_price is not None:
+            stop = bisect.bisect_right(self.prices, max_price)
+        else:
+            stop = len(self.by_price) if min_price is None else len(self.prices)
+        has_years = year_from is not None or year_to is not None
+
+        def keep(i):
+            if has_years:
+                y1, y2 = self.years[i]
+                if y1 is None:
+                    return False
+                if year_to is not None and y1 > year_to:
+                    return False
+                if year_from is not None and (y2 or y1) < year_from:
+                    return False
+            return True
+
+        rank = self.rank
+        if candidates is None or len(candidates) * 8 > stop - start:
+            # Dense match: walk in price order and stop after `limit` hits
+            hits = []
+            by_price = self.by_price
+            for pos in range(start, stop):
+                i = by_price[pos]
+                if (candidates is None or i in candidates) and keep(i):
+                    hits.append(i)
+                    if len(hits) >= limit:
+                        break
+        else:
+            # Sparse match: filter the candidates and take the `limit` cheapest
+            matching = (i for i in candidates if start <= rank[i] < stop and keep(i))
+            hits = heapq.nsmallest(limit, matching, key=rank.__getitem__)
+
+        out = []
+        for i in hits:
+            row = dict(self.rows[i])
+            row["year_from"], row["year_to"] = self.years[i]
+            row["supplier"] = self.supplier
+            out.append(row)
+        return out
+
+# ---------------- Loading ----------------
+
+def rows_from_artifact(path: str):
+    """Rows from a staged .ndjson.gz artifact (see staging.py at the repo root)."""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def rows_from_db(supplier_slug: str, page_size: int = 1000):
+    """Stream a supplier's current catalog from PostgREST, keyset-paged by id.
+
+    Reads the catalog_items_current view (versioned ingest) and falls back to
+    catalog_items where that migration is not deployed.
+    """
+    base = os.environ["SUPABASE_URL"].rstrip("/") + "/rest/v1"
+    key = os.environ["SUPABASE_SERVICE_KEY"]
+    headers = {"Authorization": f"Bearer {key}", "apikey": key}
+    with requests.Session() as s:
+        r = s.get(f"{base}/suppliers", headers=headers, params={"select": "id", "slug": f"eq.{supplier_slug}"}, timeout=30)
+        r.raise_for_status()
+        if not r.json():
+            return
+        supplier_id = r.json()[0]["id"]
+        last = None
+        table = "catalog_items_current"
+        select = "id,pcode,cat_num_desc,make,source,price,version_date,year_from,year_to"
+        while True:
+            params = {"select": select, "supplier_id": f"eq.{supplier_id}", "order": "id.asc", "limit": str(page_size)}
+            if last is not None:
+                params["id"] = f"gt.{last}"
+            r = s.get(f"{base}/{table}", headers=headers, params=params, timeout=60)
+            if r.status_code == 404 and table != "catalog_items" and last is None:
+                table = "catalog_items"
+                continue
+            r.raise_for_status()
+            data = r.json()
+            yield from data
+            if len(data) < page_size:
+                return
+            last = data[-1]["id"]
+
+# ---------------- Registry (atomic hot swap) ----------------
+
+_lock = threading.Lock()
+_indexes = {}  # supplier slug -> CatalogIndex; replaced wholesale, never mutated
+
+def load(supplier_slug: str, artifact: str = None, version: str = None) -> CatalogIndex:
+    """Build a new index from a staged artifact or the DB and swap it in atomically."""
+    global _indexes
+    t = time.perf_counter()
+    rows = rows_from_artifact(artifact) if artifact else rows_from_db(supplier_slug)
+    index = CatalogIndex(rows, supplier=supplier_slug, version=version)
+    with _lock:
+        swapped = dict(_indexes)
+        swapped[supplier_slug] = index
+        _indexes = swapped  # readers holding the old dict keep a consistent view
+    print(f"Search index for {supplier_slug} ({version or 'db'}): {len(index)} rows in {time.perf_counter() - t:.1f}s")
+    return index
+
+def loaded():
+    return {slug: {"rows": len(ix), "version": ix.version} for slug, ix in _indexes.items()}
+
+def search(supplier: str = None, limit: int = 50, **filters):
+    indexes = _indexes
+    targets = [indexes[supplier]] if supplier in indexes else ([] if supplier else list(indexes.values()))
+    results = []
+    for ix in targets:
+        results.extend(ix.search(limit=limit, **filters))
+    results.sort(key=price_key)
+    return results[:limit]
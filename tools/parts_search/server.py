@@ -1,27 +1,145 @@
-from flask import Flask, request, jsonify
-import tempfile, os, requests
-try:
-    from tools.parts_search import parser
-    HAVE_PARSER = hasattr(parser, "parse_pdf")
-except Exception:
-    parser = None
-    HAVE_PARSER = False
+from flask import Flask, Response, request, jsonify
+import os, threading, time
+from tools.parts_search import search_index
+import metrics
+from tools.parts_search.jobs import JobQueue
 
 app = Flask(__name__)
+jobs = JobQueue()
+OFFERS_MAX_CODES = int(os.environ.get("OFFERS_MAX_CODES", "1000"))
 
 @app.post("/ingest")
 def ingest():
+    """Queue an ingest job and return its id at once; poll GET /jobs/<id> for progress."""
     data = request.get_json(force=True) or {}
     pdf_url = data.get("pdf_url")
     if not pdf_url:
         return jsonify(ok=False, error="pdf_url required"), 400
-    with tempfile.TemporaryDirectory() as td:
-        fp = os.path.join(td, "input.pdf")
-        r = requests.get(pdf_url, timeout=30)
-        r.raise_for_status()
-        with open(fp, "wb") as f: f.write(r.content)
-        result = parser.parse_pdf(fp) if HAVE_PARSER else {"note": "stub", "file": os.path.basename(fp)}
-    return jsonify(ok=True, result=result)
+    params = {
+        "pdf_url": pdf_url,
+        "sha256": (data.get("sha256") or "").lower() or None,
+        "supplier": data.get("supplier", "m-pines"),
+        "supplier_id": data.get("supplier_id"),
+        "version_date": data.get("version_date") or time.strftime("%Y-%m-%d"),
+        "source_path": data.get("source_path"),
+    }
+    try:
+        job, created = jobs.submit(params)
+    except OverflowError as e:
+        return jsonify(ok=False, error=str(e)), 503
+    metrics.count("ingest_requests")
+    return jsonify(ok=True, job_id=job.id, duplicate=not created, job=job.to_dict()), 202
+
+@app.get("/jobs")
+def jobs_list():
+    return jsonify(ok=True, jobs=jobs.list_jobs())
+
+@app.get("/jobs/<job_id>")
+def job_status(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify(ok=False, error="unknown job"), 404
+    return jsonify(ok=True, job=job.to_dict())
+
+@app.delete("/jobs/<job_id>")
+def job_cancel(job_id):
+    job = jobs.cancel(job_id)
+    if job is None:
+        return jsonify(ok=False, error="unknown job"), 404
+    return jsonify(ok=True, job=job.to_dict())
+
+@app.get("/search")
+def search():
+    a = request.args
+    t = time.perf_counter()
+    results = search_index.search(
+        supplier=a.get("supplier"),
+        q=a.get("q"),
+        make=a.get("make"),
+        min_price=a.get("min_price", type=float),
+        max_price=a.get("max_price", type=float),
+        year_from=a.get("year_from", type=int),
+        year_to=a.get("year_to", type=int),
+        limit=min(a.get("limit", 50, type=int), 500),
+    )
+    took = time.perf_counter() - t
+    metrics.registry.observe("search", took)
+    took_ms = round(took * 1000, 2)
+    return jsonify(ok=True, count=len(results), took_ms=took_ms, results=results)
+
+@app.post("/search/load")
+def search_load():
+    """Rebuild a supplier index from a staged artifact or the DB; swapped in when ready."""
+    data = request.get_json(force=True) or {}
+    supplier = data.get("supplier")
+    if not supplier:
+        return jsonify(ok=False, error="supplier required"), 400
+    threading.Thread(target=search_index.load, args=(supplier, data.get("artifact"), data.get("version")), daemon=True).start()
+    return jsonify(ok=True, loading=supplier), 202
+
+@app.get("/search/status")
+def search_status():
+    return jsonify(ok=True, indexes=search_index.loaded())
+
+@app.get("/prices/diff")
+def prices_diff():
+    """Added/removed/repriced pcodes between two price history versions (default: the last two)."""
+    import price_history
+    a = request.args
+    supplier = a.get("supplier")
+    if not supplier:
+        return jsonify(ok=False, error="supplier required"), 400
+    try:
+        result = price_history.diff(supplier, a.get("old"), a.get("new"), limit=min(a.get("limit", 50, type=int), 5000),
+                                    min_pct=a.get("min_pct", 0.0, type=float))
+    except (ValueError, FileNotFoundError) as e:
+        return jsonify(ok=False, error=str(e)), 404
+    return jsonify(ok=True, **result)
+
+@app.get("/prices/versions")
+def prices_versions():
+    import price_history
+    supplier = request.args.get("supplier")
+    if not supplier:
+        return jsonify(ok=False, error="supplier required"), 400
+    try:
+        return jsonify(ok=True, supplier=supplier, versions=price_history.versions(supplier))
+    except ValueError as e:
+        return jsonify(ok=False, error=str(e)), 400
+
+@app.post("/offers/cheapest")
+def offers_cheapest():
+    """Cheapest offer across suppliers for each pcode/OEM code of a batch (e.g. every part of an estimate)."""
+    import offer_index
+    data = request.get_json(force=True) or {}
+    codes = data.get("codes")
+    if not isinstance(codes, list) or not codes:
+        return jsonify(ok=False, error="codes (a non-empty list) required"), 400
+    if len(codes) > OFFERS_MAX_CODES:
+        return jsonify(ok=False, error=f"at most {OFFERS_MAX_CODES} codes per request"), 413
+    t = time.perf_counter()
+    results = offer_index.cheapest([str(c) if c is not None else "" for c in codes],
+                                   suppliers=data.get("suppliers"), offers=bool(data.get("offers")))
+    took = time.perf_counter() - t
+    metrics.registry.observe("offers", took)
+    found = sum(1 for r in results if r["cheapest"])
+    return jsonify(ok=True, count=len(results), found=found, took_ms=round(took * 1000, 2), results=results)
+
+@app.get("/offers/status")
+def offers_status():
+    import offer_index
+    return jsonify(ok=True, suppliers=offer_index.status())
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """Prometheus text format; only served when INGEST_METRICS=1."""
+    if not metrics.registry.enabled:
+        return jsonify(ok=False, error="metrics disabled (set INGEST_METRICS=1)"), 404
+    return Response(metrics.registry.prometheus(), mimetype="text/plain; version=0.0.4")
+
+# Comma-separated supplier slugs to index from the DB at startup
+for _slug in filter(None, os.environ.get("SEARCH_SUPPLIERS", "").split(",")):
+    threading.Thread(target=search_index.load, args=(_slug.strip(),), daemon=True).start()
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", "8000"))
@@ -1,2 +1,25 @@
-# empty package initializer
+"""Supplier parser registry of the tools copy (lookup rules in supplier_registry.py at the repo root).
 
+Every parser module has parse(pdf_source, supplier_slug, version_date,
+source_path), pdf_source being a file path or bytes, returning the rows and
+may declare CAPABILITIES; builtin entries declare them here so they are known
+without importing the module.
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)  # supplier_registry.py lives at the repo root
+from supplier_registry import ENTRY_POINT_GROUP, Registry, SupplierPlugin
+
+# What parse() supports beyond the base signature
+#   text_fallback - plain-text lines when no tables are found
+BUILTIN = {
+    "m-pines": (__name__ + ".mpines", ("text_fallback",)),
+}
+
+_registry = Registry(__name__, BUILTIN)
+register = _registry.register
+get = _registry.get
+plugins = _registry.plugins
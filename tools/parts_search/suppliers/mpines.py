@@ -1,16 +1,18 @@
 import io, re, pdfplumber, fitz
-from utils import row_hash
+from hashing import RowHasher
 
 def _num(s):
     if not s: return None
     z = re.sub(r"[^\d.]", "", s)
     return float(z) if z else None
 
-def parse(pdf_bytes: bytes, supplier_slug: str, version_date: str, source_path: str) -> list[dict]:
+def parse(pdf_source, supplier_slug: str, version_date: str, source_path: str) -> list[dict]:
+    """Rows of a PDF given as a file path or bytes."""
     rows = []
+    in_memory = isinstance(pdf_source, (bytes, bytearray))
 
     # Try structured tables with pdfplumber
-    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+    with pdfplumber.open(io.BytesIO(pdf_source) if in_memory else pdf_source) as pdf:
         for page in pdf.pages:
             tables = page.extract_tables() or []
             for tbl in tables:
@@ -44,12 +46,11 @@ def parse(pdf_bytes: bytes, supplier_slug: str, version_date: str, source_path:
                         "availability": None,
                         "raw_row": {"cells": cells}
                     }
-                    row["row_hash"] = row_hash(version_date, supplier_slug, row["make"], row["model"], row["year"], row["part_name"], row["oem_code"], row["unit"], row["price"])
                     rows.append(row)
 
     # Fallback: text mode with PyMuPDF
     if not rows:
-        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+        doc = fitz.open(stream=bytes(pdf_source), filetype="pdf") if in_memory else fitz.open(pdf_source)
         for page in doc:
             for line in page.get_text("text").splitlines():
                 parts = re.split(r"\s{2,}", line.strip())
@@ -75,8 +76,12 @@ def parse(pdf_bytes: bytes, supplier_slug: str, version_date: str, source_path:
                     "availability": None,
                     "raw_row": {"line": line}
                 }
-                row["row_hash"] = row_hash(version_date, supplier_slug, None, None, None, part_name, None, None, price)
                 rows.append(row)
 
+    # Same hashes as utils.row_hash; repeated rows would fail the whole upsert
+    hasher = RowHasher("generic")
+    rows = hasher.apply(rows)
+    if hasher.removed:
+        print(f"Dropped {hasher.removed} duplicate rows")
     return rows
 
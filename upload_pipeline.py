@@ -0,0 +1,111 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+class UploadPipeline:
+    """Bounded producer/consumer uploader.
+
+    The parser calls submit(rows) and keeps parsing while `workers` threads
+    run upload(rows) in the background. At most `max_pending` batches are
+    queued or in flight; submit() blocks beyond that, so memory stays bounded
+    when the network is slower than parsing.
+
+    mark(tag) records a point in the submission stream; on_commit(tag) is
+    called once every batch submitted before it has uploaded successfully.
+    Marks are never passed while an earlier batch has failed.
+    """
+
+    def __init__(self, upload, workers: int = 4, max_pending: int = None, on_commit=None):
+        self.upload = upload
+        self.on_commit = on_commit
+        self.pending = deque()  # futures and ("mark", tag) entries not yet committed
+        self.workers = workers
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="upload")
+        self.slots = threading.BoundedSemaphore(max_pending or workers * 2)
+        self.lock = threading.Lock()
+        self.batches = []  # (batch_no, row_count, future), in submission order
+        self.rows_submitted = 0
+        self.rows_uploaded = 0
+        self.blocked_seconds = 0.0
+        self.upload_started = None
+        self.upload_finished = None
+        self.started = time.perf_counter()
+
+    def submit(self, rows) -> int:
+        t = time.perf_counter()
+        self.slots.acquire()  # backpressure
+        self.blocked_seconds += time.perf_counter() - t
+
+        batch_no = len(self.batches) + 1
+        future = self.pool.submit(self._run, rows)
+        with self.lock:
+            self.pending.append(future)
+        future.add_done_callback(self._done)
+        self.batches.append((batch_no, len(rows), future))
+        self.rows_submitted += len(rows)
+        return len(rows)
+
+    def mark(self, tag):
+        with self.lock:
+            self.pending.append(("mark", tag))
+            self._advance()
+
+    def _done(self, future):
+        self.slots.release()
+        with self.lock:
+            self._advance()
+
+    def _advance(self):
+        # Called with self.lock held
+        while self.pending:
+            entry = self.pending[0]
+            if isinstance(entry, tuple):
+                if self.on_commit:
+                    self.on_commit(entry[1])
+            elif not entry.done() or entry.exception() is not None:
+                return
+            self.pending.popleft()
+
+    def _run(self, rows):
+        t = time.perf_counter()
+        with self.lock:
+            if self.upload_started is None:
+                self.upload_started = t
+        self.upload(rows)
+        done = time.perf_counter()
+        with self.lock:
+            self.rows_uploaded += len(rows)
+            self.upload_finished = done
+        return done - t
+
+    def close(self) -> dict:
+        """Wait for all uploads and return a summary with per-batch errors in batch order."""
+        parse_seconds = time.perf_counter() - self.started - self.blocked_seconds
+        self.pool.shutdown(wait=True)
+
+        errors = []
+        busy = 0.0
+        for batch_no, count, future in self.batches:
+            exc = future.exception()
+            if exc is not None:
+                errors.append({"batch": batch_no, "rows": count, "error": str(exc)})
+                print(f"Batch {batch_no} ({count} rows) failed: {exc}")
+            else:
+                busy += future.result()
+
+        upload_span = (self.upload_finished or 0) - (self.upload_started or 0)
+        summary = {
+            "batches": len(self.batches),
+            "rows_submitted": self.rows_submitted,
+            "rows_uploaded": self.rows_uploaded,
+            "failed_batches": errors,
+            "parse_rows_per_s": round(self.rows_submitted / parse_seconds, 1) if parse_seconds > 0 else None,
+            "upload_rows_per_s": round(self.rows_uploaded / upload_span, 1) if upload_span > 0 else None,
+            "upload_busy_seconds": round(busy, 3),
+            "parse_blocked_seconds": round(self.blocked_seconds, 3),
+        }
+        print(f"Parse: {summary['parse_rows_per_s']} rows/s, "
+              f"upload: {summary['upload_rows_per_s']} rows/s "
+              f"({self.rows_uploaded}/{self.rows_submitted} rows, {len(errors)} failed batches)")
+        return summary
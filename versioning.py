@@ -0,0 +1,83 @@
+import hashlib
+import sys
+import threading
+from supabase_io import rpc, get_supplier_id, get_client
+
+# Versioned ingest (INGEST_MODE=versioned): rows are written under a new
+# catalog_version, invisible to catalog_items_current until flip().
+# Once a supplier has a current version, parser.py runs replace ingests as
+# versioned ones and refuses diff ingests (their rows would be hidden).
+# SQL side: SESSION_37_VERSIONED_CATALOG_INGEST.sql
+
+def version_id(version_date: str, source_sha256: str) -> str:
+    """Content-addressed id, so re-running the same source file resumes the same version."""
+    return f"{version_date}_{source_sha256[:12]}"
+
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def current(supplier_id):
+    """Version catalog_items_current shows for the supplier, or None before its first flip.
+
+    Once set, rows without this version are hidden, so replace/diff ingests
+    (which write catalog_version NULL) must not run for the supplier.
+    """
+    res = get_client().table("catalog_current_version").select("catalog_version").eq("supplier_id", supplier_id).execute()
+    return res.data[0]["catalog_version"] if res.data else None
+
+def begin(supplier_id, version: str, version_date: str = None) -> str:
+    """Register the version (idempotent) and return its status."""
+    status = rpc("begin_catalog_version", {"p_supplier_id": supplier_id, "p_version": version,
+                                           "p_version_date": version_date})
+    print(f"Catalog version {version}: {status}")
+    return status
+
+def flip(supplier_id, version: str):
+    """Make version the one readers see; returns the version it replaced."""
+    previous = rpc("flip_catalog_version", {"p_supplier_id": supplier_id, "p_version": version})
+    print(f"Catalog version {version} is now current (was {previous or 'unversioned rows'})")
+    return previous
+
+def rollback(supplier_id, version: str = None) -> str:
+    """Point readers back at the previous version (or the given one)."""
+    target = rpc("rollback_catalog_version", {"p_supplier_id": supplier_id, "p_version": version})
+    print(f"Rolled back to catalog version {target}")
+    return target
+
+def gc(supplier_id, keep: int = 1, batch: int = 20000) -> int:
+    """Delete rows of retired versions (keeping `keep` for rollback) in batches; returns rows deleted."""
+    total = 0
+    while True:
+        deleted = rpc("gc_catalog_versions", {"p_supplier_id": supplier_id, "p_keep": keep, "p_batch": batch},
+                      timeout=180)
+        total += deleted or 0
+        if not deleted or deleted < batch:
+            break
+    print(f"Catalog GC removed {total} rows of old versions")
+    return total
+
+def gc_in_background(supplier_id, keep: int = 1) -> threading.Thread:
+    # Not a daemon: the process exits once GC is done, but nothing waits on it
+    t = threading.Thread(target=gc, args=(supplier_id, keep), name="catalog-gc")
+    t.start()
+    return t
+
+def main(argv=None):
+    """python versioning.py rollback <slug> [version] | gc <slug> [keep]"""
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) < 2 or argv[0] not in ("rollback", "gc"):
+        raise SystemExit(main.__doc__)
+    supplier_id = get_supplier_id(argv[1])
+    if supplier_id is None:
+        raise SystemExit(f"Unknown supplier {argv[1]}")
+    if argv[0] == "rollback":
+        rollback(supplier_id, argv[2] if len(argv) > 2 else None)
+    else:
+        gc(supplier_id, int(argv[2]) if len(argv) > 2 else 1)
+
+if __name__ == "__main__":
+    main()